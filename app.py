@@ -1,236 +1,19 @@
 import streamlit as st
+import pandas as pd
+import numpy as np
+from logic_v6 import BalancedBoxLogic # [1. 알고리즘 로직 클래스] (Streamlit 없이 import 가능하도록 분리)
+from batch_logic import run_batch
+from mc_runner import case_directions
+from mc_stats import StreamingAggregator
+from mc_sequential import run_sequential
+from profiling import PhaseProfiler
+from result_store import ResultStore, run_config
+from risk import BatchRiskTracker, RiskTracker, SUMMARY_FIELDS, summarize_risk
+import checkpoint
 import collections
+import itertools
+import os
 import time
-import pandas as pd
-import random
-import matplotlib.pyplot as plt
-
-# --- [1. 알고리즘 로직 클래스 (상세 로그 & 단계별 실행 지원)] ---
-
-class Item:
-    def __init__(self, item_id, entry_price, item_type, state="Recruit", initial_profit=0):
-        self.id = item_id
-        self.entry_price = entry_price
-        self.item_type = item_type  # "Call" or "Put"
-        self.state = state          # Recruit, Combat, Wounded, Defeated
-        self.real_profit = initial_profit # [NEW] 초기 수익 설정 가능 (부상병 -2)
-        self.virtual_profit = 0     # 가상수익
-
-class BalancedBoxLogic:
-    def __init__(self, verbose=True):
-        self.call_queue = collections.deque()
-        self.put_queue = collections.deque()
-        
-        self.wounded_pool = collections.deque()
-        self.defeated_pool = collections.deque()
-        self.next_recruit_id = 0
-        
-        self.current_price = 1000.0
-        self.logs = []
-        self.total_realized_profit = 0
-        self.last_direction = None 
-        self.verbose = verbose
-        
-        # [NEW] 수익 그래프를 위한 히스토리 데이터
-        # 초기 상태: 0 profit
-        self.profit_history = [{'step': 0, 'profit': 0}]
-        self.step_count = 0
-        
-        # 단계별 실행을 위한 상태 변수
-        self.pending_direction = None
-        self.execution_phase = 0  # 0:Idle, 1:Update, 2:Reversal, 3:Entry, 4:Balance
-
-        # 초기 세팅
-        self.initialize_queues()
-
-    def log(self, msg, category="INFO"):
-        if not self.verbose: return
-        timestamp = time.strftime("%H:%M:%S")
-        icon = "📝"
-        if category == "PROFIT": icon = "💰"
-        elif category == "LOSS": icon = "💥"
-        elif category == "ENTRY": icon = "➕"
-        elif category == "REASON": icon = "💡"
-        
-        self.logs.insert(0, f"[{timestamp}] {icon} {msg}")
-
-    def record_profit(self):
-        # 현재 스텝의 누적 수익 저장
-        # 중복 스텝 방지: 이미 현재 스텝 기록이 있다면 업데이트, 없으면 추가
-        if self.profit_history and self.profit_history[-1]['step'] == self.step_count:
-             self.profit_history[-1]['profit'] = self.total_realized_profit
-        else:
-            self.profit_history.append({
-                'step': self.step_count,
-                'profit': self.total_realized_profit
-            })
-
-    def get_soldier_id(self):
-        if self.wounded_pool: 
-            return self.wounded_pool.popleft(), "🚑부상병"
-        elif self.defeated_pool: 
-            return self.defeated_pool.popleft(), "🎖️패잔병"
-        else:
-            new_id = self.next_recruit_id
-            self.next_recruit_id += 1
-            return new_id, "👶신병"
-
-    def initialize_queues(self):
-        if not self.call_queue:
-            cid, _ = self.get_soldier_id()
-            self.call_queue.append(Item(cid, self.current_price, "Call", "Combat"))
-            self.log("🏁 초기 세팅: Call Item(0) 투입", "ENTRY")
-        if not self.put_queue:
-            pid, _ = self.get_soldier_id()
-            self.put_queue.append(Item(pid, self.current_price, "Put", "Combat"))
-            self.log("🏁 초기 세팅: Put Item(0) 투입", "ENTRY")
-
-    def get_unrealized_profit(self):
-        return sum(i.real_profit for i in self.call_queue) + sum(i.real_profit for i in self.put_queue)
-
-    def can_enter(self, queue):
-        if not queue: return True, "초기 진입 허용"
-        for item in queue:
-            if item.real_profit > 0:
-                return True, f"ID({item.item_type[0]}{item.id})의 실수익({item.real_profit}) > 0"
-            if item.virtual_profit > 0:
-                return True, f"ID({item.item_type[0]}{item.id})의 가상수익({item.virtual_profit}) > 0"
-        return False, "양수 수익(실/가상)인 아이템 없음"
-
-    def pop_item(self, queue, reason):
-        if not queue: return
-        item = queue.popleft()
-        
-        if item.real_profit < 0:
-            item.state = "Wounded"
-            self.wounded_pool.appendleft(item.id)
-            self.log(f"POP(손실): {item.item_type}{item.id} (R:{item.real_profit}) -> 부상병 이동 || 사유: {reason}", "LOSS")
-        else:
-            item.state = "Defeated"
-            self.defeated_pool.append(item.id)
-            # [Logic] 부상병이 -2에서 시작했으므로, 여기서 더해지는 item.real_profit은
-            # 이미 페널티가 반영된 최종 수익입니다. (별도 차감 불필요)
-            self.total_realized_profit += item.real_profit
-            self.log(f"POP(이익): {item.item_type}{item.id} (R:{item.real_profit}) -> 이익 확정 || 사유: {reason}", "PROFIT")
-        
-        # Pop 발생 시 수익 기록 업데이트 (중요: 실현 손익 변화 시점)
-        self.record_profit()
-
-    # --- [단계별 실행 함수들] ---
-
-    # [Phase 1] 가격 및 수익 업데이트
-    def step_1_update_profits(self):
-        direction = self.pending_direction
-        is_up = (direction == "UP")
-        price_change = 10 if is_up else -10
-        self.current_price += price_change
-        
-        self.step_count += 1 # 스텝 증가
-        
-        # 수익 계산 logic
-        if is_up:
-            for i in self.call_queue:
-                i.real_profit += 1
-                i.virtual_profit += 1
-            for i in self.put_queue:
-                i.real_profit -= 1
-                i.virtual_profit = max(0, i.virtual_profit - 1) if i.virtual_profit > 0 else 0
-        else:
-            for i in self.call_queue:
-                i.real_profit -= 1
-                i.virtual_profit = max(0, i.virtual_profit - 1) if i.virtual_profit > 0 else 0
-            for i in self.put_queue:
-                i.real_profit += 1
-                i.virtual_profit += 1
-                
-        arrow = "🔺" if is_up else "🟦"
-        self.log(f"가격 변동: {arrow} {direction} (현재가: {self.current_price})", "INFO")
-        self.log("전체 아이템의 실/가상 수익이 업데이트 되었습니다.", "INFO")
-
-    # [Phase 2] 장 역전 체크
-    def step_2_handle_reversal(self):
-        direction = self.pending_direction
-        if self.last_direction is None or self.last_direction == direction:
-            self.log("장 흐름 유지됨 (역전 아님) -> 특별 조치 없음", "REASON")
-            return
-
-        is_up = (direction == "UP")
-        self.log(f"🔄 장 역전 감지! ({self.last_direction} -> {direction})", "REASON")
-        
-        count = 0
-        if not is_up: # UP -> DOWN
-            while self.call_queue and self.call_queue[0].real_profit > 0:
-                self.pop_item(self.call_queue, "장 역전(하락반전)으로 인한 Call 수익청산")
-                count += 1
-        else: # DOWN -> UP
-            while self.put_queue and self.put_queue[0].real_profit > 0:
-                self.pop_item(self.put_queue, "장 역전(상승반전)으로 인한 Put 수익청산")
-                count += 1
-        
-        if count == 0:
-            self.log("장 역전되었으나, 즉시 청산할 수익 아이템이 없습니다.", "REASON")
-
-    # [Phase 3] 신규 진입 (Push)
-    def step_3_entry(self):
-        direction = self.pending_direction
-        is_up = (direction == "UP")
-        
-        target_queue = self.call_queue if is_up else self.put_queue
-        queue_name = "Call" if is_up else "Put"
-        
-        can_enter, reason = self.can_enter(target_queue)
-        
-        if can_enter:
-            sid, origin = self.get_soldier_id()
-            
-            # [NEW] 부상병일 경우 초기 수익 -2 설정
-            initial_p = -2 if origin == "🚑부상병" else 0
-            
-            new_item = Item(sid, self.current_price, queue_name, "Combat", initial_profit=initial_p)
-            target_queue.append(new_item)
-            
-            log_msg = f"{queue_name} 진입 성공 (ID:{sid}, {origin})"
-            if initial_p < 0:
-                log_msg += f" [패널티 적용: {initial_p}]"
-            
-            self.log(f"{log_msg} || 근거: {reason}", "ENTRY")
-        else:
-            self.log(f"{queue_name} 진입 실패 (대기) || 사유: {reason}", "REASON")
-
-    # [Phase 4] 균형 조절 (Pop)
-    def step_4_balance(self):
-        direction = self.pending_direction
-        is_up = (direction == "UP")
-        
-        # 1. 수량 균형
-        while len(self.call_queue) >= len(self.put_queue) + 2:
-            self.pop_item(self.call_queue, f"Call({len(self.call_queue)}) > Put({len(self.put_queue)}) + 2 (수량과다)")
-        
-        while len(self.put_queue) >= len(self.call_queue) + 2:
-            self.pop_item(self.put_queue, f"Put({len(self.put_queue)}) > Call({len(self.call_queue)}) + 2 (수량과다)")
-
-        # 2. 방향성 제한
-        if not is_up: # 하락장
-             while len(self.call_queue) > len(self.put_queue):
-                 self.pop_item(self.call_queue, "하락장에서 Call 큐가 Put 큐보다 김 (방향성 위배)")
-        if is_up: # 상승장
-            while len(self.put_queue) > len(self.call_queue):
-                self.pop_item(self.put_queue, "상승장에서 Put 큐가 Call 큐보다 김 (방향성 위배)")
-        
-        self.log("균형 조절(Balancing) 완료", "INFO")
-        
-        # 턴 종료 처리
-        self.last_direction = direction
-        self.pending_direction = None
-        self.record_profit() # 턴 종료시 기록
-
-    def full_step_auto(self, direction):
-        # 몬테카를로/자동실행 용 (로그 없이 한방에 실행)
-        self.pending_direction = direction
-        self.step_1_update_profits()
-        self.step_2_handle_reversal()
-        self.step_3_entry()
-        self.step_4_balance()
 
 # --- [2. Streamlit UI] ---
 
@@ -294,6 +77,43 @@ if 'sim' not in st.session_state:
     st.session_state.sim = BalancedBoxLogic()
 
 sim = st.session_state.sim
+if sim.risk is None: sim.risk = RiskTracker() # [NEW] 위험 지표 (턴마다 O(1) 누적, 체크포인트에 함께 저장)
+
+# [NEW] MC 결과 저장소 (SQLite). 경로는 환경변수 BB_RESULT_STORE 로 변경 가능
+@st.cache_resource
+def open_store(path):
+    """모든 세션/재실행이 공유하는 저장소 연결 (재실행마다 새 연결/스키마 확인을 하지 않음)"""
+    return ResultStore(path)
+
+store = open_store(os.environ.get("BB_RESULT_STORE", "results.db"))
+
+# [NEW] 화면 렌더링 한도 (스텝이 쌓여도 재실행 시간이 일정하도록)
+CARD_PAGE = 50     # 큐 카드 한 페이지 개수
+LOG_LINES = 200    # 로그 패널 최대 줄 수
+CHART_POINTS = 500 # 차트 최대 점 개수
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def chart_frame(columns, max_points=CHART_POINTS):
+    """{이름: 스텝별 값} -> 최대 max_points 행 DataFrame (균등 간격 추출, 첫/마지막 스텝 포함. 짧은 열은 NaN)"""
+    n = max(len(values) for values in columns.values())
+    index = np.unique(np.linspace(0, n - 1, min(n, max_points)).round().astype(np.int64))
+    data = {}
+    for name, values in columns.items():
+        padded = np.full(n, np.nan)
+        padded[:len(values)] = values
+        data[name] = padded[index]
+    df = pd.DataFrame(data, index=index)
+    df.index.name = 'step'
+    return df
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def stored_mean(path, run_id, created):
+    """저장된 실행의 스텝별 평균 수익 (step 0 = 0 포함). created 는 같은 id 재사용 시 캐시 구분용"""
+    total, cases = 0.0, 0
+    for block in store.load_blocks(run_id): # 블록 단위 합산 (수익 행렬 전체를 읽어 들이지 않음)
+        total = total + block.sum(axis=0)
+        cases += len(block)
+    return np.r_[0.0, total / max(cases, 1)]
 
 # --- [Controller Logic] ---
 def set_direction(direction):
@@ -320,7 +140,7 @@ def execute_next_step():
 with st.sidebar:
     st.header("🎮 컨트롤러")
     
-    tab_manual, tab_mc = st.tabs(["👆 수동 조작", "🎲 시뮬레이션(MC)"])
+    tab_manual, tab_mc, tab_diag = st.tabs(["👆 수동 조작", "🎲 시뮬레이션(MC)", "🔬 진단"])
 
     # --- Manual Tab ---
     with tab_manual:
@@ -334,6 +154,16 @@ with st.sidebar:
             if c2.button("📉 하락 준비 (DOWN)", use_container_width=True):
                 set_direction("DOWN")
                 st.rerun()
+
+            # [NEW] 빨리 감기: N 틱을 run() 으로 한 번에 진행하고 화면은 마지막에 한 번만 그림
+            with st.expander("⏩ 빨리 감기"):
+                ff_ticks = st.number_input("틱 수", 1, 1_000_000, 100, key="ff_ticks")
+                ff_p_up = st.slider("상승 확률", 0.0, 1.0, 0.5, key="ff_p_up")
+                if st.button("⏩ 실행", use_container_width=True):
+                    ups = np.random.default_rng().random(int(ff_ticks)) < ff_p_up
+                    sim.run(ups, record_every=int(ff_ticks))
+                    sim.log("⏩ 빨리 감기: {}틱 진행 (상승 확률 {:.2f})", int(ff_ticks), ff_p_up)
+                    st.rerun()
         else:
             # Phase 1~4: 단계별 실행
             dir_text = "상승(UP)" if sim.pending_direction == "UP" else "하락(DOWN)"
@@ -349,39 +179,136 @@ with st.sidebar:
             if st.button(f"▶ {btn_label}", type="primary", use_container_width=True):
                 execute_next_step()
                 st.rerun()
-    
+
+        # [NEW] 체크포인트: 현재 상태(단계 진행 중 포함)를 파일로 저장 / 불러오기
+        with st.expander("💾 체크포인트"):
+            # 직렬화는 버튼을 눌렀을 때만 (rerun 마다 전체 상태를 복사/인코딩하지 않음), 상태가 바뀌면 준비한 파일은 폐기
+            state_key = (id(sim), sim.step_count, sim.execution_phase)
+            prepared = st.session_state.get('checkpoint')
+            if prepared is not None and prepared[0] != state_key:
+                del st.session_state['checkpoint']
+                prepared = None
+            if prepared is None:
+                if st.button("현재 상태 저장 준비", use_container_width=True):
+                    st.session_state['checkpoint'] = (state_key, checkpoint.snapshot(sim).to_bytes())
+                    st.rerun()
+            else:
+                st.download_button("현재 상태 저장", prepared[1], f"step_{sim.step_count}.bbck",
+                                   "application/octet-stream", use_container_width=True)
+            uploaded = st.file_uploader("체크포인트 파일", type=["bbck"])
+            if uploaded is not None and st.button("불러오기", use_container_width=True):
+                try:
+                    cp = checkpoint.Checkpoint.from_bytes(uploaded.getvalue())
+                    restored = cp.fork() if cp.engine == "v6" else None
+                except (ValueError, KeyError, TypeError) as e: # 잘린 파일 / 깨진 meta
+                    st.error(f"체크포인트를 읽을 수 없습니다: {e}")
+                else:
+                    if restored is None:
+                        st.error(f"V6 체크포인트가 아닙니다 (engine={cp.engine})")
+                    else:
+                        st.session_state.sim = restored
+                        st.rerun()
+
     # --- Monte Carlo Tab ---
     with tab_mc:
         st.markdown("### 몬테카를로 시뮬레이션")
-        mc_cases = st.number_input("반복 횟수", 1, 100, 10)
-        mc_steps = st.number_input("스텝 수", 10, 500, 100)
+        mc_cases = st.number_input("반복 횟수", 1, 1000, 10)
+        mc_steps = st.number_input("스텝 수", 10, 2000, 100)
+        mc_seed = st.number_input("시드 (같은 시드 = 같은 결과)", 0, 2**31 - 1, 0)
+        # [NEW] 정밀도 목표 모드: 반복 횟수 대신 신뢰구간 반폭이 목표 이하가 될 때까지 반복
+        mc_auto = st.checkbox("정밀도 목표까지 자동 반복", help="평균 최종 수익 95% 신뢰구간 반폭 기준")
+        if mc_auto:
+            mc_target = st.number_input("목표 반폭 (±)", 0.1, 1000.0, 5.0)
+            mc_budget = st.number_input("시간 한도 (초)", 1, 600, 20)
         
         if st.button("🚀 실행"):
-            # MC 실행 로직
-            results = []
+            # MC 실행 로직: 케이스를 청크 단위로 배치 엔진에 돌리고 통계를 누적
+            # [NEW] 실행 결과는 결과 저장소에 보관 -> 같은 설정(시드/케이스/스텝/엔진 버전)은 다시 계산하지 않음
+            stats = StreamingAggregator(mc_steps + 1, sample_size=10, seed=mc_seed)
+            # 수익 블록은 통계에 누적하고 저장소에도 나오는 대로 기록 (RunWriter) -> 전체 (cases x steps) 행렬을 만들지 않음
+            def add_block(case_ids, block):
+                stats.add(case_ids, np.hstack([np.zeros((len(block), 1), dtype=np.int64), block]))
+            if mc_auto:
+                progress = st.empty()
+                def show(r):
+                    progress.text(f"{r.cases}개: {r.estimate:.1f} ± {r.halfwidth:.1f} ({r.elapsed:.1f}s)")
+                with store.writer() as writer:
+                    def save_block(case_ids, block):
+                        writer.append(block)
+                        add_block(case_ids, block)
+                    result = run_sequential("v6", mc_steps, mc_target, seed=mc_seed, time_budget=mc_budget,
+                                            on_batch=show, on_block=save_block)
+                    writer.finish(run_config("v6", mc_seed, result.cases, mc_steps), result.elapsed)
+                st.session_state['mc_risk'] = None # 순차 모드는 위험 지표 미집계
+                reasons = {"precision": "목표 정밀도 도달", "time": "시간 한도", "max_cases": "최대 케이스 수"}
+                progress.text(f"{reasons.get(result.reason, result.reason)}: {result.cases}개, "
+                              f"평균 {result.estimate:.1f} ± {result.halfwidth:.1f}")
+            else:
+                config = run_config("v6", mc_seed, mc_cases, mc_steps)
+                cached = store.lookup(config)
+                if cached is not None:
+                    st.info("저장된 결과를 불러왔습니다. (같은 설정)")
+                    done = 0
+                    for block in store.load_blocks(cached["id"]):
+                        for start in range(0, len(block), 256):
+                            part = block[start:start + 256]
+                            add_block(range(done, done + len(part)), part)
+                            done += len(part)
+                    st.session_state['mc_risk'] = cached["risk"]
+                else:
+                    with st.spinner("시뮬레이션 실행 중..."), store.writer() as writer:
+                        started = time.perf_counter()
+                        risk_parts = []
+                        for start in range(0, mc_cases, 256):
+                            case_ids = range(start, min(start + 256, mc_cases))
+                            # 랜덤 워크 방향 행렬 (cases x steps, True = UP) - 케이스별 시드 스트림으로 재현 가능
+                            tracker = BatchRiskTracker(len(case_ids))
+                            block = run_batch(case_directions(mc_seed, case_ids, mc_steps), risk=tracker)
+                            writer.append(block)
+                            add_block(case_ids, block)
+                            risk_parts.append(tracker.as_dict())
+                        risk_summary = summarize_risk(
+                            {name: np.concatenate([part[name] for part in risk_parts]) for name in SUMMARY_FIELDS})
+                        writer.finish(config, time.perf_counter() - started, risk=risk_summary)
+                    st.session_state['mc_risk'] = risk_summary
             
-            # 진행상황 표시
-            progress_bar = st.progress(0)
-            
-            for i in range(mc_cases):
-                mc_sim = BalancedBoxLogic(verbose=False)
-                # 랜덤 워크 실행
-                for _ in range(mc_steps):
-                    direction = "UP" if random.random() > 0.5 else "DOWN"
-                    mc_sim.full_step_auto(direction)
-                
-                # 최종 데이터 저장 (히스토리 포함)
-                results.append(mc_sim.profit_history)
-                progress_bar.progress((i + 1) / mc_cases)
-            
-            st.session_state['mc_results'] = results
+            st.session_state['mc_stats'] = stats
             st.success("시뮬레이션 완료! 결과 탭을 확인하세요.")
 
+        # [NEW] 저장된 실행 목록 / 비교
+        with st.expander("📚 저장된 실행"):
+            runs = store.query(engine="v6", limit=200)
+            if not runs:
+                st.caption("저장된 실행이 없습니다.")
+            else:
+                df_runs = pd.DataFrame(runs)[["id", "seed", "cases", "steps", "mean", "std", "p5", "p95"]]
+                st.dataframe(df_runs, hide_index=True, use_container_width=True)
+                picked = st.multiselect("비교할 실행 (id)", df_runs["id"].tolist(), max_selections=8)
+                if st.button("📈 비교", disabled=not picked):
+                    st.session_state['mc_compare'] = picked
+                    st.rerun()
+
+    # --- Diagnostics Tab ---
+    with tab_diag:
+        st.markdown("### 단계별 프로파일링")
+        st.caption("별도 엔진으로 랜덤 워크를 실행하며 4단계 지연/청산 수를 측정합니다. (현재 수동 시뮬레이션에는 영향 없음)")
+        diag_ticks = st.number_input("틱 수", 100, 200_000, 10_000, step=1000)
+        diag_persistence = st.slider("방향 유지 확률 (0.5 = 랜덤, 낮을수록 잦은 역전)", 0.05, 0.95, 0.5)
+        if st.button("⏱️ 측정 실행"):
+            from directions import momentum
+            profiler = PhaseProfiler()
+            probe = profiler.attach(BalancedBoxLogic(verbose=False))
+            with st.spinner("측정 중..."):
+                for up in momentum(1, int(diag_ticks), diag_persistence).row(0).tolist():
+                    probe.full_step_auto(up)
+            st.session_state['profile'] = profiler
+
     st.divider()
     if st.button("🔄 리셋"):
         st.session_state.sim = BalancedBoxLogic()
-        if 'mc_results' in st.session_state:
-            del st.session_state['mc_results']
+        for key in ('mc_stats', 'mc_compare', 'mc_risk', 'checkpoint'):
+            if key in st.session_state:
+                del st.session_state[key]
         st.rerun()
 
     st.markdown("### 💰 자산 현황")
@@ -391,33 +318,90 @@ with st.sidebar:
     st.metric("미실현 수익", f"{unrealized:+d}")
     st.metric("총 자산", f"{total:+d}")
 
+    # [NEW] 위험 지표 (턴 종료 기준, 히스토리 없이 누적)
+    risk = sim.risk
+    with st.expander("⚠️ 위험 지표", expanded=True):
+        c1, c2 = st.columns(2)
+        c1.metric("최대 낙폭", f"{risk.max_drawdown:d}", help=f"고점 {risk.peak:+d} / 현재 낙폭 {risk.drawdown:d}")
+        c2.metric("최장 수면 아래", f"{risk.max_underwater:d}턴", help=f"현재 {risk.underwater:d}턴 연속 고점 아래")
+        c1.metric("최대 큐 깊이", f"C {risk.max_call_depth} / P {risk.max_put_depth}")
+        c2.metric("최대 부상병", f"{risk.max_wounded:d}")
+        c1.metric("최대 노출", f"{risk.max_gross:d}", help="보유 포지션 수 (Call + Put)")
+        c2.metric("평균 노출", f"{risk.mean_gross:.1f}")
+
 # --- [Main Display Area] ---
 
+# 0. 진단(프로파일링) 결과 패널
+if st.session_state.get('profile') is not None:
+    profile = st.session_state['profile'].as_dict()
+    with st.expander(f"🔬 단계별 프로파일 ({profile['ticks']:,} 틱)", expanded=True):
+        df_phase = pd.DataFrame([
+            {"단계": phase, "호출": p["count"], "평균(ns)": round(p["mean_ns"]), "p50(ns)": p["p50_ns"],
+             "p99(ns)": p["p99_ns"], "최대(ns)": p["max_ns"], "청산 수": p["pops"]}
+            for phase, p in profile["phases"].items()])
+        st.dataframe(df_phase, hide_index=True, use_container_width=True)
+        st.caption("틱당 청산(pop) 수 분포")
+        st.bar_chart(pd.Series(profile["pops_per_tick"], name="틱 수").rename_axis("틱당 청산 수"))
+        c1, c2, c3 = st.columns(3)
+        c1.download_button("JSON", st.session_state['profile'].to_json(), "profile.json", "application/json")
+        c2.download_button("Prometheus", st.session_state['profile'].to_prometheus(), "profile.prom", "text/plain")
+        if c3.button("닫기"):
+            del st.session_state['profile']
+            st.rerun()
+
 # 1. 몬테카를로 결과가 있으면 그래프 표시
-if 'mc_results' in st.session_state and st.session_state['mc_results']:
+if st.session_state.get('mc_stats') is not None:
     st.subheader("📊 몬테카를로 시뮬레이션 결과")
     
-    # 모든 케이스의 profit history를 하나의 차트에 그림
-    # 데이터프레임 변환 (각 케이스를 컬럼으로)
-    all_profits = {}
-    for idx, history in enumerate(st.session_state['mc_results']):
-        df = pd.DataFrame(history)
-        # 중복된 step 제거 및 인덱스 설정 (안전장치)
-        df = df.drop_duplicates(subset=['step'])
-        all_profits[f'Case {idx+1}'] = df.set_index('step')['profit']
+    # 스텝별 분위수 밴드 (평균, p5/p50/p95) - 케이스 수와 무관하게 선 개수 고정
+    stats = st.session_state['mc_stats']
+    bands = stats.bands()
+    st.line_chart(chart_frame({k: bands[k] for k in ("p5", "p50", "p95", "mean")}), height=400)
     
-    df_chart = pd.DataFrame(all_profits)
-    st.line_chart(df_chart, height=400)
+    # 표본 경로 (reservoir sample)
+    with st.expander(f"표본 경로 {len(stats.sample())}개 / 전체 {stats.count}개"):
+        st.line_chart(chart_frame({f'Case {case_id+1}': path for case_id, path in stats.sample()}), height=300)
     
     # 통계
-    final_profits = df_chart.iloc[-1]
+    final_profits = stats.final()
     c1, c2, c3 = st.columns(3)
-    c1.metric("평균 수익", f"{final_profits.mean():.1f}")
-    c2.metric("최고 수익", f"{final_profits.max():.0f}")
-    c3.metric("최저 수익", f"{final_profits.min():.0f}")
+    c1.metric("평균 수익", f"{final_profits['mean']:.1f}")
+    c2.metric("최고 수익", f"{final_profits['max']:.0f}")
+    c3.metric("최저 수익", f"{final_profits['min']:.0f}")
+
+    # [NEW] 위험 지표 분포 (케이스별 최대 낙폭 / 수면 아래 / 큐 깊이 / 노출)
+    risk_summary = st.session_state.get('mc_risk')
+    if risk_summary:
+        labels = {"max_drawdown": "최대 낙폭", "max_underwater": "최장 수면 아래(스텝)", "max_call_depth": "최대 Call 깊이",
+                  "max_put_depth": "최대 Put 깊이", "max_wounded": "최대 부상병", "max_gross": "최대 노출",
+                  "mean_gross": "평균 노출"}
+        with st.expander("⚠️ 위험 지표 (케이스별 분포)", expanded=True):
+            df_risk = pd.DataFrame([{"지표": labels[name], **values} for name, values in risk_summary.items()])
+            st.dataframe(df_risk, hide_index=True, use_container_width=True)
     
     if st.button("결과 닫기"):
-        del st.session_state['mc_results']
+        del st.session_state['mc_stats']
+        st.session_state.pop('mc_risk', None)
+        st.rerun()
+
+# [NEW] 저장된 실행 비교 (평균 수익 곡선 + 요약 지표)
+elif st.session_state.get('mc_compare'):
+    st.subheader("📚 저장된 실행 비교")
+    runs = {r["id"]: r for r in store.query(limit=1000)}
+    picked = [run_id for run_id in st.session_state['mc_compare'] if run_id in runs]
+    label = lambda r: f"#{r['id']} seed {r['seed']} · {r['cases']}개 · {r['steps']}스텝"
+    means = {label(runs[run_id]): stored_mean(store.path, run_id, runs[run_id]["created"]) for run_id in picked}
+    st.line_chart(chart_frame(means), height=400)
+    df_picked = pd.DataFrame([runs[run_id] for run_id in picked])
+    # [NEW] 최대 낙폭 분포 (위험 지표 없이 저장된 실행은 빈 칸)
+    for key in ("mean", "p95"):
+        df_picked[f"mdd_{key}"] = [r["max_drawdown"][key] if r else None for r in df_picked["risk"]]
+    st.dataframe(df_picked[["id", "seed", "cases", "steps", "mean", "std", "min", "p5", "p50", "p95", "max",
+                            "mdd_mean", "mdd_p95", "elapsed"]],
+                 hide_index=True, use_container_width=True)
+
+    if st.button("비교 닫기"):
+        del st.session_state['mc_compare']
         st.rerun()
 
 else:
@@ -432,13 +416,13 @@ else:
 
     st.divider()
 
-    # Queue 렌더링 함수
-    def render_html_card(queue):
+    # Queue 렌더링 함수 ([NEW] 한 페이지(CARD_PAGE 개)만 HTML 로 만듦)
+    def render_html_card(queue, start=0):
         html_parts = ['<div class="card-container">']
         if not queue:
             html_parts.append('<div style="text-align:center; color:#999; padding:20px;">비어있음</div>')
         
-        for item in queue:
+        for item in itertools.islice(queue, start, start + CARD_PAGE):
             status_cls = "profit-plus" if item.real_profit > 0 else ("profit-minus" if item.real_profit < 0 else "")
             real_cls = "val-plus" if item.real_profit > 0 else ("val-minus" if item.real_profit < 0 else "")
             virt_cls = "val-plus" if item.virtual_profit > 0 else ""
@@ -456,18 +440,39 @@ else:
         html_parts.append('</div>')
         return "".join(html_parts)
 
+    def queue_page(queue, name):
+        """큐가 CARD_PAGE 보다 길면 페이지 선택 (1페이지 = head, 다음 청산 대상부터). 반환: 시작 위치"""
+        pages = max(1, -(-len(queue) // CARD_PAGE))
+        if pages == 1: return 0
+        key = f"page_{name}"
+        if st.session_state.get(key, 1) > pages: # 큐가 줄어든 경우 마지막 페이지로
+            st.session_state[key] = pages
+        page = st.number_input(f"페이지 (총 {pages}, 페이지당 {CARD_PAGE}개)", 1, pages, key=key)
+        return (page - 1) * CARD_PAGE
+
+    def log_lines(events):
+        """로그 패널 줄 (최신 순, 최대 LOG_LINES). 지난 재실행 이후 새로 쌓인 이벤트만 포맷해서 앞에 붙임"""
+        view = st.session_state.get('log_view')
+        if view is None or view['events'] is not events: # 리셋/체크포인트 복원으로 엔진이 바뀐 경우
+            view = {'events': events, 'seen': 0, 'lines': collections.deque(maxlen=LOG_LINES)}
+            st.session_state['log_view'] = view
+        for record in events.since(view['seen']):
+            view['lines'].appendleft(events.format(record))
+        view['seen'] = events.emitted
+        return view['lines']
+
     c_call, c_vs, c_put = st.columns([4, 0.5, 4])
 
     with c_call:
         st.subheader(f"🔴 Call ({len(sim.call_queue)})")
-        st.markdown(render_html_card(sim.call_queue), unsafe_allow_html=True)
+        st.markdown(render_html_card(sim.call_queue, queue_page(sim.call_queue, "call")), unsafe_allow_html=True)
 
     with c_vs:
         st.markdown("<div style='height:400px; border-left:2px dashed #ddd; margin:0 auto; width:2px;'></div>", unsafe_allow_html=True)
 
     with c_put:
         st.subheader(f"🔵 Put ({len(sim.put_queue)})")
-        st.markdown(render_html_card(sim.put_queue), unsafe_allow_html=True)
+        st.markdown(render_html_card(sim.put_queue, queue_page(sim.put_queue, "put")), unsafe_allow_html=True)
 
     st.divider()
 
@@ -475,12 +480,14 @@ else:
     c1, c2 = st.columns([1, 2])
     with c1:
         st.markdown("### 🏥 병사 대기열")
-        wounded = ", ".join([f"🚑{id}" for id in sim.wounded_pool]) if sim.wounded_pool else "-"
+        # [NEW] 부상병은 앞쪽 20명만 표시
+        wounded = ", ".join([f"🚑{id}" for id in itertools.islice(sim.wounded_pool, 20)]) if sim.wounded_pool else "-"
+        if len(sim.wounded_pool) > 20: wounded += f" 외 {len(sim.wounded_pool) - 20}명"
         st.info(f"**부상병 (1순위):** {wounded} (재진입시 -2 패널티)")
         st.write(f"패잔병 대기: {len(sim.defeated_pool)} | 신병 대기: ∞")
 
     with c2:
         st.markdown("### 📝 상세 동작 로그")
         with st.container(height=300, border=True):
-            for l in sim.logs:
-                st.text(l)
\ No newline at end of file
+            # [NEW] 줄마다 위젯을 만들지 않고 최근 LOG_LINES 줄을 텍스트 하나로 표시
+            st.text("\n".join(log_lines(sim.events)))
\ No newline at end of file
@@ -0,0 +1,425 @@
+import collections
+import numpy as np
+
+class BatchBalancedBoxLogic:
+    """
+    Balanced Box V6 규칙(logic_v6.BalancedBoxLogic)을 여러 케이스에 대해 동시에 실행하는 배치 엔진.
+    모든 케이스가 같은 스텝을 lockstep 으로 진행합니다.
+    (step(up, rows) 로 일부 케이스만 진행할 수도 있음: portfolio.Portfolio)
+    - 실수익은 logic.py 와 같은 offset 방식 (실수익 = 측별 offset - 슬롯 base)
+    - 가상수익만 슬롯별로 갱신 (max(0, v - 1) clamp 는 in-place 연산 2회)
+    - 패잔병/신병 구분은 수익에 영향이 없으므로 개수만 추적
+
+    큐 저장소 (측별 1차원 슬롯 풀):
+    - 공용 링: 행마다 capacity 칸 (행 r = [r*capacity, (r+1)*capacity)), 가상수익 갱신은 (cases x capacity) view 로
+    - overflow: 큐가 capacity 를 넘은 행만 자기 용량(2배씩)의 세그먼트를 풀 뒤쪽에 따로 가짐
+      -> 깊은 행 하나가 다른 행의 메모리를 늘리지 않음. 다시 짧아진 행은 overflow 를 정리할 때 공용 링으로 복귀
+    - 행의 k 번째 아이템 슬롯 = start[r] + (head[r] + k) % cap[r]
+
+    진입 가능 판정: 실수익 > 0 이면 가상수익 > 0 이고(부상병 패널티는 실수익만 낮춤),
+    먼저 진입한 아이템일수록 가상수익이 크거나 같으므로 head 의 가상수익만 보면 충분합니다.
+    """
+    def __init__(self, cases, capacity=16):
+        self.cases = cases
+        self.capacity = capacity # 공용 링의 행당 칸 수
+        self.rows = np.arange(cases)
+
+        # Queue State: [0] = Call, [1] = Put
+        self.offset = [np.zeros(cases, dtype=np.int64) for _ in range(2)]
+        self.base = [np.zeros(cases * capacity, dtype=np.int64) for _ in range(2)]    # 슬롯 풀 (공용 링 + overflow)
+        self.virtual = [np.zeros(cases * capacity, dtype=np.int64) for _ in range(2)]
+        self.start = [np.arange(cases, dtype=np.int64) * capacity for _ in range(2)] # 행 세그먼트 시작 위치
+        self.cap = [np.full(cases, capacity, dtype=np.int64) for _ in range(2)]      # 행 세그먼트 용량
+        self.owner = [np.empty(0, dtype=np.int64) for _ in range(2)] # overflow 슬롯 -> 행 (-1 = 빈 칸)
+        self.used = [0, 0]    # overflow 에서 할당된 끝 위치
+        self.garbage = [0, 0] # overflow 에서 반납된 칸 수
+        self.head = [np.zeros(cases, dtype=np.int64) for _ in range(2)]
+        self.length = [np.ones(cases, dtype=np.int64) for _ in range(2)] # 초기 세팅: Call 1개, Put 1개
+        self.base_sum = [np.zeros(cases, dtype=np.int64) for _ in range(2)] # 보유 슬롯 base 합 (평가 손익 O(1))
+
+        # Pool State
+        self.wounded = np.zeros(cases, dtype=np.int64)
+        self.defeated = np.zeros(cases, dtype=np.int64)
+        self.next_recruit_id = np.full(cases, 2, dtype=np.int64)
+
+        self.total_realized_profit = np.zeros(cases, dtype=np.int64)
+        self.last_direction = np.zeros(cases, dtype=np.int8) # 0: None, 1: UP, -1: DOWN
+        self.step_count = 0
+        self.risk = None # [NEW] 위험 지표 누적기 (risk.BatchRiskTracker, step 마다 갱신)
+
+    # --- [슬롯 저장소] ---
+
+    def _ring_size(self):
+        return self.cases * self.capacity
+
+    def _items(self, side, rows):
+        """rows 의 살아있는 아이템 슬롯 위치 (행 순서, 행 안에서는 head 부터). 반환: (slots, 행별 개수, 행 안 순번)"""
+        n = self.length[side][rows]
+        k = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        slots = np.repeat(self.start[side][rows], n) + (np.repeat(self.head[side][rows], n) + k) % np.repeat(
+            self.cap[side][rows], n)
+        return slots, n, k
+
+    def _row_items(self, pool, side, row):
+        """행 하나의 아이템 값 리스트 (head 부터, 스칼라 경로용: 링 세그먼트를 slice 두 번으로 읽음)"""
+        start, head = int(self.start[side][row]), int(self.head[side][row])
+        cap, end = int(self.cap[side][row]), head + int(self.length[side][row])
+        if end <= cap: return pool[side][start + head:start + end].tolist()
+        return pool[side][start + head:start + cap].tolist() + pool[side][start:start + end - cap].tolist()
+
+    def _relocate(self, side, rows, caps):
+        """rows 의 큐를 용량 caps 의 새 세그먼트로 옮김 (caps <= capacity 면 공용 링으로 복귀). head 는 0 부터 다시 정렬"""
+        slots, n, k = self._items(side, rows)
+        bases, virtuals = self.base[side][slots], self.virtual[side][slots]
+        self._release(side, rows)
+        narrow = caps <= self.capacity
+        starts = rows * self.capacity
+        if not narrow.all():
+            starts[~narrow] = self._allocate(side, rows[~narrow], caps[~narrow])
+        self.start[side][rows] = starts
+        self.cap[side][rows] = np.where(narrow, self.capacity, caps)
+        self.head[side][rows] = 0
+        dst = np.repeat(starts, n) + k
+        self.base[side][dst] = bases
+        self.virtual[side][dst] = virtuals
+
+    def _release(self, side, rows):
+        # overflow 세그먼트 반납 (공용 링 칸은 행마다 항상 예약되어 있음)
+        rows = rows[self.cap[side][rows] > self.capacity]
+        if rows.size == 0: return
+        caps = self.cap[side][rows]
+        k = np.arange(caps.sum()) - np.repeat(np.cumsum(caps) - caps, caps)
+        self.owner[side][np.repeat(self.start[side][rows] - self._ring_size(), caps) + k] = -1
+        self.garbage[side] += int(caps.sum())
+        self.start[side][rows] = rows * self.capacity
+        self.cap[side][rows] = self.capacity
+
+    def _allocate(self, side, rows, caps):
+        """overflow 끝에 rows 의 세그먼트를 연속으로 할당. 반환: 시작 위치"""
+        need = int(caps.sum())
+        if self.used[side] + need > len(self.owner[side]):
+            if self.garbage[side]: self._compact(side)
+            if self.used[side] + need > len(self.owner[side]):
+                size = max(2 * len(self.owner[side]), self.used[side] + need)
+                ring = self._ring_size()
+                for pool in (self.base, self.virtual):
+                    grown = np.zeros(ring + size, dtype=np.int64)
+                    grown[:ring + self.used[side]] = pool[side][:ring + self.used[side]]
+                    pool[side] = grown
+                owner = np.full(size, -1, dtype=np.int64)
+                owner[:self.used[side]] = self.owner[side][:self.used[side]]
+                self.owner[side] = owner
+        offsets = self.used[side] + np.cumsum(caps) - caps
+        self.owner[side][self.used[side]:self.used[side] + need] = np.repeat(rows, caps)
+        self.used[side] += need
+        return self._ring_size() + offsets
+
+    def _compact(self, side):
+        """overflow 정리: 큐가 다시 짧아진 행은 공용 링으로 되돌리고, 남은 세그먼트를 앞으로 모음"""
+        deep = np.flatnonzero(self.cap[side] > self.capacity)
+        short = deep[self.length[side][deep] <= self.capacity // 2] # 경계에서 오가지 않도록 절반 이하만 복귀
+        if short.size: self._relocate(side, short, np.full(short.size, self.capacity))
+        deep = deep[self.length[side][deep] > self.capacity // 2]
+        deep = deep[np.argsort(self.start[side][deep])]
+        caps = self.cap[side][deep]
+        k = np.arange(caps.sum()) - np.repeat(np.cumsum(caps) - caps, caps)
+        offsets = np.cumsum(caps) - caps
+        ring = self._ring_size()
+        src = np.repeat(self.start[side][deep], caps) + k
+        dst = ring + np.repeat(offsets, caps) + k
+        for pool in (self.base, self.virtual):
+            pool[side][dst] = pool[side][src]
+        self.owner[side][:] = -1
+        self.owner[side][dst - ring] = np.repeat(deep, caps)
+        self.start[side][deep] = ring + offsets
+        self.used[side] = int(caps.sum())
+        self.garbage[side] = 0
+
+    def _shift_virtual(self, side, direction, rows):
+        # 가상수익 = max(0, v + direction) (빈 슬롯도 함께 갱신하되 진입 시 초기화)
+        ring = self.virtual[side][:self._ring_size()].reshape(self.cases, self.capacity)
+        if rows is None: # 전 케이스면 view 로 in-place 갱신
+            ring += direction[:, None]
+            np.maximum(ring, 0, out=ring)
+        else: # 일부 케이스면 복사본을 갱신 후 되돌려 씀
+            virtual = ring[rows]
+            virtual += direction[:, None]
+            np.maximum(virtual, 0, out=virtual)
+            ring[rows] = virtual
+        used = self.used[side]
+        if used:
+            moves = np.zeros(self.cases + 1, dtype=np.int64) # 마지막 칸 = 빈 슬롯(owner -1)의 이동 0
+            moves[self.rows if rows is None else rows] = direction
+            over = self.virtual[side][self._ring_size():self._ring_size() + used]
+            over += moves[self.owner[side][:used]]
+            np.maximum(over, 0, out=over)
+
+    # --- [내부 헬퍼] ---
+
+    def _head_slot(self, side, rows):
+        return self.start[side][rows] + self.head[side][rows]
+
+    def _head_real(self, side, rows):
+        return self.offset[side][rows] - self.base[side][self._head_slot(side, rows)]
+
+    def _pop(self, side, rows):
+        base = self.base[side][self._head_slot(side, rows)]
+        self.base_sum[side][rows] -= base
+        profit = self.offset[side][rows] - base
+        loss = profit < 0
+        # 손실 -> 부상병, 이익 -> 패잔병 + 실현 수익 확정
+        self.wounded[rows] += loss
+        self.defeated[rows] += ~loss
+        self.total_realized_profit[rows] += np.where(loss, 0, profit)
+        self.head[side][rows] = (self.head[side][rows] + 1) % self.cap[side][rows]
+        self.length[side][rows] -= 1
+
+    def _pop_while(self, side, rows, cond):
+        # 조건을 만족하는 케이스만 남겨가며 반복 청산 (연쇄 청산이 긴 케이스만 계속 순회)
+        rows = rows[cond(rows)]
+        while rows.size:
+            self._pop(side, rows)
+            rows = rows[cond(rows)]
+
+    # --- [단계별 실행 (전 케이스 / 일부 케이스 동시)] ---
+
+    def step(self, up, rows=None):
+        """
+        up: (cases,) bool 배열 (True = UP)
+        rows: 일부 케이스만 진행할 때 케이스 인덱스 배열 (중복 없음, up 과 같은 순서). None 이면 전 케이스
+        """
+        up = np.asarray(up, dtype=bool)
+        down = ~up
+        direction = np.where(up, 1, -1).astype(np.int8)
+        sel = slice(None) if rows is None else rows # 전 케이스면 view 로 in-place 갱신
+        ids = self.rows if rows is None else rows
+        self.step_count += 1
+
+        # [Phase 1] 수익 업데이트
+        self.offset[0][sel] += direction
+        self.offset[1][sel] -= direction
+        self._shift_virtual(0, direction, rows)
+        self._shift_virtual(1, -direction, rows)
+
+        # [Phase 2] 장 역전 -> 반대편 head 의 수익 아이템 연속 청산
+        last = self.last_direction[sel]
+        reversal = (last != 0) & (last != direction)
+        for side, side_rows in ((0, ids[reversal & down]), (1, ids[reversal & up])):
+            self._pop_while(side, side_rows, lambda r: (self.length[side][r] > 0) & (self._head_real(side, r) > 0))
+
+        # [Phase 3] 신규 진입 (세그먼트가 가득 찬 행만 2배 용량으로 이동)
+        for side, side_mask in ((0, up), (1, down)):
+            full = ids[side_mask & (self.length[side][sel] >= self.cap[side][sel])]
+            if full.size: self._relocate(side, full, self.cap[side][full] * 2)
+
+            head_virtual = self.virtual[side][self._head_slot(side, sel)]
+            can_enter = side_mask & ((self.length[side][sel] == 0) | (head_virtual > 0))
+            entering = ids[can_enter]
+            if entering.size == 0: continue
+
+            # 부상병 우선 재투입 (-2 패널티) -> 패잔병 -> 신병
+            from_wounded = self.wounded[entering] > 0
+            from_defeated = ~from_wounded & (self.defeated[entering] > 0)
+            self.wounded[entering] -= from_wounded
+            self.defeated[entering] -= from_defeated
+            self.next_recruit_id[entering] += ~(from_wounded | from_defeated)
+
+            tail = self.start[side][entering] + (self.head[side][entering] + self.length[side][entering]) % \
+                self.cap[side][entering]
+            base = self.offset[side][entering] + np.where(from_wounded, 2, 0)
+            self.base[side][tail] = base
+            self.base_sum[side][entering] += base
+            self.virtual[side][tail] = 0
+            self.length[side][entering] += 1
+
+        # [Phase 4] 균형 조절
+        self._pop_while(0, ids, lambda r: self.length[0][r] >= self.length[1][r] + 2)
+        self._pop_while(1, ids, lambda r: self.length[1][r] >= self.length[0][r] + 2)
+        self._pop_while(0, ids[down], lambda r: self.length[0][r] > self.length[1][r])
+        self._pop_while(1, ids[up], lambda r: self.length[1][r] > self.length[0][r])
+
+        self.last_direction[sel] = direction
+        if self.risk is not None:
+            self.risk.update(self.total_realized_profit[sel] + self.get_unrealized_profit(rows), self.length[0][sel],
+                             self.length[1][sel], self.wounded[sel], rows)
+        return self.total_realized_profit
+
+    def run_row(self, row, ups):
+        """
+        케이스 하나를 방향열 ups(bool 리스트)만큼 스칼라 루프로 진행 (step(rows=[row]) 를 반복한 것과 같은 상태).
+        틱이 한 행에 몰린 경우용: 틱마다 NumPy 호출 대신 Python 루프 + 가상수익 floor 그룹 (logic_v6.ClampFloor 와 같은 방식)
+        - 가상수익 v = offset - floor, floor = 진입 이후 offset 의 최솟값 -> head 쪽일수록 floor 가 작거나 같음
+        - offset 이 떨어지면 tail 쪽에서 floor 가 더 큰 그룹들을 새 최솟값 하나로 합침 (amortized O(1))
+        """
+        row = int(row)
+        offset = [int(self.offset[0][row]), int(self.offset[1][row])]
+        bases, floors = [], []
+        for side in (0, 1):
+            bases.append(collections.deque(self._row_items(self.base, side, row)))
+            groups = collections.deque() # [floor, 개수] (head -> tail)
+            for virtual in self._row_items(self.virtual, side, row):
+                floor = offset[side] - virtual
+                if groups and groups[-1][0] == floor: groups[-1][1] += 1
+                else: groups.append([floor, 1])
+            floors.append(groups)
+        base_sum = [int(self.base_sum[0][row]), int(self.base_sum[1][row])]
+        wounded, defeated = int(self.wounded[row]), int(self.defeated[row])
+        recruits = int(self.next_recruit_id[row])
+        realized = int(self.total_realized_profit[row])
+        last = int(self.last_direction[row])
+        risk = None
+        if self.risk is not None:
+            from risk import FIELDS, RiskTracker
+            risk = RiskTracker.from_dict({name: getattr(self.risk, name)[row].item() for name in FIELDS})
+
+        def pop(side):
+            nonlocal wounded, defeated, realized
+            base = bases[side].popleft()
+            base_sum[side] -= base
+            profit = offset[side] - base
+            if profit < 0:
+                wounded += 1
+            else:
+                defeated += 1
+                realized += profit
+            head = floors[side][0]
+            head[1] -= 1
+            if not head[1]: floors[side].popleft()
+
+        for up in ups:
+            d = 1 if up else -1
+            # [Phase 1] offset 이동 + 떨어진 쪽 floor 합치기
+            offset[0] += d
+            offset[1] -= d
+            fallen = 1 if up else 0
+            value, groups = offset[fallen], floors[fallen]
+            if groups and groups[-1][0] > value:
+                count = 0
+                while groups and groups[-1][0] >= value:
+                    count += groups.pop()[1]
+                groups.append([value, count])
+            # [Phase 2] 장 역전
+            if last and last != d:
+                side = 0 if d < 0 else 1
+                while bases[side] and offset[side] - bases[side][0] > 0:
+                    pop(side)
+            # [Phase 3] 신규 진입
+            side = 0 if up else 1
+            groups = floors[side]
+            if not bases[side] or offset[side] - groups[0][0] > 0:
+                if wounded:
+                    wounded -= 1
+                    base = offset[side] + 2
+                else:
+                    if defeated: defeated -= 1
+                    else: recruits += 1
+                    base = offset[side]
+                bases[side].append(base)
+                base_sum[side] += base
+                if groups and groups[-1][0] == offset[side]: groups[-1][1] += 1
+                else: groups.append([offset[side], 1])
+            # [Phase 4] 균형 조절
+            calls, puts = bases
+            while len(calls) >= len(puts) + 2: pop(0)
+            while len(puts) >= len(calls) + 2: pop(1)
+            if not up:
+                while len(calls) > len(puts): pop(0)
+            else:
+                while len(puts) > len(calls): pop(1)
+            last = d
+            if risk is not None:
+                risk.update(realized + len(calls) * offset[0] - base_sum[0] + len(puts) * offset[1] - base_sum[1],
+                            len(calls), len(puts), wounded)
+
+        # 행 상태 되돌려 쓰기 (세그먼트가 모자라면 2배씩 키운 용량으로 이동)
+        for side in (0, 1):
+            n = len(bases[side])
+            self.length[side][row] = 0
+            if n > self.cap[side][row]:
+                cap = self.capacity
+                while cap < n: cap *= 2
+                self._relocate(side, np.array([row]), np.array([cap]))
+            start = int(self.start[side][row])
+            self.base[side][start:start + n] = list(bases[side]) # head 를 세그먼트 앞으로 정렬
+            self.virtual[side][start:start + n] = [offset[side] - floor for floor, count in floors[side]
+                                                   for _ in range(count)]
+            self.head[side][row] = 0
+            self.length[side][row] = n
+            self.offset[side][row] = offset[side]
+            self.base_sum[side][row] = base_sum[side]
+        self.wounded[row], self.defeated[row], self.next_recruit_id[row] = wounded, defeated, recruits
+        self.total_realized_profit[row] = realized
+        self.last_direction[row] = last
+        if risk is not None:
+            for name in FIELDS:
+                getattr(self.risk, name)[row] = getattr(risk, name)
+
+    def get_unrealized_profit(self, rows=None):
+        # Σ(offset - base) = 개수 * offset - base 합 (케이스당 O(1))
+        sel = slice(None) if rows is None else rows
+        return sum(self.offset[side][sel] * self.length[side][sel] - self.base_sum[side][sel] for side in (0, 1))
+
+    def extend(self, n):
+        """초기 상태(Call 1개, Put 1개)의 케이스 n 개 추가 (추가된 케이스 인덱스 반환)"""
+        fresh = BatchBalancedBoxLogic(n, self.capacity)
+        ring = self._ring_size()
+        for side in (0, 1):
+            # 공용 링 뒤에 새 행들의 링을 붙이고 overflow 는 그만큼 뒤로 (overflow 세그먼트 시작 위치 이동)
+            for pool, new in ((self.base, fresh.base), (self.virtual, fresh.virtual)):
+                pool[side] = np.concatenate([pool[side][:ring], new[side], pool[side][ring:]])
+            self.start[side][self.cap[side] > self.capacity] += n * self.capacity
+            self.start[side] = np.concatenate([self.start[side], fresh.start[side] + ring])
+        for name in ("offset", "cap", "head", "length", "base_sum"):
+            arrs, new = getattr(self, name), getattr(fresh, name)
+            for side in (0, 1):
+                arrs[side] = np.concatenate([arrs[side], new[side]])
+        for name in ("wounded", "defeated", "next_recruit_id", "total_realized_profit", "last_direction"):
+            setattr(self, name, np.concatenate([getattr(self, name), getattr(fresh, name)]))
+        if self.risk is not None: self.risk.extend(n)
+        added = np.arange(self.cases, self.cases + n)
+        self.cases += n
+        self.rows = np.arange(self.cases)
+        return added
+
+    @property
+    def nbytes(self):
+        """상태 배열 총 바이트 수 (슬롯 풀 = 공용 링 + overflow 포함)"""
+        arrays = [*self.offset, *self.base, *self.virtual, *self.start, *self.cap, *self.owner, *self.head,
+                  *self.length, *self.base_sum, self.wounded, self.defeated, self.next_recruit_id,
+                  self.total_realized_profit, self.last_direction]
+        return sum(a.nbytes for a in arrays)
+
+def to_up_matrix(directions):
+    """방향 행렬(bool / +1,-1 / "UP","DOWN")을 bool(True=UP) 행렬로 변환"""
+    directions = np.asarray(directions)
+    if directions.dtype.kind in "USO":
+        return directions == "UP"
+    return directions > 0
+
+def run_batch(directions, risk=None):
+    """
+    (cases x steps) 방향 행렬을 받아 (cases x steps) 누적 실현 수익 행렬을 반환.
+    결과[c, t] == 케이스 c 를 BalancedBoxLogic.full_step_auto 로 t+1 스텝 진행했을 때의 total_realized_profit
+    directions.PackedDirections 도 받음 (스텝 방향 chunk 단위로 풀어서 진행)
+    risk: risk.BatchRiskTracker(cases) 를 주면 같은 실행에서 케이스별 위험 지표도 누적
+    """
+    if hasattr(directions, "iter_columns"):
+        cases, steps = directions.shape
+        engine = BatchBalancedBoxLogic(cases)
+        engine.risk = risk
+        realized = np.empty((cases, steps), dtype=np.int64)
+        t = 0
+        for block in directions.iter_columns():
+            for column in block.T:
+                realized[:, t] = engine.step(column)
+                t += 1
+        return realized
+    up = to_up_matrix(directions)
+    if up.ndim == 1: up = up[None, :]
+    cases, steps = up.shape
+    engine = BatchBalancedBoxLogic(cases)
+    engine.risk = risk
+    realized = np.empty((cases, steps), dtype=np.int64)
+    for t in range(steps):
+        realized[:, t] = engine.step(up[:, t])
+    return realized
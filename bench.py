@@ -0,0 +1,217 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+from logic import BalanceBoxLogic
+from logic_v6 import BalancedBoxLogic
+from event_log import OFF
+import oracle
+
+# 사용법:
+#   python bench.py                              # 전체 시나리오 -> bench_results.json
+#   python bench.py --quick --verify             # 짧은 시나리오 + baseline 규칙 기준 구현과 틱 단위 비교
+#   python bench.py --baseline bench_baseline.json   # 저장된 baseline 대비 회귀 검사 (회귀 시 exit 1)
+#   python bench.py --save-baseline bench_baseline.json
+
+# --- [Direction Generators (고정 시드)] ---
+
+def make_directions(steps, seed, p_up=0.5, persistence=None):
+    """
+    bool 방향열 생성 (True = UP)
+    - persistence=None: 독립 코인 (p_up 으로 drift 조절)
+    - persistence=q: 직전 방향 유지 확률 q 의 Markov 체인 (q > 0.5 추세형, q < 0.5 평균회귀형)
+    """
+    rng = np.random.default_rng(seed)
+    if persistence is None:
+        return rng.random(steps) < p_up
+    flips = rng.random(steps) >= persistence
+    flips[0] = rng.random() >= p_up # 첫 방향
+    return (np.cumsum(flips) % 2) == 0
+
+SCENARIOS = {
+    # name: (generator kwargs)
+    "random":      dict(p_up=0.5),
+    "trend":       dict(p_up=0.65),
+    "momentum":    dict(persistence=0.8),
+    "mean_revert": dict(persistence=0.25),
+}
+LENGTHS = {"short": 2_000, "long": 50_000}
+QUICK_LENGTHS = {"short": 2_000}
+BATCH_CASES = 256
+BATCH_MAX_STEPS = 5_000
+
+# --- [Engines] ---
+# name: (factory, step(sim, up), open positions(sim), phase method names)
+
+ENGINES = {
+    "logic-diff": (lambda: BalanceBoxLogic(strategy_type="diff", log_level=OFF), oracle.logic_step,
+                   lambda s: len(s.call_q) + len(s.put_q),
+                   ("_update_gains", "_entry_call", "_entry_put", "_check_imbalance")),
+    "logic-fixed": (lambda: BalanceBoxLogic(strategy_type="fixed", log_level=OFF), oracle.logic_step,
+                    lambda s: len(s.call_q) + len(s.put_q),
+                    ("_update_gains", "_entry_call", "_entry_put", "_check_imbalance")),
+    "v6": (lambda: BalancedBoxLogic(verbose=False), oracle.v6_step,
+           lambda s: len(s.call_queue) + len(s.put_queue),
+           ("step_1_update_profits", "step_2_handle_reversal", "step_3_entry", "step_4_balance")),
+}
+
+def _drive(sim, step, directions):
+    for up in directions.tolist():
+        step(sim, up)
+
+def time_engine(name, directions, repeat=3):
+    """최고 기록 기준 처리량 + tracemalloc peak + 단계별 누적 시간"""
+    factory, step, open_positions, phases = ENGINES[name]
+    steps = len(directions)
+
+    best = float("inf")
+    for _ in range(repeat):
+        sim = factory()
+        start = time.perf_counter()
+        _drive(sim, step, directions)
+        best = min(best, time.perf_counter() - start)
+
+    # Peak memory (별도 실행: tracemalloc 자체 오버헤드가 처리량 측정에 섞이지 않도록)
+    tracemalloc.start()
+    sim = factory()
+    max_open = 0
+    for up in directions.tolist():
+        step(sim, up)
+        max_open = max(max_open, open_positions(sim))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Per-phase timing: 인스턴스 메서드를 타이머로 감싸서 실행
+    sim = factory()
+    phase_ns = dict.fromkeys(phases, 0)
+    for phase in phases:
+        method = getattr(sim, phase)
+        def timed(*args, _method=method, _phase=phase):
+            t0 = time.perf_counter_ns()
+            result = _method(*args)
+            phase_ns[_phase] += time.perf_counter_ns() - t0
+            return result
+        setattr(sim, phase, timed)
+    _drive(sim, step, directions)
+
+    return {
+        "steps": steps,
+        "seconds": best,
+        "steps_per_sec": steps / best if best else float("inf"),
+        "peak_bytes": peak,
+        "max_open_positions": max_open,
+        "peak_bytes_per_open_position": peak / max(1, max_open),
+        "phase_ns_per_step": {phase: ns / steps for phase, ns in phase_ns.items()},
+    }
+
+def time_batch(directions, repeat=3):
+    """배치 엔진: (cases x steps) 행렬 전체에 대한 case-step 처리량"""
+    from batch_logic import run_batch
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run_batch(directions)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    run_batch(directions)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    total = directions.size
+    return {"steps": total, "seconds": best, "steps_per_sec": total / best if best else float("inf"),
+            "peak_bytes": peak, "cases": directions.shape[0]}
+
+# --- [Suite] ---
+
+def run_suite(lengths=LENGTHS, repeat=3, verify=False, seed=0, log=print):
+    results = []
+    for scenario, gen in SCENARIOS.items():
+        for length_name, steps in lengths.items():
+            key = f"{scenario}/{length_name}"
+            directions = make_directions(steps, seed, **gen)
+
+            if verify:
+                # 최적화된 엔진(단계별 / run()) 을 oracle 의 고정 기준 구현(baseline 규칙)과 틱 단위 비교
+                sample = directions[:2_000]
+                oracle.verify_v6(BalancedBoxLogic(verbose=False), sample)
+                oracle.verify_v6_run(BalancedBoxLogic(verbose=False), sample)
+                for strategy in ("diff", "fixed"):
+                    oracle.verify_logic(BalanceBoxLogic(strategy_type=strategy, log_level=OFF), sample,
+                                        strategy_type=strategy)
+                    oracle.verify_logic_run(BalanceBoxLogic(strategy_type=strategy, log_level=OFF), sample,
+                                            strategy_type=strategy)
+
+            for engine in ENGINES:
+                row = {"engine": engine, "scenario": key, **time_engine(engine, directions, repeat)}
+                results.append(row)
+                log(f"{engine:12s} {key:20s} {row['steps_per_sec']:>12,.0f} steps/s  peak {row['peak_bytes'] / 1024:,.0f} KiB")
+
+            batch_steps = min(steps, BATCH_MAX_STEPS)
+            matrix = np.stack([make_directions(batch_steps, seed + 1 + c, **gen) for c in range(BATCH_CASES)])
+            if verify:
+                oracle.verify_batch_v6(matrix[:16, :1_000])
+            row = {"engine": "v6-batch", "scenario": key, **time_batch(matrix, repeat)}
+            results.append(row)
+            log(f"{'v6-batch':12s} {key:20s} {row['steps_per_sec']:>12,.0f} steps/s  peak {row['peak_bytes'] / 1024:,.0f} KiB")
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+def compare(current, baseline, tolerance=0.10):
+    """baseline 대비 처리량 변화율. 반환: (rows, regressions)"""
+    base = {(r["engine"], r["scenario"]): r for r in baseline["results"]}
+    rows, regressions = [], []
+    for r in current["results"]:
+        b = base.get((r["engine"], r["scenario"]))
+        if b is None: continue
+        ratio = r["steps_per_sec"] / b["steps_per_sec"]
+        row = (r["engine"], r["scenario"], b["steps_per_sec"], r["steps_per_sec"], ratio)
+        rows.append(row)
+        if ratio < 1 - tolerance:
+            regressions.append(row)
+    return rows, regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Balance Box 엔진 벤치마크")
+    parser.add_argument("--quick", action="store_true", help="짧은 시나리오만 실행")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verify", action="store_true",
+                        help="baseline 규칙의 기준 구현(oracle.Reference*)과 틱 단위 비교 수행")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", help="비교할 baseline JSON")
+    parser.add_argument("--save-baseline", help="이번 결과를 baseline 으로 저장")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="허용 처리량 감소율")
+    args = parser.parse_args(argv)
+
+    report = run_suite(QUICK_LENGTHS if args.quick else LENGTHS, args.repeat, args.verify, args.seed)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows, regressions = compare(report, baseline, args.tolerance)
+        for engine, scenario, before, after, ratio in rows:
+            flag = "  <-- REGRESSION" if (engine, scenario, before, after, ratio) in regressions else ""
+            print(f"{engine:12s} {scenario:20s} {before:>12,.0f} -> {after:>12,.0f} ({ratio:.2f}x){flag}")
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+import collections
+import json
+import struct
+import numpy as np
+
+from event_log import OFF
+from history import ProfitHistory
+from logic import BalanceBoxLogic
+from logic_v6 import BalancedBoxLogic, ClampFloor, Item, ProfitLedger
+from positions import PositionQueue
+from risk import RiskTracker
+
+# 엔진 상태 스냅샷 / 복원 / 분기(fork).
+#
+# 사용법:
+#   cp = snapshot(sim)            # 현재 상태를 불변 Checkpoint 로 (큐/풀/카운터/가격/히스토리/로그/위험 지표)
+#   cp.save("run.bbck")           # 바이너리 파일로 저장, load("run.bbck") 로 복원
+#   branches = [cp.fork() for _ in range(100)]   # 같은 시점에서 갈라지는 독립 엔진들
+#
+# V6 fork 는 copy-on-write: 큐 아이템/floor 그룹/풀/히스토리는 분기가 처음 접근할 때 만들어짐 (ForkedBalancedBoxLogic)
+# logic.py fork 는 큐 열 배열을 memcpy 로 복사하는 복원입니다.
+#
+# --- [Binary Checkpoint Format] ---
+# Header (12 bytes, little-endian): magic(4s) | version(H) | engine code(H) | meta length(I)
+# Meta: UTF-8 JSON (스칼라 상태 + 배열 목록 [name, dtype, length])
+# Body: 배열들을 meta 의 순서대로 연속 저장 (각 배열은 8바이트 경계로 정렬)
+# 큐 내용은 아이템 객체가 아니라 열(column) 배열로 저장하므로 저장/로드는 배열 memcpy 수준입니다.
+MAGIC = b"BBCK"
+VERSION = 1
+HEADER = struct.Struct("<4sHHI")
+ENGINE_CODES = {"v6": 0, "logic": 1}
+
+class Checkpoint:
+    """
+    불변 스냅샷 (meta dict + 이름별 NumPy 배열).
+    fork() 로 만든 엔진들은 이 배열을 읽기만 하므로 Checkpoint 하나를 여러 분기가 공유합니다.
+    (V6 분기는 상태를 처음 건드릴 때까지 배열만 참조: ForkedBalancedBoxLogic)
+    """
+    def __init__(self, engine, meta, arrays):
+        self.engine = engine
+        self.meta = meta
+        self.arrays = arrays
+        for a in arrays.values():
+            a.flags.writeable = False
+
+    def fork(self):
+        """이 시점에서 시작하는 새 엔진 (원본/다른 분기와 상태를 공유하지 않음)"""
+        return RESTORERS[self.engine](self.meta, self.arrays)
+
+    def to_bytes(self):
+        names = list(self.arrays)
+        meta = {**self.meta, "arrays": [[n, self.arrays[n].dtype.str, len(self.arrays[n])] for n in names]}
+        blob = json.dumps(meta, ensure_ascii=False, default=_json_default).encode()
+        parts = [HEADER.pack(MAGIC, VERSION, ENGINE_CODES[self.engine], len(blob)), blob]
+        offset = HEADER.size + len(blob)
+        for n in names:
+            pad = -offset % 8
+            parts.append(b"\0" * pad)
+            data = np.ascontiguousarray(self.arrays[n]).tobytes()
+            parts.append(data)
+            offset += pad + len(data)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """잘리거나 깨진 데이터는 모두 ValueError"""
+        if len(data) < HEADER.size:
+            raise ValueError(f"체크포인트가 너무 짧습니다 ({len(data)} bytes)")
+        magic, version, code, meta_len = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"체크포인트 형식이 아닙니다 (magic={magic!r})")
+        if version != VERSION:
+            raise ValueError(f"지원하지 않는 체크포인트 버전 (version={version})")
+        engine = next((k for k, v in ENGINE_CODES.items() if v == code), None)
+        if engine is None:
+            raise ValueError(f"알 수 없는 엔진 코드 ({code})")
+        if HEADER.size + meta_len > len(data):
+            raise ValueError("체크포인트가 잘렸습니다 (meta)")
+        try:
+            meta = json.loads(bytes(data[HEADER.size:HEADER.size + meta_len]).decode())
+            offset = HEADER.size + meta_len
+            arrays = {}
+            for name, dtype, length in meta.pop("arrays"):
+                dtype = np.dtype(dtype)
+                if dtype.kind not in "biuf":
+                    raise ValueError(f"체크포인트 배열 {name} 의 dtype 이 올바르지 않습니다 ({dtype.str})")
+                if not isinstance(length, int) or length < 0:
+                    raise ValueError(f"체크포인트 배열 {name} 의 길이가 올바르지 않습니다 ({length!r})")
+                offset += -offset % 8
+                if offset + dtype.itemsize * length > len(data):
+                    raise ValueError(f"체크포인트가 잘렸습니다 (배열 {name})")
+                arrays[name] = np.frombuffer(data, dtype=dtype, count=length, offset=offset)
+                offset += dtype.itemsize * length
+        except (KeyError, TypeError, AttributeError) as e: # 형식은 맞지만 meta 구조가 깨진 경우
+            raise ValueError(f"체크포인트 meta 가 올바르지 않습니다 ({e!r})") from e
+        return cls(engine, meta, arrays)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+def _json_default(value):
+    # NumPy 스칼라 (로그 payload 등) -> Python 값
+    if isinstance(value, np.generic): return value.item()
+    raise TypeError(f"JSON 으로 저장할 수 없는 값: {value!r}")
+
+def snapshot(engine):
+    """엔진 종류에 맞게 Checkpoint 생성"""
+    if isinstance(engine, BalancedBoxLogic): return _snapshot_v6(engine)
+    if isinstance(engine, BalanceBoxLogic): return _snapshot_logic(engine)
+    raise TypeError(f"지원하지 않는 엔진: {type(engine).__name__}")
+
+def restore(checkpoint):
+    return checkpoint.fork()
+
+def save(engine, path):
+    snapshot(engine).save(path)
+
+def load(path):
+    return Checkpoint.load(path).fork()
+
+# --- [Common: History / Event Log / Risk] ---
+
+def _history_state(history, arrays):
+    arrays["history_steps"] = history.steps.copy()
+    arrays["history_values"] = history.values.copy()
+    # 버퍼 용량도 저장 (max_points 사용 시 다음 decimate 시점이 용량에 따라 달라짐)
+    return {"capacity": len(history._steps), "every": history.every, "max_points": history.max_points,
+            "last_step": history.last_step, "last_value": _json_scalar(history.last_value)}
+
+def _restore_history(history, state, arrays):
+    steps, values = arrays["history_steps"], arrays["history_values"]
+    history._steps = np.empty(state["capacity"], dtype=np.int64)
+    history._values = np.empty(state["capacity"], dtype=values.dtype)
+    history._steps[:len(steps)] = steps
+    history._values[:len(values)] = values
+    history.size = len(steps)
+    history.every = state["every"]
+    history.max_points = state["max_points"]
+    history.last_step = state["last_step"]
+    history.last_value = state["last_value"]
+
+def _json_scalar(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+def _events_state(events):
+    return {"level": events.level, "capacity": events.records.maxlen, "emitted": events.emitted,
+            "records": [list(record) for record in events.records]}
+
+def _restore_events(events, state):
+    events.level = state["level"]
+    events.records = collections.deque(
+        ((ts, category, pos_id, template, tuple(payload)) for ts, category, pos_id, template, payload in state["records"]),
+        maxlen=state["capacity"])
+    events.emitted = state.get("emitted", len(events.records))
+
+def _risk_state(risk):
+    return None if risk is None else {name: _json_scalar(value) for name, value in risk.as_dict().items()}
+
+def _restore_risk(meta):
+    state = meta.get("risk") # 위험 지표 이전에 저장된 체크포인트는 None
+    return None if state is None else RiskTracker.from_dict(state)
+
+# --- [V6: BalancedBoxLogic] ---
+
+def _ledger_arrays(prefix, ledger, queue, arrays):
+    floors = list(ledger.floors)
+    index = {id(f): i for i, f in enumerate(floors)}
+    arrays[prefix + "_floor_value"] = np.array([f.value for f in floors], dtype=np.int64)
+    arrays[prefix + "_floor_count"] = np.array([f.count for f in floors], dtype=np.int64)
+    n = len(queue)
+    arrays[prefix + "_id"] = np.fromiter((item.id for item in queue), dtype=np.int64, count=n)
+    arrays[prefix + "_entry_price"] = np.fromiter((item.entry_price for item in queue), dtype=np.float64, count=n)
+    arrays[prefix + "_base"] = np.fromiter((item.base for item in queue), dtype=np.int64, count=n)
+    # 아이템의 floor 는 병합된 그룹의 대표(root) 로 저장 (root 는 항상 ledger.floors 에 있음)
+    arrays[prefix + "_floor"] = np.fromiter((index[id(ledger.resolve(item))] for item in queue), dtype=np.int32,
+                                            count=n)
+    return {"offset": ledger.offset, "count": ledger.count, "base_sum": ledger.base_sum}
+
+def _restore_ledger(prefix, side, state, arrays):
+    ledger = ProfitLedger(side)
+    ledger.offset = state["offset"]
+    ledger.count = state["count"]
+    ledger.base_sum = state["base_sum"]
+    floors = []
+    for value, count in zip(arrays[prefix + "_floor_value"].tolist(), arrays[prefix + "_floor_count"].tolist()):
+        f = ClampFloor(value)
+        f.count = count
+        floors.append(f)
+    ledger.floors = collections.deque(floors)
+
+    # ledger.open 을 거치지 않고 슬롯만 채움 (count/base_sum 은 위에서 복원)
+    queue = collections.deque()
+    new = Item.__new__
+    for item_id, price, base, floor in zip(arrays[prefix + "_id"].tolist(), arrays[prefix + "_entry_price"].tolist(),
+                                          arrays[prefix + "_base"].tolist(), arrays[prefix + "_floor"].tolist()):
+        item = new(Item)
+        item.id = item_id
+        item.entry_price = price
+        item.state = "Combat"
+        item.ledger = ledger
+        item.base = base
+        item.floor = floors[floor]
+        queue.append(item)
+    return ledger, queue
+
+def _snapshot_v6(sim):
+    arrays = {}
+    meta = {
+        "config": {"verbose": sim.verbose, "unit_point": sim.unit_point},
+        "call_ledger": _ledger_arrays("call", sim.call_ledger, sim.call_queue, arrays),
+        "put_ledger": _ledger_arrays("put", sim.put_ledger, sim.put_queue, arrays),
+        "next_recruit_id": sim.next_recruit_id,
+        "current_price": sim.current_price,
+        "total_realized_profit": sim.total_realized_profit,
+        "last_direction": sim.last_direction,
+        "step_count": sim.step_count,
+        "pending_direction": sim.pending_direction,
+        "execution_phase": sim.execution_phase,
+        "history": _history_state(sim.profit_history, arrays),
+        "events": _events_state(sim.events),
+        "risk": _risk_state(sim.risk),
+    }
+    arrays["wounded_pool"] = np.array(sim.wounded_pool, dtype=np.int64)
+    arrays["defeated_pool"] = np.array(sim.defeated_pool, dtype=np.int64)
+    return Checkpoint("v6", meta, arrays)
+
+class ForkedBalancedBoxLogic(BalancedBoxLogic):
+    """
+    Checkpoint.fork() 가 돌려주는 V6 엔진 (copy-on-write).
+    큐/ledger(아이템, floor 그룹), 병사 풀, 수익 히스토리는 처음 접근할 때 체크포인트의 읽기 전용 배열에서 만듭니다.
+    -> fork 자체는 O(1) 이고, 아직 건드리지 않은 상태는 체크포인트 배열을 여러 분기가 공유
+    한 번 만든 뒤에는 일반 인스턴스 속성이므로 스텝 진행에 추가 비용이 없습니다. (__getattr__ 은 없는 속성만 호출)
+    """
+    LAZY = {"call_ledger": "queues", "put_ledger": "queues", "call_queue": "queues", "put_queue": "queues",
+            "wounded_pool": "pools", "defeated_pool": "pools", "profit_history": "history"}
+
+    def __getattr__(self, name):
+        group = self.LAZY.get(name)
+        pending = self.__dict__.get("_pending")
+        if group is None or not pending or group not in pending: raise AttributeError(name)
+        pending.discard(group)
+        _MATERIALIZERS[group](self, *self._source)
+        return self.__dict__[name]
+
+    @property
+    def materialized(self):
+        """아직 체크포인트 배열을 공유 중인 상태가 없으면 True"""
+        return not self.__dict__.get("_pending")
+
+def _materialize_queues(sim, meta, arrays):
+    sim.call_ledger, sim.call_queue = _restore_ledger("call", "Call", meta["call_ledger"], arrays)
+    sim.put_ledger, sim.put_queue = _restore_ledger("put", "Put", meta["put_ledger"], arrays)
+
+def _materialize_pools(sim, meta, arrays):
+    sim.wounded_pool = collections.deque(arrays["wounded_pool"].tolist())
+    sim.defeated_pool = collections.deque(arrays["defeated_pool"].tolist())
+
+def _materialize_history(sim, meta, arrays):
+    sim.profit_history = ProfitHistory()
+    _restore_history(sim.profit_history, meta["history"], arrays)
+
+_MATERIALIZERS = {"queues": _materialize_queues, "pools": _materialize_pools, "history": _materialize_history}
+
+def _restore_v6(meta, arrays):
+    sim = ForkedBalancedBoxLogic(**meta["config"], log_capacity=meta["events"]["capacity"])
+    # 생성자가 만든 초기 큐/풀/히스토리는 버리고 첫 접근 때 체크포인트에서 만듦
+    for name in ForkedBalancedBoxLogic.LAZY:
+        del sim.__dict__[name]
+    sim._source = (meta, arrays)
+    sim._pending = set(ForkedBalancedBoxLogic.LAZY.values())
+    for key in ("next_recruit_id", "current_price", "total_realized_profit", "last_direction", "step_count",
+                "pending_direction", "execution_phase"):
+        setattr(sim, key, meta[key])
+    _restore_events(sim.events, meta["events"])
+    sim.risk = _restore_risk(meta)
+    return sim
+
+# --- [logic.py: BalanceBoxLogic] ---
+
+def _queue_slots(queue):
+    return np.arange(queue.first_id, queue.next_id, dtype=np.int64) & queue.mask
+
+def _queue_arrays(prefix, queue, arrays):
+    # 살아있는 구간 [first_id, next_id) 만 ID 순서로 저장 (array 버퍼를 NumPy view 로 읽음)
+    slots = _queue_slots(queue)
+    for name, col in queue.cols.items():
+        arrays[f"{prefix}_{name}"] = np.frombuffer(col, dtype=col.typecode)[slots]
+    return {"first_id": queue.first_id, "next_id": queue.next_id, "typecode": queue.typecode,
+            "columns": list(queue.cols)}
+
+def _restore_queue(prefix, state, arrays):
+    queue = PositionQueue(tuple(state["columns"]), state["typecode"],
+                          capacity=max(16, state["next_id"] - state["first_id"]))
+    queue.first_id, queue.next_id = state["first_id"], state["next_id"]
+    slots = _queue_slots(queue)
+    for name, col in queue.cols.items():
+        np.frombuffer(col, dtype=col.typecode)[slots] = arrays[f"{prefix}_{name}"]
+    return queue
+
+def _snapshot_logic(sim):
+    arrays = {}
+    meta = {
+        "config": {"box_size": sim.box_size, "unit_point": sim.unit_point, "strategy_type": sim.strategy_type},
+        "call_q": _queue_arrays("call", sim.call_q, arrays),
+        "put_q": _queue_arrays("put", sim.put_q, arrays),
+        "call_offset": sim.call_offset, "put_offset": sim.put_offset,
+        "call_base_sum": sim.call_base_sum, "put_base_sum": sim.put_base_sum,
+        "total_profit": sim.total_profit,
+        "step_count": sim.step_count,
+        "history": _history_state(sim.history, arrays),
+        "events": _events_state(sim.events),
+        "risk": _risk_state(sim.risk),
+    }
+    return Checkpoint("logic", meta, arrays)
+
+def _restore_logic(meta, arrays):
+    # 생성자의 초기 진입/로그는 아래에서 덮어씀
+    sim = BalanceBoxLogic(**meta["config"], log_level=OFF, log_capacity=meta["events"]["capacity"])
+    sim.call_q = _restore_queue("call", meta["call_q"], arrays)
+    sim.put_q = _restore_queue("put", meta["put_q"], arrays)
+    for key in ("call_offset", "put_offset", "call_base_sum", "put_base_sum", "total_profit", "step_count"):
+        setattr(sim, key, meta[key])
+    _restore_history(sim.history, meta["history"], arrays)
+    _restore_events(sim.events, meta["events"])
+    sim.risk = _restore_risk(meta)
+    return sim
+
+RESTORERS = {"v6": _restore_v6, "logic": _restore_logic}
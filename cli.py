@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# 사용법 (Streamlit 없이 실행):
+#   python cli.py --paths 1000 --steps 500 --seed 0 1 2 --out results.npz
+#   python cli.py --engine logic --box-size 3 --strategy fixed --paths 200 --steps 2000 --out results.csv
+#   python cli.py --directions paths.bbdr --out results.npz        # directions.PackedDirections 파일로 실행
+#   python cli.py --paths 1000 --steps 500 --store results.db       # 같은 설정은 저장소에서 바로 불러옴 (result_store)
+# 엔진 / NumPy 는 인자 파싱 이후에 import 합니다. (--help, 인자 오류는 즉시 응답)
+# 워커 프로세스는 엔진 모듈(logic_v6 / logic / batch_logic)만 import 하므로 streamlit/pandas 를 읽지 않습니다.
+
+ENGINES = ("v6-batch", "v6", "logic")
+
+def simulate(engine, paths, steps, seed, p_up=0.5, workers=None, engine_params=None):
+    """
+    한 master seed 에 대한 (paths x steps) 누적 실현 수익 행렬.
+    경로는 mc_runner.case_directions 로 만들기 때문에 엔진/워커 수와 무관하게 같은 seed 면 같은 경로입니다.
+    - "v6-batch": batch_logic.run_batch (V6 규칙, NumPy 벡터화)
+    - "v6" / "logic": mc_runner.MonteCarloRunner (케이스 단위 프로세스 병렬)
+    """
+    from mc_runner import MonteCarloRunner, case_directions
+    if engine == "v6-batch":
+        from batch_logic import run_batch
+        return run_batch(case_directions(seed, range(paths), steps, p_up))
+    runner = MonteCarloRunner(engine, paths, steps, seed, p_up, workers=workers, engine_params=engine_params)
+    return runner.run()
+
+def save(path, results, meta):
+    """
+    확장자에 따라 저장.
+    - .npz: seed 별 수익 행렬 (seed_<n>) + meta(JSON 문자열)
+    - .npy: (seeds x paths x steps) 3차원 배열
+    - .csv: seed, path, final_profit 행 (최종값만)
+    - .json: meta + seed 별 요약 통계
+    """
+    import numpy as np
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npz":
+        np.savez_compressed(path, meta=json.dumps(meta), **{f"seed_{seed}": p for seed, p in results.items()})
+    elif ext == ".npy":
+        np.save(path, np.stack(list(results.values())))
+    elif ext == ".csv":
+        with open(path, "w") as f:
+            f.write("seed,path,final_profit\n")
+            for seed, profits in results.items():
+                for i, v in enumerate(profits[:, -1].tolist()):
+                    f.write(f"{seed},{i},{v}\n")
+    elif ext == ".json":
+        from mc_stats import summarize
+        with open(path, "w") as f:
+            json.dump({**meta, "summary": {str(s): summarize(p) for s, p in results.items()}}, f, indent=2)
+    else:
+        raise ValueError(f"지원하지 않는 출력 형식: {ext} (.npz / .npy / .csv / .json)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Balance Box 헤드리스 배치 시뮬레이션")
+    parser.add_argument("--engine", choices=ENGINES, default="v6-batch")
+    parser.add_argument("--paths", type=int, default=100)
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--seed", type=int, nargs="+", default=[0], help="master seed (여러 개면 seed 별로 실행)")
+    parser.add_argument("--p-up", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, help="v6 / logic 엔진의 프로세스 수 (1 = 현재 프로세스)")
+    parser.add_argument("--box-size", type=int, default=2, help="logic 엔진 전용")
+    parser.add_argument("--unit-point", type=int, default=10, help="logic 엔진 전용")
+    parser.add_argument("--strategy", choices=("diff", "fixed"), default="diff", help="logic 엔진 전용")
+    parser.add_argument("--directions", help="방향 파일 (directions.PackedDirections, --paths/--steps/--seed 무시)")
+    parser.add_argument("--out", help="결과 파일 (.npz / .npy / .csv / .json)")
+    parser.add_argument("--store", help="결과 저장소 (SQLite) 경로. --directions 와는 함께 쓰지 않음")
+    args = parser.parse_args(argv)
+
+    engine_params = None
+    if args.engine == "logic":
+        from event_log import OFF
+        engine_params = dict(box_size=args.box_size, unit_point=args.unit_point,
+                             strategy_type=args.strategy, log_level=OFF)
+
+    if args.directions:
+        from directions import PackedDirections
+        packed = PackedDirections.open(args.directions)
+        args.paths, args.steps = packed.shape
+        args.seed = [0]
+        if args.engine == "v6-batch":
+            from batch_logic import run_batch
+            simulate_seed = lambda seed: run_batch(packed)
+        else:
+            from mc_runner import simulate_paths
+            simulate_seed = lambda seed: simulate_paths(args.engine, packed, engine_params)
+    else:
+        simulate_seed = lambda seed: simulate(args.engine, args.paths, args.steps, seed, args.p_up, args.workers,
+                                              engine_params)
+        if args.store:
+            from result_store import ResultStore, run_config
+            store = ResultStore(args.store)
+            compute = simulate_seed
+            # v6-batch 와 v6 는 같은 결과 -> 같은 key
+            engine_key = "logic" if args.engine == "logic" else "v6"
+            simulate_seed = lambda seed: store.get_or_compute(
+                run_config(engine_key, seed, args.paths, args.steps, "biased", {"p_up": args.p_up}, engine_params),
+                lambda: compute(seed))[0]
+
+    from mc_stats import summarize
+    results = {}
+    for seed in args.seed:
+        start = time.perf_counter()
+        results[seed] = simulate_seed(seed)
+        stats = summarize(results[seed])
+        print(f"seed {seed}: mean {stats['mean']:+.1f}  std {stats['std']:.1f}  "
+              f"p5 {stats['p5']:+.1f}  p95 {stats['p95']:+.1f}  ({time.perf_counter() - start:.2f}s)")
+
+    if args.out:
+        meta = {"engine": args.engine, "directions": args.directions, "paths": args.paths, "steps": args.steps,
+                "seeds": args.seed, "p_up": args.p_up, "engine_params": engine_params}
+        save(args.out, results, meta)
+        print(f"saved -> {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+import struct
+import numpy as np
+
+# 방향열(True = UP) 대량 생성기 + 1스텝 1비트 저장소.
+# - 경로 c 의 난수 스트림은 SeedSequence(seed, spawn_key=(c,)) 로만 정해지므로 (mc_runner.case_directions 와 동일)
+#   생성 순서/청크 분할과 무관하게 같은 seed 면 같은 경로가 나옵니다. biased(p_up) 는 case_directions 와 비트 단위로 같음.
+# - PackedDirections: (paths x ceil(steps / 8)) uint8, np.packbits 순서(big-endian). 파일로 만들면 memory-map
+#   (10k 경로 x 1M 스텝 = 1.25 GB -> 파일로 두고 필요한 행/열만 풀어서 사용)
+
+# --- [Binary Direction Format] ---
+# Header (24 bytes, little-endian): magic(4s) | version(H) | reserved(H) | paths(Q) | steps(Q)
+# Body: paths x ceil(steps / 8) 바이트 (행 단위 연속 저장)
+MAGIC = b"BBDR"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQQ")
+
+class PackedDirections:
+    """
+    비트 압축된 (paths x steps) 방향 행렬.
+    - row(i) / columns(start, stop) / iter_columns(chunk) 로 필요한 부분만 bool 로 풀어서 사용
+    - batch_logic.run_batch, mc_runner.simulate_paths 에 그대로 전달 가능
+    """
+    def __init__(self, bits, steps):
+        self.bits = bits
+        self.steps = steps
+
+    @classmethod
+    def empty(cls, paths, steps):
+        return cls(np.zeros((paths, (steps + 7) // 8), dtype=np.uint8), steps)
+
+    @classmethod
+    def create(cls, path, paths, steps):
+        """쓰기용 memory-map 파일 생성 (생성기의 out 으로 사용)"""
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, paths, steps))
+            f.truncate(HEADER.size + paths * ((steps + 7) // 8))
+        return cls.open(path, mode="r+")
+
+    @classmethod
+    def open(cls, path, mode="r"):
+        """헤더를 검증하고 memory-map 으로 열기"""
+        with open(path, "rb") as f:
+            magic, version, _, paths, steps = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path}: 방향 파일 형식이 아닙니다 (magic={magic!r})")
+        if version != VERSION:
+            raise ValueError(f"{path}: 지원하지 않는 버전 (version={version})")
+        if paths == 0 or steps == 0:
+            return cls(np.zeros((paths, (steps + 7) // 8), dtype=np.uint8), steps)
+        bits = np.memmap(path, dtype=np.uint8, mode=mode, offset=HEADER.size, shape=(paths, (steps + 7) // 8))
+        return cls(bits, steps)
+
+    @classmethod
+    def pack(cls, directions):
+        """bool / +1,-1 행렬 -> PackedDirections"""
+        up = np.asarray(directions) > 0
+        if up.ndim == 1: up = up[None, :]
+        return cls(np.packbits(up, axis=1), up.shape[1])
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, len(self), self.steps))
+            np.ascontiguousarray(self.bits).tofile(f)
+
+    def flush(self):
+        if isinstance(self.bits, np.memmap): self.bits.flush()
+
+    def __len__(self):
+        return self.bits.shape[0]
+
+    @property
+    def shape(self):
+        return len(self), self.steps
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def set_row(self, i, directions):
+        self.bits[i] = np.packbits(np.asarray(directions, dtype=bool))
+
+    def row(self, i):
+        """경로 i 전체 (bool, steps)"""
+        return np.unpackbits(self.bits[i], count=self.steps).view(bool)
+
+    def columns(self, start, stop, rows=slice(None)):
+        """스텝 [start, stop) 구간 (bool, paths x (stop - start))"""
+        stop = min(stop, self.steps)
+        first = start // 8
+        block = np.unpackbits(self.bits[rows, first:(stop + 7) // 8], axis=1)
+        return block[:, start - first * 8:stop - first * 8].view(bool)
+
+    def iter_columns(self, chunk=1 << 16, rows=slice(None)):
+        """스텝 방향으로 chunk 개씩 잘라 yield (chunk 는 8 의 배수로 맞춤)"""
+        chunk = max(8, chunk - chunk % 8)
+        for start in range(0, self.steps, chunk):
+            yield self.columns(start, start + chunk, rows)
+
+    def to_bool(self):
+        return self.columns(0, self.steps)
+
+def up_list(directions):
+    """1차원 방향열(bool / +1,-1 / "UP","DOWN") -> Python bool 리스트 (엔진 run() 의 tight loop 입력)"""
+    if isinstance(directions, (list, tuple)) and all(d.__class__ is bool for d in directions):
+        return list(directions)
+    directions = np.asarray(directions)
+    if directions.dtype.kind in "US":
+        return (directions == "UP").tolist()
+    if directions.dtype.kind == "O": # 문자열(str 하위 클래스 포함)과 숫자가 섞인 경우: full_step_auto 와 같은 규칙
+        return [d == "UP" if isinstance(d, str) else d > 0 for d in directions.tolist()]
+    return (directions > 0).tolist()
+
+# --- [Generators] ---
+# 모든 생성기: (paths, steps, seed, ..., out=None) -> PackedDirections
+# out 에 PackedDirections.create(...) 를 주면 메모리 대신 파일에 바로 씀 (한 번에 한 경로만 메모리에 존재)
+
+def _case_rng(seed, case_id):
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(int(case_id),)))
+
+def _fill(paths, steps, seed, out, make_row):
+    out = out if out is not None else PackedDirections.empty(paths, steps)
+    if out.shape != (paths, steps):
+        raise ValueError(f"out shape {out.shape} != {(paths, steps)}")
+    for case_id in range(paths):
+        out.set_row(case_id, make_row(_case_rng(seed, case_id), steps))
+    out.flush()
+    return out
+
+def fair_coin(paths, steps, seed=0, out=None):
+    """UP/DOWN 각 1/2"""
+    return biased(paths, steps, 0.5, seed, out)
+
+def biased(paths, steps, p_up=0.5, seed=0, out=None):
+    """독립 코인, P(UP) = p_up (drift). mc_runner.case_directions 와 같은 경로"""
+    return _fill(paths, steps, seed, out, lambda rng, n: rng.random(n) < p_up)
+
+def momentum(paths, steps, persistence=0.5, p_up=0.5, seed=0, out=None):
+    """
+    직전 방향 유지 확률 persistence 의 Markov 체인 (> 0.5 추세형, < 0.5 평균회귀형).
+    첫 방향만 p_up 으로 결정 (bench.make_directions 와 같은 모델)
+    """
+    def row(rng, n):
+        flips = rng.random(n) >= persistence
+        flips[0] = rng.random() >= p_up
+        return (np.cumsum(flips) % 2) == 0
+    return _fill(paths, steps, seed, out, row)
+
+def regime_switching(paths, steps, p_up=(0.6, 0.4), switch=0.01, seed=0, out=None):
+    """
+    숨은 국면(regime) 이 매 스텝 switch 확률로 다른 국면으로 바뀌는 Markov regime-switching 모델.
+    국면 k 에서 P(UP) = p_up[k]. 국면 지속 기간은 기하분포, 다음 국면은 나머지 중 균등 선택.
+    (스텝 단위 루프 없이 국면 구간 단위로 벡터화)
+    """
+    p_up = np.asarray(p_up, dtype=np.float64)
+    k = len(p_up)
+
+    def row(rng, n):
+        regime = rng.integers(k)
+        if k == 1 or switch <= 0:
+            return rng.random(n) < p_up[regime]
+        runs = max(16, int(n * switch * 1.2) + 16)
+        durations = rng.geometric(switch, runs)
+        while durations.sum() < n:
+            durations = np.concatenate([durations, rng.geometric(switch, runs)])
+        offsets = rng.integers(1, k, len(durations)) if k > 2 else np.ones(len(durations), dtype=np.int64)
+        offsets[0] = 0
+        regimes = (regime + np.cumsum(offsets)) % k
+        per_step = np.repeat(p_up[regimes], durations)[:n]
+        return rng.random(n) < per_step
+    return _fill(paths, steps, seed, out, row)
+
+def block_bootstrap(history, paths, steps, block=64, seed=0, out=None):
+    """
+    과거 방향열(bool / +1,-1) 에서 길이 block 의 연속 구간을 무작위로 뽑아 이어 붙임 (moving block bootstrap).
+    구간 안의 자기상관(추세/평균회귀)을 그대로 유지합니다.
+    """
+    history = np.asarray(history) > 0
+    block = min(block, len(history))
+    if block == 0:
+        raise ValueError("history 가 비어 있습니다")
+    offsets = np.arange(block)
+
+    def row(rng, n):
+        starts = rng.integers(0, len(history) - block + 1, (n + block - 1) // block)
+        return history[(starts[:, None] + offsets).ravel()[:n]]
+    return _fill(paths, steps, seed, out, row)
+
+def history_from_prices(prices, unit_point, anchor=None):
+    """가격 배열 -> 박스 경계 통과 방향열 (tick_replay.UnitQuantizer, block_bootstrap 입력용)"""
+    from tick_replay import UnitQuantizer
+    return UnitQuantizer(unit_point, anchor).quantize(prices) > 0
+
+MODELS = {
+    "fair": fair_coin,
+    "biased": biased,
+    "momentum": momentum,
+    "regime": regime_switching,
+}
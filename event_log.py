@@ -0,0 +1,55 @@
+import collections
+import itertools
+import time
+
+# Log Levels (숫자가 클수록 상세)
+OFF = 0    # 기록 안 함 (emit 즉시 반환)
+TRADE = 1  # 진입/청산 등 포지션 이벤트만
+INFO = 2   # 단계 진행, 판단 사유까지 전부
+
+class EventLog:
+    """
+    고정 크기 링버퍼에 구조화된 이벤트를 쌓고, 화면에 표시할 때만 문자열로 변환하는 로그.
+    record = (timestamp, category, position id, template, payload)
+    - template 은 str.format 형식 ("{id}" = position id, "{}" = payload 순서대로)
+    - capacity 를 넘으면 가장 오래된 이벤트부터 자동 폐기 (append O(1))
+    """
+    def __init__(self, capacity=500, level=INFO, icons=None):
+        self.level = level
+        self.icons = icons or {}
+        self.records = collections.deque(maxlen=capacity)
+        self.emitted = 0 # 지금까지 기록된 이벤트 수 (폐기된 것 포함, 화면 증분 갱신용)
+
+    def enabled(self, level):
+        return level <= self.level
+
+    def emit(self, level, category, template, *payload, pos_id=None):
+        if level > self.level: return
+        self.records.append((time.time(), category, pos_id, template, payload))
+        self.emitted += 1
+
+    def format(self, record):
+        timestamp, category, pos_id, template, payload = record
+        stamp = time.strftime("%H:%M:%S", time.localtime(timestamp))
+        message = template.format(*payload, id=pos_id)
+        icon = self.icons.get(category)
+        return f"[{stamp}] {icon} {message}" if icon else f"[{stamp}] {message}"
+
+    def lines(self, limit=None):
+        """최신 이벤트부터 포맷된 문자열 리스트 반환 (기존 logs 리스트와 같은 순서)"""
+        out = []
+        for record in reversed(self.records):
+            if limit is not None and len(out) >= limit: break
+            out.append(self.format(record))
+        return out
+
+    def since(self, emitted):
+        """emitted(이전 시점의 self.emitted) 이후 새로 쌓인 레코드 (오래된 것부터, 링버퍼에 남아 있는 것만)"""
+        n = min(self.emitted - emitted, len(self.records))
+        return list(itertools.islice(self.records, len(self.records) - n, None))
+
+    def clear(self):
+        self.records.clear()
+
+    def __len__(self):
+        return len(self.records)
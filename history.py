@@ -0,0 +1,67 @@
+import numpy as np
+
+class ProfitHistory:
+    """
+    (step, profit) 기록을 타입 배열 2개(columnar)에 저장하는 히스토리.
+    - 용량이 차면 2배로 늘리는 amortized O(1) append
+    - steps / values 는 내부 버퍼의 zero-copy NumPy view (차트/통계에 바로 사용)
+    - every: k 스텝마다 한 점만 저장 (고정 다운샘플링)
+    - max_points: 점 개수가 한도에 닿으면 절반을 버리고 간격을 2배로 (메모리 상한 유지)
+    같은 스텝에 여러 번 record 하면 마지막 값으로 덮어씁니다. (스텝 내 Pop -> 턴 종료 기록)
+    """
+    def __init__(self, capacity=256, dtype=np.int64, every=1, max_points=None):
+        if max_points: capacity = min(capacity, max_points) # 감축은 버퍼가 찼을 때만 일어나므로 처음부터 한도 이하로
+        self._steps = np.empty(capacity, dtype=np.int64)
+        self._values = np.empty(capacity, dtype=dtype)
+        self.size = 0
+        self.every = every
+        self.max_points = max_points
+        self.last_step = None  # 다운샘플링으로 저장되지 않은 최신 기록
+        self.last_value = None
+
+    def _grow(self):
+        capacity = len(self._steps) * 2
+        if self.max_points: capacity = min(capacity, self.max_points)
+        self._steps = np.resize(self._steps, capacity)
+        self._values = np.resize(self._values, capacity)
+
+    def _decimate(self):
+        # 짝수 번째 점만 남기고 간격 2배 (0번 스텝은 항상 보존)
+        keep = self.size // 2 + self.size % 2
+        self._steps[:keep] = self._steps[0:self.size:2]
+        self._values[:keep] = self._values[0:self.size:2]
+        self.size = keep
+        self.every *= 2
+
+    def record(self, step, value):
+        self.last_step, self.last_value = step, value
+        n = self.size
+        if n and self._steps[n - 1] == step:
+            self._values[n - 1] = value
+            return
+        if step % self.every: return
+        if n == len(self._steps):
+            if self.max_points and n >= self.max_points:
+                self._decimate()
+                if step % self.every: return
+                n = self.size
+            else:
+                self._grow()
+        self._steps[n] = step
+        self._values[n] = value
+        self.size = n + 1
+
+    @property
+    def steps(self):
+        return self._steps[:self.size]
+
+    @property
+    def values(self):
+        return self._values[:self.size]
+
+    def __len__(self):
+        return self.size
+
+    def to_records(self):
+        """기존 list-of-dicts 형식으로 변환 (호환용)"""
+        return [{'step': int(s), 'profit': v.item()} for s, v in zip(self.steps, self.values)]
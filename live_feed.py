@@ -0,0 +1,235 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+import numpy as np
+
+from profiling import LatencyHistogram
+from tick_replay import UnitQuantizer, engine_stepper, iter_prices
+
+# 사용법:
+#   python live_feed.py --ticks 200000 --rate 50000          # 로컬 가격 서버(랜덤 워크) -> TCP -> V6 엔진, 지연 분위수 출력
+#   python live_feed.py --file ticks.bin --rate 0 --direct   # 틱 파일을 소켓 없이 바로 재생 (rate 0 = 최대 속도)
+#
+# 구조: source(가격 async iterator) -> reader task -> asyncio.Queue(maxsize) -> consumer task -> 엔진
+# - reader 는 틱마다 수신 시각(perf_counter_ns)을 찍고, 큐가 가득 차면 put 에서 대기 (backpressure:
+#   TCP 소스면 소켓 읽기도 멈춰서 송신측이 흐름 제어로 느려짐)
+# - consumer 는 큐에 쌓인 틱을 한 번에 꺼내(coalescing) UnitQuantizer 로 격자 이동으로 바꾼 뒤 엔진을 진행하고,
+#   yield_every 이동마다 이벤트 루프에 양보 (엔진 계산이 길어도 다른 task 가 멈추지 않음)
+# - conflate=True 면 꺼낸 묶음의 마지막 가격만 사용 (중간 왕복 이동은 버리고 지연을 우선)
+# - 지연 = 틱 수신 ~ 엔진 결정 완료. "push"(진입) / "pop"(청산) 은 결정 1건마다, "tick" 은 모든 틱마다 기록
+
+class LiveFeed:
+    """
+    비동기 가격 피드 -> 엔진 어댑터.
+    push / pop 지연은 BalancedBoxLogic 에서만 기록 (_close_head 호출 수로 청산을 셈). 다른 엔진은 tick 지연만 기록
+    """
+    def __init__(self, engine, unit_point=None, maxsize=1024, conflate=False, yield_every=256, anchor=None):
+        self.engine = engine
+        self.step = engine_stepper(engine)
+        self.quantizer = UnitQuantizer(unit_point if unit_point is not None else engine.unit_point, anchor)
+        self.maxsize = maxsize
+        self.conflate = conflate
+        self.yield_every = yield_every
+        self.latency = {"tick": LatencyHistogram(), "push": LatencyHistogram(), "pop": LatencyHistogram()}
+        self.ticks = 0       # 수신한 틱 수
+        self.moves = 0       # 엔진에 넣은 이동 수
+        self.batches = 0     # consumer 가 꺼낸 묶음 수
+        self.max_backlog = 0 # 한 번에 꺼낸 최대 틱 수
+        self.conflated = 0   # conflate 로 버린 틱 수
+        self._decisions = hasattr(engine, "_close_head") # BalancedBoxLogic
+        self._pops = 0
+        self._original_close = None
+
+    # --- [Decision Hook] ---
+
+    def _attach(self):
+        if not self._decisions: return
+        self._original_close = vars(self.engine).get("_close_head") # 프로파일러 등이 먼저 감싼 경우 그대로 복원
+        close = self.engine._close_head
+
+        def counted(queue):
+            self._pops += 1
+            return close(queue)
+        self.engine._close_head = counted
+
+    def _detach(self):
+        if not self._decisions: return
+        if self._original_close is None:
+            vars(self.engine).pop("_close_head", None)
+        else:
+            self.engine._close_head = self._original_close
+
+    # --- [Tasks] ---
+
+    async def run(self, source):
+        """source(가격 async iterable) 를 끝까지 소비. 반환: stats()"""
+        queue = asyncio.Queue(self.maxsize)
+        self._attach()
+        reader = asyncio.create_task(self._read(source, queue))
+        try:
+            await self._consume(queue)
+            await reader
+        finally:
+            reader.cancel()
+            self._detach()
+        return self.stats()
+
+    async def _read(self, source, queue):
+        clock = time.perf_counter_ns
+        try:
+            async for price in source:
+                await queue.put((clock(), price))
+        except Exception as e:
+            await queue.put(e) # source 오류는 consumer 쪽에서 다시 발생
+        else:
+            await queue.put(None) # 종료 표시
+
+    async def _consume(self, queue):
+        while True:
+            batch = [await queue.get()]
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+            end = batch[-1] if batch[-1] is None or isinstance(batch[-1], Exception) else False
+            if end is not False: batch.pop()
+            if batch: await self._process(batch)
+            if isinstance(end, Exception): raise end
+            if end is None: return
+
+    async def _process(self, batch):
+        self.batches += 1
+        self.ticks += len(batch)
+        self.max_backlog = max(self.max_backlog, len(batch))
+        stamps = np.fromiter((t for t, _ in batch), dtype=np.int64, count=len(batch))
+        used = batch
+        if self.conflate and len(batch) > 1:
+            self.conflated += len(batch) - 1
+            used = batch[-1:]
+        prices = np.fromiter((p for _, p in used), dtype=np.float64, count=len(used))
+
+        deltas = self.quantizer.deltas(prices)
+        counts = np.abs(deltas)
+        moves = np.repeat(np.sign(deltas), counts).tolist()
+        move_stamps = np.repeat(stamps[-len(used):], counts).tolist()
+        self.moves += len(moves)
+
+        engine, clock = self.engine, time.perf_counter_ns
+        push, pop = self.latency["push"], self.latency["pop"]
+        for i, (move, stamp) in enumerate(zip(moves, move_stamps), 1):
+            if self._decisions:
+                size, pops = len(engine.call_queue) + len(engine.put_queue), self._pops
+                self.step(move)
+                now = clock()
+                popped = self._pops - pops
+                pushed = len(engine.call_queue) + len(engine.put_queue) - size + popped
+                for _ in range(pushed): push.observe(now - stamp)
+                for _ in range(popped): pop.observe(now - stamp)
+            else:
+                self.step(move)
+            if i % self.yield_every == 0: await asyncio.sleep(0)
+
+        tick = self.latency["tick"]
+        now = clock()
+        for stamp in stamps.tolist():
+            tick.observe(now - stamp)
+
+    def stats(self):
+        return {"ticks": self.ticks, "moves": self.moves, "batches": self.batches, "max_backlog": self.max_backlog,
+                "conflated": self.conflated, "skipped": self.quantizer.skipped,
+                "latency": {name: h.as_dict() for name, h in self.latency.items()}}
+
+# --- [Sources] ---
+# 모든 source 는 가격(float)을 하나씩 내는 async iterator
+
+async def replay_source(prices, rate=None):
+    """가격 배열 / 틱 파일 경로(tick_replay.iter_prices) 재생. rate: 초당 틱 수 (None/0 = 최대 속도)"""
+    chunks = iter_prices(prices) if isinstance(prices, (str, os.PathLike)) else [np.asarray(prices, dtype=np.float64)]
+    interval = 1 / rate if rate else 0
+    start, sent = time.monotonic(), 0
+    for chunk in chunks:
+        for price in chunk.tolist():
+            if interval:
+                # 일정보다 앞서 있을 때만 대기 (뒤처지면 몰아서 전송 -> 버스트)
+                sent += 1
+                delay = start + sent * interval - time.monotonic()
+                if delay > 0: await asyncio.sleep(delay)
+            yield price
+
+def simulated_prices(ticks, start_price=1000.0, volatility=5.0, seed=0):
+    """정규 증분 랜덤 워크 가격 (volatility = 틱당 표준편차)"""
+    rng = np.random.default_rng(seed)
+    return start_price + np.cumsum(rng.normal(0.0, volatility, ticks))
+
+async def serve_prices(source_factory, host="127.0.0.1", port=0):
+    """
+    로컬 가격 피드 서버 (실제 피드 대신 오프라인 테스트용).
+    접속마다 source_factory() 의 가격을 한 줄에 하나씩 텍스트로 전송. port=0 이면 빈 포트 자동 선택
+    """
+    async def handle(reader, writer):
+        try:
+            async for price in source_factory():
+                writer.write(f"{price!r}\n".encode())
+                if writer.transport.get_write_buffer_size() > 1 << 16:
+                    await writer.drain() # 수신측이 느리면 여기서 대기
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    return await asyncio.start_server(handle, host, port)
+
+async def tcp_source(host, port):
+    """serve_prices 형식(한 줄에 가격 하나) TCP 피드"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        async for line in reader:
+            yield float(line)
+    finally:
+        writer.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="비동기 라이브 틱 피드 (로컬 재생/시뮬레이션 서버)")
+    parser.add_argument("--engine", choices=("v6", "logic"), default="v6")
+    parser.add_argument("--file", help="틱 파일 (.csv / 바이너리). 없으면 랜덤 워크")
+    parser.add_argument("--ticks", type=int, default=100_000, help="랜덤 워크 틱 수")
+    parser.add_argument("--volatility", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rate", type=float, default=50_000, help="초당 틱 수 (0 = 최대 속도)")
+    parser.add_argument("--unit-point", type=int, default=10)
+    parser.add_argument("--maxsize", type=int, default=1024, help="수신 큐 크기 (가득 차면 backpressure)")
+    parser.add_argument("--conflate", action="store_true", help="밀린 틱은 마지막 가격만 사용")
+    parser.add_argument("--direct", action="store_true", help="TCP 서버 없이 source 를 바로 연결")
+    args = parser.parse_args(argv)
+
+    if args.engine == "v6":
+        from logic_v6 import BalancedBoxLogic
+        engine = BalancedBoxLogic(verbose=False, unit_point=args.unit_point)
+    else:
+        from logic import BalanceBoxLogic
+        from event_log import OFF
+        engine = BalanceBoxLogic(unit_point=args.unit_point, log_level=OFF)
+    prices = args.file or simulated_prices(args.ticks, volatility=args.volatility, seed=args.seed)
+    factory = lambda: replay_source(prices, args.rate)
+
+    async def go():
+        feed = LiveFeed(engine, args.unit_point, args.maxsize, args.conflate)
+        if args.direct: return await feed.run(factory())
+        server = await serve_prices(factory)
+        async with server:
+            host, port = server.sockets[0].getsockname()[:2]
+            return await feed.run(tcp_source(host, port))
+
+    start = time.perf_counter()
+    stats = asyncio.run(go())
+    elapsed = time.perf_counter() - start
+    print(f"ticks {stats['ticks']}  moves {stats['moves']}  batches {stats['batches']}  "
+          f"max backlog {stats['max_backlog']}  conflated {stats['conflated']}  ({elapsed:.2f}s)")
+    for name, h in stats["latency"].items():
+        if not h["count"]: continue
+        print(f"{name:>5}: n {h['count']:>8d}  p50 <= {h['p50_ns'] / 1e3:,.0f}us  p99 <= {h['p99_ns'] / 1e3:,.0f}us  "
+              f"max {h['max_ns'] / 1e3:,.0f}us")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
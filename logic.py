@@ -1,102 +1,113 @@
-from collections import deque
-import time
+import numpy as np
+from positions import PositionQueue
+from directions import up_list
+from event_log import EventLog, TRADE, INFO
+from history import ProfitHistory
 
 class BalanceBoxLogic:
-    def __init__(self, box_size=2, unit_point=10, strategy_type="diff"):
+    def __init__(self, box_size=2, unit_point=10, strategy_type="diff", log_level=INFO, log_capacity=500,
+                 history_every=1, history_max_points=None):
         """
         strategy_type: 
             - "diff": Gap Balance (두 큐의 길이 '차이'가 box_size 이상이면 청산)
             - "fixed": Fixed Limit (각 큐의 '길이'가 box_size를 초과하면 청산)
+        log_level: event_log.OFF / TRADE / INFO (OFF 이면 로그 비용 거의 0)
+        history_every / history_max_points: 잔고 히스토리 다운샘플링 (history.ProfitHistory)
         """
         self.box_size = box_size
         self.unit_point = unit_point
         self.strategy_type = strategy_type
         
         # Data Structures
-        self.call_q = deque() # Queue for Call IDs
-        self.put_q = deque()  # Queue for Put IDs
-        self.manage_dict = {} # {ID: [Real, Virtual]}
+        # 정수 ID 링버퍼 (컬럼: Baseline, Virtual). 화면 표시용 ID 는 "C{id}" / "P{id}"
+        self.call_q = PositionQueue(("base", "virtual")) # Queue for Call IDs
+        self.put_q = PositionQueue(("base", "virtual"))  # Queue for Put IDs
+        
+        # Lazy Offset: 진입 이후 누적 이동량 = 현재 offset - 진입 시 baseline
+        self.call_offset = 0 # Call 측 누적 이동 (상승 +1, 하락 -1)
+        self.put_offset = 0  # Put 측 누적 이동 (상승 -1, 하락 +1)
+        self.call_base_sum = 0 # 보유 Call baseline 합계 (평가손익 O(1) 계산용)
+        self.put_base_sum = 0
         
         # State Variables
         self.total_profit = 0
-        self.c_counter = 0 # ID Generator
-        self.p_counter = 0
-        self.logs = []
-        self.history_balance = [0]
+        self.events = EventLog(log_capacity, log_level)
+        self.history = ProfitHistory(dtype=np.asarray(unit_point).dtype, every=history_every,
+                                     max_points=history_max_points)
+        self.history.record(0, 0)
         self.step_count = 0
+        self.risk = None # [NEW] 위험 지표 누적기 (risk.RiskTracker, 스텝마다 O(1) 갱신, Point 단위)
         
         # Init: Always start with 1 Call and 1 Put
         self._entry_call()
         self._entry_put()
-        self.add_log(f"🏁 초기화 완료 ({self.strategy_type}): Call 1개, Put 1개 진입")
+        self.add_log("🏁 초기화 완료 ({}): Call 1개, Put 1개 진입", self.strategy_type, level=TRADE)
+
+    def add_log(self, template, *payload, level=INFO, pos_id=None):
+        # 문자열 포맷은 화면 표시 시점에만 수행 (template.format(*payload, id=pos_id))
+        self.events.emit(level, "INFO", template, *payload, pos_id=pos_id)
 
-    def add_log(self, message):
-        timestamp = time.strftime("%H:%M:%S")
-        self.logs.insert(0, f"[{timestamp}] {message}") # Add to top
+    @property
+    def logs(self):
+        return self.events.lines() # 최신 로그가 맨 앞
 
     def _entry_call(self):
-        c_id = f"C{self.c_counter}"
-        self.call_q.append(c_id)
-        self.manage_dict[c_id] = [0, 0] # [Real, Virtual]
-        self.c_counter += 1
+        c_id = self.call_q.append(base=self.call_offset) # ID 는 큐가 순서대로 발급
+        self.call_base_sum += self.call_offset
         return c_id
 
     def _entry_put(self):
-        p_id = f"P{self.p_counter}"
-        self.put_q.append(p_id)
-        self.manage_dict[p_id] = [0, 0] # [Real, Virtual]
-        self.p_counter += 1
+        p_id = self.put_q.append(base=self.put_offset)
+        self.put_base_sum += self.put_offset
         return p_id
 
+    def _real_gain(self, queue, pos_id):
+        """진입 baseline 대비 해당 측 offset 변화량 = 실 증감량"""
+        offset = self.call_offset if queue is self.call_q else self.put_offset
+        return offset - queue.get("base", pos_id)
+
     def _update_gains(self, direction):
         # direction: 1 (Up), -1 (Down)
-        calls = list(self.call_q)
-        puts = list(self.put_q)
+        # Rule 4/5: Real Gain Update -> 포지션 순회 없이 offset만 이동 (O(1))
+        self.call_offset += direction
+        self.put_offset -= direction
 
         if direction == 1: # UP
-            # Rule 4: Real Gain Update
-            for c in calls: self.manage_dict[c][0] += 1
-            for p in puts:  self.manage_dict[p][0] -= 1
-            
-            # Rule 6: Virtual Gain Update (Head only)
-            if calls: 
-                self.manage_dict[calls[0]][1] += 1
-            if puts: 
-                # Decrease Virtual, but clamp at 0
-                curr = self.manage_dict[puts[0]][1]
-                self.manage_dict[puts[0]][1] = max(0, curr - 1)
-
+            gain_q, loss_q = self.call_q, self.put_q
         else: # DOWN
-            # Rule 5: Real Gain Update
-            for p in puts:  self.manage_dict[p][0] += 1
-            for c in calls: self.manage_dict[c][0] -= 1
-            
-            # Rule 6: Virtual Gain Update (Head only)
-            if puts: 
-                self.manage_dict[puts[0]][1] += 1
-            if calls:
-                # Decrease Virtual, but clamp at 0
-                curr = self.manage_dict[calls[0]][1]
-                self.manage_dict[calls[0]][1] = max(0, curr - 1)
+            gain_q, loss_q = self.put_q, self.call_q
+
+        # Rule 6: Virtual Gain Update (Head only)
+        if gain_q:
+            gain_q.add("virtual", gain_q[0], 1)
+        if loss_q:
+            # Decrease Virtual, but clamp at 0
+            head = loss_q[0]
+            loss_q.set("virtual", head, max(0, loss_q.get("virtual", head) - 1))
 
     def _try_pop(self, queue, queue_name):
         """Helper to pop from a specific queue if condition met"""
         if not queue: return False
         
         target_id = queue[0]
-        real_gain = self.manage_dict[target_id][0]
+        real_gain = self._real_gain(queue, target_id)
         
         # Rule 8: 실 증감량이 0 이상인 경우만 pop
         if real_gain >= 0:
             popped = queue.popleft()
-            profit_val = self.manage_dict[popped][0]
+            profit_val = real_gain
             self.total_profit += profit_val
-            del self.manage_dict[popped]
+            if queue is self.call_q:
+                self.call_base_sum -= queue.get("base", popped)
+            else:
+                self.put_base_sum -= queue.get("base", popped)
             
-            self.add_log(f"✂️ [청산-{queue_name}] {popped} 제거! 실현손익: {profit_val}")
+            self.add_log("✂️ [청산-{}] {}{id} 제거! 실현손익: {}", queue_name, queue_name[0], profit_val,
+                         level=TRADE, pos_id=popped)
             return True
         else:
-            self.add_log(f"⚠️ [대기-{queue_name}] 청산 조건이나 {target_id} 손실중({real_gain})이라 유지")
+            self.add_log("⚠️ [대기-{}] 청산 조건이나 {}{id} 손실중({})이라 유지", queue_name, queue_name[0], real_gain,
+                         pos_id=target_id)
             return False
 
     def _check_imbalance(self):
@@ -134,9 +145,9 @@ class BalanceBoxLogic:
         return False
 
     def next_step(self, direction):
+        direction = 1 if direction == 1 else -1 # 1 이외의 값은 전부 DOWN (offset 이동과 분기를 일치시킴)
         self.step_count += 1
-        dir_str = "상승 🔺" if direction == 1 else "하락 🔻"
-        self.add_log(f"Step {self.step_count}: {self.unit_point}Point {dir_str}")
+        self.add_log("Step {}: {}Point {}", self.step_count, self.unit_point, "상승 🔺" if direction == 1 else "하락 🔻")
         
         # 1. Update Gains
         self._update_gains(direction)
@@ -151,27 +162,130 @@ class BalanceBoxLogic:
         self._check_imbalance()
         
         # Record History
-        self.history_balance.append(self.total_profit * self.unit_point)
+        self.history.record(self.step_count, self.total_profit * self.unit_point)
+        if self.risk is not None:
+            self.risk.update((self.total_profit + self.get_unrealized_pnl()) * self.unit_point, len(self.call_q),
+                             len(self.put_q), 0)
+
+    def run(self, directions, record_every=1):
+        """
+        방향 배열(bool / +1,-1 / "UP","DOWN")을 한 번에 진행 (로그 없이 tight loop).
+        큐/수익/history 상태는 next_step 을 반복 호출한 것과 같습니다.
+        반환: {"step", "realized", "unrealized"} (Point 단위) - step_count 가 record_every 의 배수인 스텝 + 마지막 스텝
+        """
+        ups = up_list(directions)
+        n = len(ups)
+        size = n // record_every + 2
+        out_step = np.empty(size, dtype=np.int64)
+        out_realized = np.empty(size, dtype=np.asarray(self.unit_point).dtype)
+        out_unrealized = np.empty(size, dtype=out_realized.dtype)
+        rows = 0
+
+        call_q, put_q = self.call_q, self.put_q
+        history = self.history
+        unit, box_size = self.unit_point, self.box_size
+        diff_mode = self.strategy_type == "diff"
+        fixed_mode = self.strategy_type == "fixed"
+        call_offset, put_offset = self.call_offset, self.put_offset
+        step = self.step_count
+        risk = self.risk
+
+        for up in ups:
+            step += 1
+            # 1. Update Gains (Rule 4/5: offset, Rule 6: head 가상수익)
+            move = 1 if up else -1
+            call_offset += move
+            put_offset -= move
+            gain_q, loss_q = (call_q, put_q) if up else (put_q, call_q)
+            if gain_q:
+                gain_q.cols["virtual"][gain_q.first_id & gain_q.mask] += 1
+            if loss_q:
+                virtual = loss_q.cols["virtual"]
+                slot = loss_q.first_id & loss_q.mask
+                if virtual[slot] > 0: virtual[slot] -= 1
+
+            # 2. Push New Position
+            if up:
+                call_q.append(base=call_offset)
+                self.call_base_sum += call_offset
+            else:
+                put_q.append(base=put_offset)
+                self.put_base_sum += put_offset
+
+            # 3. Check Imbalance & Pop (Rule 8: 실 증감량 >= 0 인 head 만)
+            len_c, len_p = len(call_q), len(put_q)
+            if diff_mode:
+                if len_c - len_p >= box_size:
+                    base = call_q.cols["base"][call_q.first_id & call_q.mask]
+                    if call_offset - base >= 0:
+                        call_q.popleft()
+                        self.total_profit += call_offset - base
+                        self.call_base_sum -= base
+                elif len_p - len_c >= box_size:
+                    base = put_q.cols["base"][put_q.first_id & put_q.mask]
+                    if put_offset - base >= 0:
+                        put_q.popleft()
+                        self.total_profit += put_offset - base
+                        self.put_base_sum -= base
+            elif fixed_mode:
+                if len_c > box_size:
+                    base = call_q.cols["base"][call_q.first_id & call_q.mask]
+                    if call_offset - base >= 0:
+                        call_q.popleft()
+                        self.total_profit += call_offset - base
+                        self.call_base_sum -= base
+                if len_p > box_size:
+                    base = put_q.cols["base"][put_q.first_id & put_q.mask]
+                    if put_offset - base >= 0:
+                        put_q.popleft()
+                        self.total_profit += put_offset - base
+                        self.put_base_sum -= base
+
+            # Record History (저장 간격이 아닌 스텝은 record 해도 저장되지 않으므로 건너뜀)
+            if step % history.every == 0:
+                history.record(step, self.total_profit * unit)
+            if risk is not None:
+                risk.update((self.total_profit + len(call_q) * call_offset - self.call_base_sum
+                             + len(put_q) * put_offset - self.put_base_sum) * unit, len(call_q), len(put_q), 0)
+            if step % record_every == 0:
+                out_step[rows] = step
+                out_realized[rows] = self.total_profit * unit
+                out_unrealized[rows] = (len(call_q) * call_offset - self.call_base_sum
+                                        + len(put_q) * put_offset - self.put_base_sum) * unit
+                rows += 1
+
+        self.call_offset, self.put_offset = call_offset, put_offset
+        self.step_count = step
+        if n:
+            history.record(step, self.total_profit * unit)
+            if step % record_every:
+                out_step[rows] = step
+                out_realized[rows] = self.total_profit * unit
+                out_unrealized[rows] = self.get_unrealized_pnl() * unit
+                rows += 1
+        return {"step": out_step[:rows], "realized": out_realized[:rows], "unrealized": out_unrealized[:rows]}
+
+    @property
+    def history_balance(self):
+        """스텝별 잔고 (Point 단위) - zero-copy NumPy view"""
+        return self.history.values
 
     def get_queue_display_data(self):
         # Helper for UI Visualization
         c_list = []
         for i, cid in enumerate(self.call_q):
-            vals = self.manage_dict[cid]
-            c_list.append({"ID": cid, "Real": vals[0], "Virtual": vals[1], "IsHead": (i==0)})
+            c_list.append({"ID": f"C{cid}", "Real": self.call_offset - self.call_q.get("base", cid),
+                           "Virtual": self.call_q.get("virtual", cid), "IsHead": (i==0)})
             
         p_list = []
         for i, pid in enumerate(self.put_q):
-            vals = self.manage_dict[pid]
-            p_list.append({"ID": pid, "Real": vals[0], "Virtual": vals[1], "IsHead": (i==0)})
+            p_list.append({"ID": f"P{pid}", "Real": self.put_offset - self.put_q.get("base", pid),
+                           "Virtual": self.put_q.get("virtual", pid), "IsHead": (i==0)})
             
         return c_list, p_list
 
     def get_unrealized_pnl(self):
         """현재 큐에 보유 중인 모든 포지션의 평가 손익 합계 계산"""
-        unrealized_sum = 0
-        for cid in self.call_q:
-            unrealized_sum += self.manage_dict[cid][0] # Real Gain 누적
-        for pid in self.put_q:
-            unrealized_sum += self.manage_dict[pid][0] # Real Gain 누적
-        return unrealized_sum
\ No newline at end of file
+        # Σ(offset - baseline) = 개수 * offset - baseline 합계 (O(1))
+        return (len(self.call_q) * self.call_offset - self.call_base_sum
+                + len(self.put_q) * self.put_offset - self.put_base_sum)
\ No newline at end of file
@@ -0,0 +1,419 @@
+import collections
+import numpy as np
+from directions import up_list
+from event_log import EventLog, OFF, TRADE, INFO
+from history import ProfitHistory
+
+class ClampFloor:
+    """가상수익 clamp 기준점 (같은 floor를 공유하는 아이템 그룹)"""
+    __slots__ = ("value", "count", "parent")
+
+    def __init__(self, value):
+        self.value = value
+        self.count = 0
+        self.parent = None # 병합되면 더 오래된 floor를 가리킴
+
+class ProfitLedger:
+    """
+    한 쪽 큐(Call/Put)의 수익을 틱마다 순회하지 않고 지연 계산하는 장부.
+    - 실수익 = offset - base (base = 진입 시 offset - 초기수익)
+    - 가상수익 = offset - floor (floor = 진입 이후 offset의 최저값)
+      max(0, v - 1) clamp 는 '진입 이후 최저점 대비 상승폭'과 동일하므로,
+      하락으로 최저점이 갱신될 때만 floor 그룹을 병합합니다. (분할상환 O(1))
+    - 평가손익 합계 = count * offset - base_sum (push/pop 시에만 갱신)
+    - side: "Call" / "Put" (아이템 타입은 아이템마다 저장하지 않고 장부에서 읽음)
+    """
+    def __init__(self, side=None):
+        self.side = side
+        self.offset = 0
+        self.floors = collections.deque() # 오래된 그룹 -> 최신 그룹 (value 오름차순)
+        self.count = 0    # 보유 아이템 수
+        self.base_sum = 0 # 보유 아이템 base 합계
+
+    def move(self, step):
+        self.offset += step
+        if step >= 0: return
+        # 새 최저점: 현재 offset 이상인 floor 그룹들을 하나로 병합
+        survivor = None
+        while self.floors and self.floors[-1].value >= self.offset:
+            f = self.floors.pop()
+            if survivor is not None:
+                survivor.parent = f
+                f.count += survivor.count
+            survivor = f
+        if survivor is not None:
+            survivor.value = self.offset
+            self.floors.append(survivor)
+
+    def open(self, item, initial_profit):
+        item.base = self.offset - initial_profit
+        self.count += 1
+        self.base_sum += item.base
+        if self.floors and self.floors[-1].value == self.offset:
+            floor = self.floors[-1]
+        else:
+            floor = ClampFloor(self.offset)
+            self.floors.append(floor)
+        floor.count += 1
+        item.floor = floor
+
+    def close(self, item):
+        # 큐는 FIFO 이므로 청산되는 아이템은 항상 가장 오래된 그룹 소속
+        self.resolve(item).count -= 1
+        self.count -= 1
+        self.base_sum -= item.base
+        while self.floors and self.floors[0].count == 0:
+            self.floors.popleft()
+
+    def unrealized(self):
+        """보유 아이템 실수익 합계 (O(1))"""
+        return self.count * self.offset - self.base_sum
+
+    def positive_count(self):
+        """
+        실수익 또는 가상수익이 양수인 아이템 수 (O(1)).
+        초기수익 <= 0 이면 가상수익 >= 실수익 이므로 '가상수익 > 0' 인 아이템 수와 같고,
+        floor 가 현재 offset 과 같은 그룹(가장 최근 그룹만 가능)을 제외한 나머지가 전부 해당됩니다.
+        """
+        if self.floors and self.floors[-1].value == self.offset:
+            return self.count - self.floors[-1].count
+        return self.count
+
+    def resolve(self, item):
+        f = item.floor
+        while f.parent is not None:
+            f = f.parent
+        item.floor = f # path compression
+        return f
+
+class Item:
+    # [NEW] __slots__: 인스턴스 __dict__ 제거 (아이템 수만큼 쌓이는 객체라 메모리/속성 접근 비용 절감)
+    __slots__ = ("id", "entry_price", "state", "ledger", "base", "floor")
+
+    def __init__(self, item_id, entry_price, item_type, state="Recruit", initial_profit=0, ledger=None):
+        self.id = item_id
+        self.entry_price = entry_price
+        self.state = state          # Recruit, Combat, Wounded, Defeated
+        # [NEW] 실/가상 수익은 ledger 로부터 지연 계산 (초기 수익 설정 가능: 부상병 -2)
+        self.ledger = ledger if ledger is not None else ProfitLedger(item_type)
+        self.ledger.open(self, initial_profit)
+
+    @property
+    def item_type(self):
+        return self.ledger.side # "Call" or "Put"
+
+    @property
+    def real_profit(self):
+        return self.ledger.offset - self.base
+
+    @property
+    def virtual_profit(self):
+        return self.ledger.offset - self.ledger.resolve(self).value
+
+class BalancedBoxLogic:
+    LOG_ICONS = {"INFO": "📝", "PROFIT": "💰", "LOSS": "💥", "ENTRY": "➕", "REASON": "💡"}
+    LOG_LEVELS = {"INFO": INFO, "REASON": INFO, "PROFIT": TRADE, "LOSS": TRADE, "ENTRY": TRADE}
+
+    def __init__(self, verbose=True, unit_point=10, start_price=1000.0, log_level=None, log_capacity=500,
+                 history_every=1, history_max_points=None):
+        self.call_queue = collections.deque()
+        self.put_queue = collections.deque()
+        self.call_ledger = ProfitLedger("Call")
+        self.put_ledger = ProfitLedger("Put")
+        
+        self.wounded_pool = collections.deque()
+        self.defeated_pool = collections.deque()
+        self.next_recruit_id = 0
+        
+        self.unit_point = unit_point # 1스텝당 가격 변동폭
+        self.current_price = start_price
+        self.total_realized_profit = 0
+        self.last_direction = None 
+        self.verbose = verbose
+        # [NEW] 고정 크기 구조화 로그 (verbose=False 이면 OFF, log_level 로 세부 조절)
+        if log_level is None: log_level = INFO if verbose else OFF
+        self.events = EventLog(log_capacity, log_level, self.LOG_ICONS)
+        
+        # [NEW] 수익 그래프를 위한 히스토리 데이터 (columnar, steps/values 는 NumPy view)
+        # 초기 상태: 0 profit
+        self.profit_history = ProfitHistory(every=history_every, max_points=history_max_points)
+        self.profit_history.record(0, 0)
+        self.step_count = 0
+        
+        # 단계별 실행을 위한 상태 변수
+        self.pending_direction = None
+        self.execution_phase = 0  # 0:Idle, 1:Update, 2:Reversal, 3:Entry, 4:Balance
+
+        # [NEW] 위험 지표 누적기 (risk.RiskTracker, 턴 종료마다 O(1) 갱신. None 이면 비용 없음)
+        self.risk = None
+
+        # 초기 세팅
+        self.initialize_queues()
+
+    def log(self, template, *payload, category="INFO", pos_id=None):
+        # 문자열 포맷은 화면 표시 시점에만 수행 (template.format(*payload, id=pos_id))
+        self.events.emit(self.LOG_LEVELS[category], category, template, *payload, pos_id=pos_id)
+
+    @property
+    def logs(self):
+        return self.events.lines()
+
+    def record_profit(self):
+        # 현재 스텝의 누적 수익 저장
+        # 중복 스텝 방지: 이미 현재 스텝 기록이 있다면 업데이트, 없으면 추가
+        self.profit_history.record(self.step_count, self.total_realized_profit)
+
+    def get_soldier_id(self):
+        if self.wounded_pool: 
+            return self.wounded_pool.popleft(), "🚑부상병"
+        elif self.defeated_pool: 
+            return self.defeated_pool.popleft(), "🎖️패잔병"
+        else:
+            new_id = self.next_recruit_id
+            self.next_recruit_id += 1
+            return new_id, "👶신병"
+
+    def initialize_queues(self):
+        if not self.call_queue:
+            cid, _ = self.get_soldier_id()
+            self.call_queue.append(Item(cid, self.current_price, "Call", "Combat", ledger=self.call_ledger))
+            self.log("🏁 초기 세팅: Call Item(0) 투입", category="ENTRY", pos_id=cid)
+        if not self.put_queue:
+            pid, _ = self.get_soldier_id()
+            self.put_queue.append(Item(pid, self.current_price, "Put", "Combat", ledger=self.put_ledger))
+            self.log("🏁 초기 세팅: Put Item(0) 투입", category="ENTRY", pos_id=pid)
+
+    def get_unrealized_profit(self):
+        return self.call_ledger.unrealized() + self.put_ledger.unrealized()
+
+    def can_enter(self, queue):
+        if not queue: return True, "초기 진입 허용"
+        # 양수 아이템이 하나라도 있으면 가상수익이 가장 큰 head 가 항상 첫 번째 해당 아이템
+        if queue[0].ledger.positive_count() == 0:
+            return False, "양수 수익(실/가상)인 아이템 없음"
+        item = queue[0]
+        if item.real_profit > 0:
+            return True, f"ID({item.item_type[0]}{item.id})의 실수익({item.real_profit}) > 0"
+        return True, f"ID({item.item_type[0]}{item.id})의 가상수익({item.virtual_profit}) > 0"
+
+    def _close_head(self, queue):
+        # head 청산 (로그/히스토리 기록 없음): 손실이면 부상병, 이익이면 패잔병 풀로
+        item = queue.popleft()
+        item.ledger.close(item)
+        if item.real_profit < 0:
+            item.state = "Wounded"
+            self.wounded_pool.appendleft(item.id)
+        else:
+            item.state = "Defeated"
+            self.defeated_pool.append(item.id)
+            # [Logic] 부상병이 -2에서 시작했으므로, 여기서 더해지는 item.real_profit은
+            # 이미 페널티가 반영된 최종 수익입니다. (별도 차감 불필요)
+            self.total_realized_profit += item.real_profit
+        return item
+
+    def pop_item(self, queue, reason, *reason_args):
+        # reason 은 로그 template (reason_args 로 지연 포맷)
+        if not queue: return
+        item = self._close_head(queue)
+        
+        if item.state == "Wounded":
+            if self.events.enabled(TRADE):
+                self.log("POP(손실): {}{id} (R:{}) -> 부상병 이동 || 사유: " + reason,
+                         item.item_type, item.real_profit, *reason_args, category="LOSS", pos_id=item.id)
+        else:
+            if self.events.enabled(TRADE):
+                self.log("POP(이익): {}{id} (R:{}) -> 이익 확정 || 사유: " + reason,
+                         item.item_type, item.real_profit, *reason_args, category="PROFIT", pos_id=item.id)
+        
+        # Pop 발생 시 수익 기록 업데이트 (중요: 실현 손익 변화 시점)
+        self.record_profit()
+
+    # --- [단계별 실행 함수들] ---
+
+    # [Phase 1] 가격 및 수익 업데이트
+    def step_1_update_profits(self):
+        direction = self.pending_direction
+        is_up = (direction == "UP")
+        price_change = self.unit_point if is_up else -self.unit_point
+        self.current_price += price_change
+        
+        self.step_count += 1 # 스텝 증가
+        
+        # 수익 계산 logic (아이템 순회 없이 양쪽 ledger 만 이동)
+        if is_up:
+            self.call_ledger.move(1)
+            self.put_ledger.move(-1)
+        else:
+            self.call_ledger.move(-1)
+            self.put_ledger.move(1)
+                
+        self.log("가격 변동: {} {} (현재가: {})", "🔺" if is_up else "🟦", direction, self.current_price)
+        self.log("전체 아이템의 실/가상 수익이 업데이트 되었습니다.")
+
+    # [Phase 2] 장 역전 체크
+    def step_2_handle_reversal(self):
+        direction = self.pending_direction
+        if self.last_direction is None or self.last_direction == direction:
+            self.log("장 흐름 유지됨 (역전 아님) -> 특별 조치 없음", category="REASON")
+            return
+
+        is_up = (direction == "UP")
+        self.log("🔄 장 역전 감지! ({} -> {})", self.last_direction, direction, category="REASON")
+        
+        count = 0
+        if not is_up: # UP -> DOWN
+            while self.call_queue and self.call_queue[0].real_profit > 0:
+                self.pop_item(self.call_queue, "장 역전(하락반전)으로 인한 Call 수익청산")
+                count += 1
+        else: # DOWN -> UP
+            while self.put_queue and self.put_queue[0].real_profit > 0:
+                self.pop_item(self.put_queue, "장 역전(상승반전)으로 인한 Put 수익청산")
+                count += 1
+        
+        if count == 0:
+            self.log("장 역전되었으나, 즉시 청산할 수익 아이템이 없습니다.", category="REASON")
+
+    # [Phase 3] 신규 진입 (Push)
+    def step_3_entry(self):
+        direction = self.pending_direction
+        is_up = (direction == "UP")
+        
+        target_queue = self.call_queue if is_up else self.put_queue
+        target_ledger = self.call_ledger if is_up else self.put_ledger
+        queue_name = "Call" if is_up else "Put"
+        
+        can_enter, reason = self.can_enter(target_queue)
+        
+        if can_enter:
+            sid, origin = self.get_soldier_id()
+            
+            # [NEW] 부상병일 경우 초기 수익 -2 설정
+            initial_p = -2 if origin == "🚑부상병" else 0
+            
+            new_item = Item(sid, self.current_price, queue_name, "Combat", initial_profit=initial_p, ledger=target_ledger)
+            target_queue.append(new_item)
+            
+            if initial_p < 0:
+                self.log("{} 진입 성공 (ID:{id}, {}) [패널티 적용: {}] || 근거: {}",
+                         queue_name, origin, initial_p, reason, category="ENTRY", pos_id=sid)
+            else:
+                self.log("{} 진입 성공 (ID:{id}, {}) || 근거: {}", queue_name, origin, reason, category="ENTRY", pos_id=sid)
+        else:
+            self.log("{} 진입 실패 (대기) || 사유: {}", queue_name, reason, category="REASON")
+
+    # [Phase 4] 균형 조절 (Pop)
+    def step_4_balance(self):
+        direction = self.pending_direction
+        is_up = (direction == "UP")
+        
+        # 1. 수량 균형
+        while len(self.call_queue) >= len(self.put_queue) + 2:
+            self.pop_item(self.call_queue, "Call({}) > Put({}) + 2 (수량과다)", len(self.call_queue), len(self.put_queue))
+        
+        while len(self.put_queue) >= len(self.call_queue) + 2:
+            self.pop_item(self.put_queue, "Put({}) > Call({}) + 2 (수량과다)", len(self.put_queue), len(self.call_queue))
+
+        # 2. 방향성 제한
+        if not is_up: # 하락장
+             while len(self.call_queue) > len(self.put_queue):
+                 self.pop_item(self.call_queue, "하락장에서 Call 큐가 Put 큐보다 김 (방향성 위배)")
+        if is_up: # 상승장
+            while len(self.put_queue) > len(self.call_queue):
+                self.pop_item(self.put_queue, "상승장에서 Put 큐가 Call 큐보다 김 (방향성 위배)")
+        
+        self.log("균형 조절(Balancing) 완료")
+        
+        # 턴 종료 처리
+        self.last_direction = direction
+        self.pending_direction = None
+        self.record_profit() # 턴 종료시 기록
+        if self.risk is not None:
+            self.risk.update(self.total_realized_profit + self.get_unrealized_profit(), len(self.call_queue),
+                             len(self.put_queue), len(self.wounded_pool))
+
+    def full_step_auto(self, direction):
+        # 몬테카를로/자동실행 용 (로그 없이 한방에 실행)
+        # direction: "UP" / "DOWN" 또는 bool / +1,-1 (방향 행렬 값을 그대로 전달 가능)
+        if not isinstance(direction, str): # np.str_ 등 str 하위 클래스도 문자열로 처리
+            direction = "UP" if direction > 0 else "DOWN"
+        self.pending_direction = direction
+        self.step_1_update_profits()
+        self.step_2_handle_reversal()
+        self.step_3_entry()
+        self.step_4_balance()
+
+    def run(self, directions, record_every=1):
+        """
+        방향 배열(bool / +1,-1 / "UP","DOWN")을 한 번에 진행 (단계별 로그 없이 tight loop).
+        큐/수익/가격/profit_history 상태는 full_step_auto 를 반복 호출한 것과 같습니다.
+        반환: {"step", "realized", "unrealized"} - step_count 가 record_every 의 배수인 스텝 + 마지막 스텝
+        """
+        ups = up_list(directions)
+        n = len(ups)
+        size = n // record_every + 2
+        out_step = np.empty(size, dtype=np.int64)
+        out_realized = np.empty(size, dtype=np.int64)
+        out_unrealized = np.empty(size, dtype=np.int64)
+        rows = 0
+
+        call_q, put_q = self.call_queue, self.put_queue
+        call_ledger, put_ledger = self.call_ledger, self.put_ledger
+        history = self.profit_history
+        close = self._close_head
+        unit = self.unit_point
+        risk, wounded = self.risk, self.wounded_pool
+        last = None if self.last_direction is None else self.last_direction == "UP"
+        step = self.step_count
+
+        for up in ups:
+            # [Phase 1] 가격 및 수익 업데이트
+            self.current_price += unit if up else -unit
+            step += 1
+            self.step_count = step
+            call_ledger.move(1 if up else -1)
+            put_ledger.move(-1 if up else 1)
+
+            # [Phase 2] 장 역전: 반대쪽 큐의 실수익 > 0 head 청산
+            if last is not None and last != up:
+                queue = put_q if up else call_q
+                while queue and queue[0].real_profit > 0:
+                    close(queue)
+
+            # [Phase 3] 신규 진입 (can_enter 와 같은 조건)
+            queue, ledger = (call_q, call_ledger) if up else (put_q, put_ledger)
+            if not queue or ledger.positive_count() != 0:
+                sid, origin = self.get_soldier_id()
+                queue.append(Item(sid, self.current_price, ledger.side, "Combat",
+                                  initial_profit=-2 if origin == "🚑부상병" else 0, ledger=ledger))
+
+            # [Phase 4] 균형 조절 (수량 균형 -> 방향성 제한)
+            while len(call_q) >= len(put_q) + 2: close(call_q)
+            while len(put_q) >= len(call_q) + 2: close(put_q)
+            if up:
+                while len(put_q) > len(call_q): close(put_q)
+            else:
+                while len(call_q) > len(put_q): close(call_q)
+            last = up
+
+            # 턴 종료 기록 (저장 간격이 아닌 스텝은 record 해도 저장되지 않으므로 건너뜀)
+            if step % history.every == 0:
+                history.record(step, self.total_realized_profit)
+            if risk is not None:
+                risk.update(self.total_realized_profit + call_ledger.unrealized() + put_ledger.unrealized(),
+                            len(call_q), len(put_q), len(wounded))
+            if step % record_every == 0:
+                out_step[rows] = step
+                out_realized[rows] = self.total_realized_profit
+                out_unrealized[rows] = call_ledger.unrealized() + put_ledger.unrealized()
+                rows += 1
+
+        if n:
+            history.record(step, self.total_realized_profit)
+            self.last_direction = "UP" if last else "DOWN"
+            self.pending_direction = None
+            if step % record_every:
+                out_step[rows] = step
+                out_realized[rows] = self.total_realized_profit
+                out_unrealized[rows] = call_ledger.unrealized() + put_ledger.unrealized()
+                rows += 1
+        return {"step": out_step[:rows], "realized": out_realized[:rows], "unrealized": out_unrealized[:rows]}
@@ -0,0 +1,143 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+from event_log import OFF
+from logic import BalanceBoxLogic
+from logic_v6 import BalancedBoxLogic
+
+ENGINES = ("v6", "logic")
+
+def case_directions(seed, case_ids, steps, p_up=0.5, antithetic=False):
+    """
+    케이스별 독립 시드 스트림으로 방향 행렬 생성 (True = UP).
+    시드는 (master seed, case id) 로만 결정되므로 청크 분할/워커 수와 무관하게 항상 같은 경로가 나옵니다.
+    antithetic=True: 케이스 2k / 2k+1 이 같은 난수 u 를 u / 1-u 로 나눠 씀 (p_up=0.5 이면 UP/DOWN 이 정확히 뒤집힌 쌍)
+    """
+    directions = np.empty((len(case_ids), steps), dtype=bool)
+    for row, case_id in enumerate(case_ids):
+        case_id = int(case_id)
+        stream = case_id // 2 if antithetic else case_id
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(stream,)))
+        u = rng.random(steps)
+        if antithetic and case_id % 2: u = 1.0 - u
+        directions[row] = u < p_up
+    return directions
+
+def simulate_chunk(engine, case_ids, steps, seed, p_up=0.5, engine_params=None, antithetic=False):
+    """
+    워커 프로세스에서 실행되는 단위 작업.
+    반환: (len(case_ids) x steps) 누적 실현 수익 행렬
+      - "v6": BalancedBoxLogic.full_step_auto 의 total_realized_profit
+      - "logic": BalanceBoxLogic.next_step 의 total_profit (Point 단위 = total_profit * unit_point)
+    """
+    return simulate_paths(engine, case_directions(seed, case_ids, steps, p_up, antithetic), engine_params)
+
+def simulate_paths(engine, directions, engine_params=None):
+    """
+    주어진 (cases x steps) 방향 행렬로 실행 (같은 행렬을 여러 엔진에 주면 common random numbers)
+    directions: bool 행렬 또는 directions.PackedDirections (행 단위로 풀어서 사용)
+    """
+    params = engine_params or {}
+    if hasattr(directions, "row"):
+        rows = (directions.row(i) for i in range(len(directions)))
+    else:
+        directions = np.asarray(directions, dtype=bool)
+        rows = iter(directions)
+    profits = np.empty(directions.shape, dtype=np.int64)
+
+    for row, path in enumerate(rows):
+        if engine == "v6":
+            profits[row] = BalancedBoxLogic(verbose=False).run(path)["realized"]
+        elif engine == "logic":
+            # 로그는 호출자가 log_level 을 주지 않으면 끔 (틱마다 이벤트 기록/포맷 비용 없음)
+            sim = BalanceBoxLogic(**{"log_level": OFF, **params})
+            realized = sim.run(path)["realized"]
+            # run() 은 Point 단위 -> total_profit 단위(박스 수)로 환산
+            if realized.dtype.kind in "iu": profits[row] = realized // sim.unit_point
+            else: profits[row] = np.rint(realized / sim.unit_point)
+        else:
+            raise ValueError(f"Unknown engine: {engine} (choose from {ENGINES})")
+    return profits
+
+class MonteCarloRunner:
+    """
+    케이스를 청크로 나누어 ProcessPoolExecutor 로 병렬 실행하는 헤드리스 MC 러너.
+    - 같은 (engine, cases, steps, seed, p_up, engine_params, antithetic) 이면 워커 수와 무관하게 결과가 비트 단위로 동일
+    - iter_chunks(): 완료된 청크를 순서대로 흘려보냄 (진행률 표시용)
+    - cancel(): 대기중인 청크를 취소하고 스트리밍 중단
+    """
+    def __init__(self, engine="v6", cases=100, steps=500, seed=0, p_up=0.5,
+                 workers=None, chunk_size=None, engine_params=None, antithetic=False):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine} (choose from {ENGINES})")
+        self.engine = engine
+        self.cases = cases
+        self.steps = steps
+        self.seed = seed
+        self.p_up = p_up
+        self.workers = workers
+        self.chunk_size = chunk_size or max(1, min(64, cases // 8))
+        self.engine_params = engine_params or {}
+        self.antithetic = antithetic
+        self._cancelled = threading.Event()
+
+    def chunks(self):
+        return [range(start, min(start + self.chunk_size, self.cases))
+                for start in range(0, self.cases, self.chunk_size)]
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def iter_chunks(self):
+        """(case_ids, profits) 를 완료되는 순서대로 yield"""
+        chunks = self.chunks()
+        args = (self.steps, self.seed, self.p_up, self.engine_params, self.antithetic)
+
+        # 워커 1개면 프로세스 풀 없이 현재 프로세스에서 실행 (결과 동일)
+        if self.workers == 1:
+            for case_ids in chunks:
+                if self.cancelled: return
+                yield case_ids, simulate_chunk(self.engine, list(case_ids), *args)
+            return
+
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            futures = {executor.submit(simulate_chunk, self.engine, list(case_ids), *args): case_ids
+                       for case_ids in chunks}
+            for future in as_completed(futures):
+                if self.cancelled: return
+                yield futures[future], future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def run(self, on_progress=None):
+        """
+        전체 (cases x steps) 수익 행렬 반환. 취소되면 완료된 케이스만 채워지고 나머지 행은 0.
+        on_progress(done_cases, total_cases) 콜백으로 진행률 전달
+        """
+        profits = np.zeros((self.cases, self.steps), dtype=np.int64)
+        done = 0
+        for case_ids, block in self.iter_chunks():
+            profits[case_ids.start:case_ids.stop] = block
+            done += len(case_ids)
+            if on_progress: on_progress(done, self.cases)
+        return profits
+
+    def aggregate(self, aggregator=None, on_progress=None):
+        """
+        run() 과 같지만 전체 행렬 대신 mc_stats.StreamingAggregator 에 청크를 흘려보냄 (메모리 O(steps))
+        """
+        if aggregator is None:
+            from mc_stats import StreamingAggregator
+            aggregator = StreamingAggregator(self.steps, seed=self.seed)
+        done = 0
+        for case_ids, block in self.iter_chunks():
+            aggregator.add(case_ids, block)
+            done += len(case_ids)
+            if on_progress: on_progress(done, self.cases)
+        return aggregator
@@ -0,0 +1,150 @@
+import argparse
+import statistics
+import sys
+import time
+import numpy as np
+
+from mc_runner import case_directions, simulate_paths
+
+# 사용법:
+#   python mc_sequential.py --target 5 --time-budget 30           # 평균 최종 수익의 95% CI 반폭 <= 5
+#   python mc_sequential.py --engine logic:fixed --quantile 0.05 --target 20
+# 케이스 수를 미리 정하지 않고, 신뢰구간 반폭이 목표 이하가 되거나 시간/케이스 한도에 닿을 때까지
+# 배치 단위로 경로를 추가합니다. 케이스 id 는 0, 1, 2, ... 순서로 이어지므로 같은 seed 면 결과가 재현됩니다.
+
+class SequentialResult:
+    def __init__(self, estimate, halfwidth, cases, elapsed, reason, finals, trace):
+        self.estimate = estimate   # 평균 (또는 분위수) 추정치
+        self.halfwidth = halfwidth # 신뢰구간 반폭
+        self.cases = cases
+        self.elapsed = elapsed
+        self.reason = reason       # "precision" / "time" / "max_cases" / "cancelled"
+        self.finals = finals       # 케이스별 최종 수익 (O(cases) 스칼라만 보관)
+        self.trace = trace         # [(cases, estimate, halfwidth)] 배치마다
+
+    @property
+    def ci(self):
+        return self.estimate - self.halfwidth, self.estimate + self.halfwidth
+
+    def as_dict(self):
+        low, high = self.ci
+        return {"estimate": self.estimate, "halfwidth": self.halfwidth, "ci_low": low, "ci_high": high,
+                "cases": self.cases, "elapsed": self.elapsed, "reason": self.reason}
+
+def mean_interval(samples, z):
+    """(평균, z * 표준오차)"""
+    n = len(samples)
+    if n < 2: return float(np.mean(samples)) if n else 0.0, float("inf")
+    return float(samples.mean()), float(z * samples.std(ddof=1) / np.sqrt(n))
+
+def quantile_interval(samples, q, z):
+    """
+    (분위수, 반폭) - 분포 가정 없는 순서통계량 구간.
+    순위 n q ± z sqrt(n q (1 - q)) 의 두 값 사이를 구간으로 보고 그 절반을 반폭으로 사용
+    """
+    n = len(samples)
+    if n < 2: return float(np.mean(samples)) if n else 0.0, float("inf")
+    ordered = np.sort(samples)
+    spread = z * np.sqrt(n * q * (1 - q))
+    low = int(np.floor(n * q - spread))
+    high = int(np.ceil(n * q - 1 + spread))
+    if low < 0 or high > n - 1: return float(np.quantile(ordered, q)), float("inf")
+    return float(np.quantile(ordered, q)), float((ordered[high] - ordered[low]) / 2)
+
+def simulate_block(engine, case_ids, steps, seed, p_up=0.5, engine_params=None, antithetic=False):
+    """(len(case_ids) x steps) 누적 실현 수익 ("v6" 는 배치 엔진, 결과는 BalancedBoxLogic 과 동일)"""
+    directions = case_directions(seed, case_ids, steps, p_up, antithetic)
+    if engine == "v6":
+        from batch_logic import run_batch
+        return run_batch(directions)
+    return simulate_paths(engine, directions, engine_params)
+
+def run_sequential(engine="v6", steps=500, target=5.0, quantile=None, confidence=0.95, seed=0, p_up=0.5,
+                   engine_params=None, antithetic=False, batch=64, min_cases=64, max_cases=100_000,
+                   time_budget=None, on_batch=None, on_block=None, should_stop=None):
+    """
+    신뢰구간 반폭 <= target 이 될 때까지 batch 개씩 케이스를 추가.
+    - quantile=None: 평균 최종 수익, quantile=q: q 분위수
+    - 다음 배치 크기 = 현재 분산으로 예측한 필요 케이스 수 - 현재 케이스 수 (batch 이상, 현재 케이스 수 이하)
+      -> 정밀도에 가까우면 작은 배치로 바로 멈추고, 멀면 최대 2배씩 늘림
+    - antithetic=True: (2k, 2k+1) 쌍 평균을 표본으로 사용 (평균 모드 전용)
+    - 시간 한도가 있으면 지금까지의 케이스당 소요 시간으로 남은 시간 안에 끝날 만큼만 배치를 잡음
+    - on_batch(result): 배치마다 중간 결과 전달 (진행률 표시), should_stop(): True 면 중단
+    - on_block(case_ids, block): 배치의 (케이스 x steps) 수익 행렬 전달 (예: mc_stats.StreamingAggregator.add)
+    """
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+    if antithetic: batch += batch % 2
+    start = time.monotonic()
+    finals = np.empty(0, dtype=np.int64)
+    trace = []
+    reason = "max_cases"
+    estimate, halfwidth = 0.0, float("inf")
+    size = max(batch, min_cases)
+
+    while len(finals) < max_cases:
+        size = min(size, max_cases - len(finals))
+        case_ids = range(len(finals), len(finals) + size)
+        block = simulate_block(engine, case_ids, steps, seed, p_up, engine_params, antithetic)
+        if on_block: on_block(case_ids, block)
+        finals = np.concatenate([finals, block[:, -1]])
+
+        samples = finals.astype(np.float64)
+        if antithetic and quantile is None:
+            samples = samples[:len(samples) // 2 * 2].reshape(-1, 2).mean(axis=1)
+        if quantile is None:
+            estimate, halfwidth = mean_interval(samples, z)
+        else:
+            estimate, halfwidth = quantile_interval(samples, quantile, z)
+        trace.append((len(finals), estimate, halfwidth))
+        elapsed = time.monotonic() - start
+
+        if on_batch: on_batch(SequentialResult(estimate, halfwidth, len(finals), elapsed, None, finals, trace))
+        if halfwidth <= target:
+            reason = "precision"
+            break
+        if time_budget is not None and elapsed >= time_budget:
+            reason = "time"
+            break
+        if should_stop is not None and should_stop():
+            reason = "cancelled"
+            break
+
+        # 반폭 ~ 1/sqrt(n) 로 필요한 케이스 수 예측
+        if np.isfinite(halfwidth) and halfwidth > 0:
+            needed = int(np.ceil(len(finals) * (halfwidth / target) ** 2))
+        else:
+            needed = 2 * len(finals)
+        size = min(max(needed - len(finals), batch), len(finals))
+        if time_budget is not None:
+            per_case = elapsed / len(finals)
+            size = min(size, max(batch, int((time_budget - elapsed) / per_case)))
+        if antithetic: size += size % 2
+
+    return SequentialResult(estimate, halfwidth, len(finals), time.monotonic() - start, reason, finals, trace)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="신뢰구간 기반 조기 종료 Monte Carlo")
+    parser.add_argument("--engine", default="v6", help="v6 / logic[:strategy[:box_size]]")
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--target", type=float, default=5.0, help="목표 신뢰구간 반폭")
+    parser.add_argument("--quantile", type=float, help="평균 대신 이 분위수의 구간 사용 (예: 0.05)")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--p-up", type=float, default=0.5)
+    parser.add_argument("--antithetic", action="store_true")
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--max-cases", type=int, default=100_000)
+    parser.add_argument("--time-budget", type=float, help="초 단위 시간 한도")
+    args = parser.parse_args(argv)
+
+    from mc_variance import parse_engine
+    _, engine, params = parse_engine(args.engine)
+    report = lambda r: print(f"{r.cases:>8d} cases  {r.estimate:>10.2f} ± {r.halfwidth:<8.2f} ({r.elapsed:.1f}s)")
+    result = run_sequential(engine, args.steps, args.target, args.quantile, args.confidence, args.seed, args.p_up,
+                            params, args.antithetic, args.batch, args.batch, args.max_cases, args.time_budget,
+                            on_batch=report)
+    print(f"stop: {result.reason}  ->  {result.estimate:.2f} ± {result.halfwidth:.2f} ({result.cases} cases)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+import numpy as np
+
+# Monte Carlo 경로를 전부 저장하지 않고 스텝별 통계만 누적하는 스트리밍 집계기.
+# - mean / variance: Welford (청크 단위는 Chan 병렬 결합)
+# - min / max: 누적 비교
+# - 분위수: P² 알고리즘 (Jain & Chlamtac) 을 스텝 축으로 벡터화 -> 분위수당 마커 5개 x steps
+# - 표시용 원본 경로: case id 로 정해지는 우선순위 키가 가장 작은 k 개 (도착 순서와 무관한 reservoir)
+# 메모리는 O(steps) (+ sample_size x steps) 이고 케이스 수와 무관합니다.
+
+class P2Quantiles:
+    """
+    스텝별 분위수 근사 (P² 알고리즘, 분위수 x 스텝 전체를 한 번에 갱신).
+    처음 5개 관측치는 그대로 보관했다가 마커 초기값으로 사용 (그 전에는 정확한 분위수 반환)
+    """
+    def __init__(self, steps, quantiles=(0.05, 0.5, 0.95)):
+        self.quantiles = tuple(quantiles)
+        p = np.asarray(self.quantiles, dtype=np.float64)[:, None]
+        shape = (len(self.quantiles), 5, steps)
+        self.heights = np.zeros(shape)
+        self.positions = np.zeros(shape)
+        self.desired = np.broadcast_to(np.hstack([np.zeros_like(p), 2 * p, 4 * p, 2 + 2 * p, np.full_like(p, 4)])[:, :, None],
+                                       shape).copy()
+        self.increments = np.hstack([np.zeros_like(p), p / 2, p, (1 + p) / 2, np.ones_like(p)])[:, :, None]
+        self.count = 0
+        self._initial = []
+
+    def add(self, x):
+        """한 경로 (steps,) 추가"""
+        x = np.asarray(x, dtype=np.float64)
+        self.count += 1
+        if self.count <= 5:
+            self._initial.append(x)
+            if self.count == 5:
+                self.heights[:] = np.sort(np.stack(self._initial), axis=0)[None]
+                self.positions[:] = np.arange(5, dtype=np.float64)[None, :, None]
+                self._initial = []
+            return
+
+        q, n = self.heights, self.positions
+        # 1. x 가 들어갈 칸 k (q[k] <= x < q[k+1]) 과 양 끝 마커 갱신
+        k = (q[:, 1:4] <= x).sum(axis=1)
+        np.minimum(q[:, 0], x, out=q[:, 0])
+        np.maximum(q[:, 4], x, out=q[:, 4])
+        n[:, 1:] += np.arange(1, 5)[None, :, None] > k[:, None, :]
+        self.desired += self.increments
+
+        # 2. 가운데 마커 3개를 원하는 위치 쪽으로 최대 1칸 이동 (포물선 보간, 범위를 벗어나면 선형)
+        for i in (1, 2, 3):
+            d = self.desired[:, i] - n[:, i]
+            right = n[:, i + 1] - n[:, i]
+            left = n[:, i - 1] - n[:, i]
+            move = np.where((d >= 1) & (right > 1), 1.0, np.where((d <= -1) & (left < -1), -1.0, 0.0))
+            if not move.any(): continue
+            qi, ql, qr = q[:, i], q[:, i - 1], q[:, i + 1]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                parabolic = qi + move / (right - left) * ((-left + move) * (qr - qi) / right
+                                                          + (right - move) * (qi - ql) / -left)
+                neighbor_q = np.where(move > 0, qr, ql)
+                neighbor_n = np.where(move > 0, right, left)
+                linear = qi + move * (neighbor_q - qi) / neighbor_n
+            new = np.where((ql < parabolic) & (parabolic < qr), parabolic, linear)
+            q[:, i] = np.where(move != 0, new, qi)
+            n[:, i] += move
+
+    def values(self):
+        """(분위수 개수 x steps) 현재 추정치"""
+        if self.count == 0:
+            return np.full(self.heights[:, 0].shape, np.nan)
+        if self.count < 5:
+            return np.quantile(np.stack(self._initial), self.quantiles, axis=0)
+        return self.heights[:, 2].copy()
+
+class StreamingAggregator:
+    """
+    경로(케이스)별 누적 수익 행을 받아 스텝별 통계를 갱신하는 집계기.
+    - add(case_ids, block): (len(case_ids) x steps) 블록 추가 (MonteCarloRunner.iter_chunks 출력 그대로)
+    - mean / variance / std / minimum / maximum / quantiles(): 스텝별 배열
+    - sample(): 표시용 원본 경로 (case id, 경로) 최대 sample_size 개
+    """
+    def __init__(self, steps, quantiles=(0.05, 0.5, 0.95), sample_size=20, seed=0):
+        self.steps = steps
+        self.count = 0
+        self.mean = np.zeros(steps)
+        self._m2 = np.zeros(steps)
+        self.minimum = np.full(steps, np.inf)
+        self.maximum = np.full(steps, -np.inf)
+        self.p2 = P2Quantiles(steps, quantiles)
+        self.sample_size = sample_size
+        self.seed = seed
+        self._sample = {} # case id -> (key, path)
+
+    def _sample_key(self, case_id):
+        # case id 로만 정해지는 난수 키 -> 청크 도착 순서/워커 수와 무관하게 같은 표본
+        return np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(int(case_id), 1))).random()
+
+    def add(self, case_ids, block):
+        block = np.asarray(block, dtype=np.float64)
+        if block.ndim == 1: block = block[None, :]
+        m = len(block)
+        if m == 0: return
+
+        # Welford / Chan 결합
+        block_mean = block.mean(axis=0)
+        block_m2 = ((block - block_mean) ** 2).sum(axis=0)
+        total = self.count + m
+        delta = block_mean - self.mean
+        self.mean += delta * (m / total)
+        self._m2 += block_m2 + delta ** 2 * (self.count * m / total)
+        self.count = total
+        np.minimum(self.minimum, block.min(axis=0), out=self.minimum)
+        np.maximum(self.maximum, block.max(axis=0), out=self.maximum)
+
+        for row in block:
+            self.p2.add(row)
+
+        if self.sample_size:
+            for case_id, row in zip(case_ids, block):
+                key = self._sample_key(case_id)
+                if len(self._sample) < self.sample_size:
+                    self._sample[case_id] = (key, row.copy())
+                    continue
+                worst = max(self._sample, key=lambda c: self._sample[c][0])
+                if key < self._sample[worst][0]:
+                    del self._sample[worst]
+                    self._sample[case_id] = (key, row.copy())
+
+    @property
+    def variance(self):
+        return self._m2 / self.count if self.count else np.zeros(self.steps)
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    def quantiles(self):
+        """{분위수: 스텝별 추정치}"""
+        return dict(zip(self.p2.quantiles, self.p2.values()))
+
+    def sample(self):
+        """[(case id, 경로)] case id 순"""
+        return [(c, self._sample[c][1]) for c in sorted(self._sample)]
+
+    def bands(self):
+        """차트용 열 이름 -> 스텝별 배열 (mean, min, max, p5/p50/p95 ...)"""
+        out = {"mean": self.mean, "min": self.minimum, "max": self.maximum}
+        for q, values in self.quantiles().items():
+            out[f"p{q * 100:g}"] = values
+        return out
+
+    def final(self):
+        """마지막 스텝 요약 (평균/최고/최저)"""
+        if not self.count: return {"mean": 0.0, "max": 0.0, "min": 0.0, "std": 0.0}
+        return {"mean": float(self.mean[-1]), "max": float(self.maximum[-1]),
+                "min": float(self.minimum[-1]), "std": float(self.std[-1])}
+
+def summarize(profits):
+    """(paths x steps) 누적 실현 수익 -> 최종 수익 요약 통계 (cli 출력 / result_store 요약 컬럼)"""
+    return summarize_final(profits[:, -1] if profits.size else np.zeros(0), profits.shape[0], profits.shape[1])
+
+def summarize_final(final, paths, steps):
+    """최종 수익 열만으로 summarize 와 같은 요약 (수익 행렬 없이 스트리밍 저장할 때: result_store.RunWriter)"""
+    if final.size == 0: final = np.zeros(1)
+    q5, q50, q95 = np.quantile(final, (0.05, 0.5, 0.95))
+    return {"paths": int(paths), "steps": int(steps), "mean": float(final.mean()),
+            "std": float(final.std()), "min": int(final.min()), "p5": float(q5), "p50": float(q50),
+            "p95": float(q95), "max": int(final.max())}
@@ -0,0 +1,175 @@
+import argparse
+import sys
+import numpy as np
+
+from mc_runner import case_directions, simulate_paths
+
+# 사용법:
+#   python mc_variance.py --engines v6 logic:diff logic:fixed --paths 2000 --steps 500 --antithetic --control
+# 분산 감소 (variance reduction) 기법으로 전략/엔진 비교에 필요한 경로 수를 줄입니다.
+# - common random numbers (CRN): 모든 엔진을 같은 방향 행렬로 실행 -> 차이는 경로별 paired difference 로 추정
+# - antithetic: 경로 2k / 2k+1 을 u / 1-u 로 만든 쌍으로 실행 (mc_runner.case_directions(antithetic=True))
+#   주의: p_up=0.5 에서 박스 전략은 Call/Put 대칭이라 뒤집힌 경로의 손익이 같거나 거의 같습니다.
+#   쌍이 양의 상관이 되어 ESS 가 오히려 줄어들 수 있으니 ESS 로 확인하고 쓰세요.
+# - control variate: 랜덤 워크의 기댓값을 아는 통계량 (변위, 변위 제곱, 방향 전환 횟수 등) 으로 회귀 보정
+# 모든 추정치는 ESS (effective sample size) = 경로 1개의 분산 / 추정치 분산 을 함께 보고합니다.
+# (독립 경로 n 개를 평균한 plain 추정이면 ESS == n, ESS / n 이 분산 감소 배율)
+
+class Estimate:
+    """평균 추정치 + 표준오차 + ESS"""
+    def __init__(self, mean, stderr, n, ess, method):
+        self.mean = mean
+        self.stderr = stderr
+        self.n = n          # 사용한 경로 수
+        self.ess = ess      # 같은 표준오차를 plain MC 로 얻는 데 필요한 독립 경로 수
+        self.method = method
+
+    @property
+    def speedup(self):
+        return self.ess / self.n if self.n else 0.0
+
+    def ci(self, z=1.96):
+        return self.mean - z * self.stderr, self.mean + z * self.stderr
+
+    def as_dict(self):
+        low, high = self.ci()
+        return {"method": self.method, "mean": self.mean, "stderr": self.stderr, "ci_low": low, "ci_high": high,
+                "n": self.n, "ess": self.ess, "speedup": self.speedup}
+
+def _estimate(samples, unit_var, n, method):
+    # samples: 서로 독립인 추정 단위 (경로, 경로 쌍 평균, 보정된 잔차 등)
+    m = len(samples)
+    if m < 2:
+        return Estimate(float(np.mean(samples)) if m else 0.0, float("nan"), n, float(m), method)
+    est_var = samples.var(ddof=1) / m
+    ess = unit_var / est_var if est_var > 0 else float("inf")
+    return Estimate(float(samples.mean()), float(np.sqrt(est_var)), n, float(ess), method)
+
+# --- [Controls] ---
+
+def walk_controls(directions, p_up=0.5):
+    """
+    기댓값을 아는 랜덤 워크 통계량 (cases x 4) 와 그 기댓값.
+    - 최종 변위 S_n                  : E = n (2p - 1)
+    - 변위 누적합 Σ_t S_t (경로 면적) : E = (2p - 1) n (n + 1) / 2
+    - S_n 제곱                       : E = 4 n p (1 - p) + (n (2p - 1))^2
+    - 방향 전환 횟수                  : E = 2 (n - 1) p (1 - p)
+    박스 전략의 손익은 UP/DOWN 대칭이라 홀함수인 앞의 두 개와는 거의 무상관이고,
+    짝함수인 뒤의 두 개 (특히 방향 전환 횟수) 가 실제 분산을 줄입니다.
+    """
+    up = np.asarray(directions, dtype=bool)
+    moves = np.where(up, 1, -1)
+    n = moves.shape[1]
+    drift = 2 * p_up - 1
+    position = moves.sum(axis=1)
+    area = (moves * np.arange(n, 0, -1)).sum(axis=1) # Σ_t S_t = Σ_i move_i * (n - i)
+    reversals = (up[:, 1:] != up[:, :-1]).sum(axis=1)
+    controls = np.stack([position, area, position.astype(np.float64) ** 2, reversals], axis=1).astype(np.float64)
+    expected = np.array([drift * n, drift * n * (n + 1) / 2, 4 * n * p_up * (1 - p_up) + (drift * n) ** 2,
+                         2 * (n - 1) * p_up * (1 - p_up)])
+    return controls, expected
+
+# --- [Estimators] ---
+
+def estimate(y, antithetic=False, controls=None, expected=None):
+    """
+    경로별 값 y 의 평균 추정.
+    - antithetic=True: y[2k], y[2k+1] 이 antithetic 쌍 (쌍 평균을 독립 표본으로 사용)
+    - controls / expected: control variate 보정 y - (C - E[C]) beta, beta 는 최소제곱 추정
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    unit_var = y.var(ddof=1) if n > 1 else 0.0
+    method = []
+    if antithetic:
+        pairs = n // 2
+        y = y[:2 * pairs].reshape(pairs, 2).mean(axis=1)
+        if controls is not None:
+            controls = np.asarray(controls, dtype=np.float64)[:2 * pairs].reshape(pairs, 2, -1).mean(axis=1)
+        method.append("antithetic")
+    if controls is not None:
+        centered = np.asarray(controls, dtype=np.float64) - expected
+        # 분산이 0 인 control (예: p_up=0.5 antithetic 쌍의 평균 변위 = 0) 은 제외
+        usable = centered.std(axis=0) > 0
+        if usable.any() and len(y) > usable.sum() + 1:
+            c = centered[:, usable]
+            design = np.column_stack([np.ones(len(y)), c])
+            beta = np.linalg.lstsq(design, y, rcond=None)[0][1:]
+            y = y - c @ beta
+        method.append("control")
+    return _estimate(y, unit_var, n, "+".join(method) or "plain")
+
+def paired_difference(ya, yb, antithetic=False, controls=None, expected=None):
+    """
+    같은 경로 (CRN) 로 실행한 두 결과의 평균 차이 E[A - B].
+    ESS 는 독립 경로로 따로 돌렸을 때의 분산 (Var A + Var B) 기준
+    """
+    ya = np.asarray(ya, dtype=np.float64)
+    yb = np.asarray(yb, dtype=np.float64)
+    est = estimate(ya - yb, antithetic, controls, expected)
+    if len(ya) > 1 and est.stderr > 0:
+        independent_var = ya.var(ddof=1) + yb.var(ddof=1)
+        est.ess = independent_var / est.stderr ** 2
+    est.method = "crn" if est.method == "plain" else "crn+" + est.method
+    return est
+
+# --- [Runs] ---
+
+def parse_engine(spec):
+    """'v6' / 'logic' / 'logic:fixed' / 'logic:diff:3' -> (label, engine, params)"""
+    from event_log import OFF
+    name, *rest = spec.split(":")
+    if name == "v6": return spec, "v6", {}
+    if name != "logic": raise ValueError(f"Unknown engine: {spec}")
+    params = {"log_level": OFF}
+    if rest: params["strategy_type"] = rest[0]
+    if len(rest) > 1: params["box_size"] = int(rest[1])
+    return spec, "logic", params
+
+def final_profits(engine, directions, engine_params=None):
+    """경로별 최종 누적 실현 수익 (v6 는 배치 엔진, 결과는 BalancedBoxLogic 과 동일)"""
+    if engine == "v6":
+        from batch_logic import run_batch
+        return run_batch(directions)[:, -1]
+    return simulate_paths(engine, directions, engine_params)[:, -1]
+
+def compare(specs, cases=1000, steps=500, seed=0, p_up=0.5, antithetic=False, control=False):
+    """
+    모든 엔진을 같은 방향 행렬 (CRN) 로 실행.
+    반환: {"engines": {label: Estimate}, "differences": {(a, b): Estimate}}  (차이는 specs[0] 기준)
+    """
+    directions = case_directions(seed, range(cases), steps, p_up, antithetic)
+    controls, expected = walk_controls(directions, p_up) if control else (None, None)
+    runs = {}
+    for spec in specs:
+        label, engine, params = parse_engine(spec) if isinstance(spec, str) else spec
+        runs[label] = final_profits(engine, directions, params)
+
+    engines = {label: estimate(y, antithetic, controls, expected) for label, y in runs.items()}
+    labels = list(runs)
+    differences = {(labels[0], other): paired_difference(runs[labels[0]], runs[other], antithetic, controls, expected)
+                   for other in labels[1:]}
+    return {"engines": engines, "differences": differences}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="분산 감소 MC 비교 (CRN / antithetic / control variate)")
+    parser.add_argument("--engines", nargs="+", default=["logic:diff", "logic:fixed"],
+                        help="v6 / logic[:strategy[:box_size]] (첫 번째가 비교 기준)")
+    parser.add_argument("--paths", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--p-up", type=float, default=0.5)
+    parser.add_argument("--antithetic", action="store_true")
+    parser.add_argument("--control", action="store_true", help="랜덤 워크 control variate 보정")
+    args = parser.parse_args(argv)
+
+    result = compare(args.engines, args.paths, args.steps, args.seed, args.p_up, args.antithetic, args.control)
+    fmt = "{:28s} {:>10.2f} ± {:<8.2f} ESS {:>10.0f} ({:.1f}x, {})"
+    for label, est in result["engines"].items():
+        print(fmt.format(label, est.mean, est.stderr, est.ess, est.speedup, est.method))
+    for (a, b), est in result["differences"].items():
+        print(fmt.format(f"{a} - {b}", est.mean, est.stderr, est.ess, est.speedup, est.method))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
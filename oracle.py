@@ -0,0 +1,345 @@
+import collections
+import numpy as np
+
+# Differential checker: 빠른 엔진(candidate)을 기준 구현(reference)과 틱 단위로 비교합니다.
+# 기준 구현 = 최적화 이전(baseline 64aede1) 규칙을 그대로 옮겨 고정한 아래 Reference* 클래스
+# (로그 출력만 뺐고 수익/큐/풀 규칙은 원본 그대로. 엔진을 고쳐도 이 파일의 규칙은 바꾸지 않습니다)
+# - V6: ReferenceBalancedBoxLogic  <- logic_v6.BalancedBoxLogic (full_step_auto / run) / batch_logic.run_batch
+# - logic.py: ReferenceBalanceBoxLogic  <- logic.BalanceBoxLogic (next_step / run)
+
+class Mismatch(AssertionError):
+    def __init__(self, tick, field, expected, actual, case=None):
+        self.tick, self.field, self.expected, self.actual, self.case = tick, field, expected, actual, case
+        where = f"case {case}, " if case is not None else ""
+        super().__init__(f"[{where}tick {tick}] {field}: expected {expected!r}, got {actual!r}")
+
+# --- [Reference: V6 (baseline app.py BalancedBoxLogic)] ---
+
+class ReferenceItem:
+    def __init__(self, item_id, entry_price, item_type, state="Recruit", initial_profit=0):
+        self.id = item_id
+        self.entry_price = entry_price
+        self.item_type = item_type
+        self.state = state
+        self.real_profit = initial_profit
+        self.virtual_profit = 0
+
+class ReferenceBalancedBoxLogic:
+    """아이템마다 실/가상수익을 매 틱 직접 갱신하는 원본 V6 규칙 (O(큐 길이) / 틱)"""
+    def __init__(self):
+        self.call_queue = collections.deque()
+        self.put_queue = collections.deque()
+        self.wounded_pool = collections.deque()
+        self.defeated_pool = collections.deque()
+        self.next_recruit_id = 0
+        self.current_price = 1000.0
+        self.total_realized_profit = 0
+        self.last_direction = None
+        self.step_count = 0
+        self.pending_direction = None
+        self.initialize_queues()
+
+    def get_soldier_id(self):
+        if self.wounded_pool:
+            return self.wounded_pool.popleft(), "wounded"
+        elif self.defeated_pool:
+            return self.defeated_pool.popleft(), "defeated"
+        else:
+            new_id = self.next_recruit_id
+            self.next_recruit_id += 1
+            return new_id, "recruit"
+
+    def initialize_queues(self):
+        if not self.call_queue:
+            cid, _ = self.get_soldier_id()
+            self.call_queue.append(ReferenceItem(cid, self.current_price, "Call", "Combat"))
+        if not self.put_queue:
+            pid, _ = self.get_soldier_id()
+            self.put_queue.append(ReferenceItem(pid, self.current_price, "Put", "Combat"))
+
+    def get_unrealized_profit(self):
+        return sum(i.real_profit for i in self.call_queue) + sum(i.real_profit for i in self.put_queue)
+
+    def can_enter(self, queue):
+        if not queue: return True
+        for item in queue:
+            if item.real_profit > 0: return True
+            if item.virtual_profit > 0: return True
+        return False
+
+    def pop_item(self, queue):
+        if not queue: return
+        item = queue.popleft()
+        if item.real_profit < 0:
+            item.state = "Wounded"
+            self.wounded_pool.appendleft(item.id)
+        else:
+            item.state = "Defeated"
+            self.defeated_pool.append(item.id)
+            self.total_realized_profit += item.real_profit
+
+    def step_1_update_profits(self):
+        is_up = (self.pending_direction == "UP")
+        self.current_price += 10 if is_up else -10
+        self.step_count += 1
+        if is_up:
+            for i in self.call_queue:
+                i.real_profit += 1
+                i.virtual_profit += 1
+            for i in self.put_queue:
+                i.real_profit -= 1
+                i.virtual_profit = max(0, i.virtual_profit - 1) if i.virtual_profit > 0 else 0
+        else:
+            for i in self.call_queue:
+                i.real_profit -= 1
+                i.virtual_profit = max(0, i.virtual_profit - 1) if i.virtual_profit > 0 else 0
+            for i in self.put_queue:
+                i.real_profit += 1
+                i.virtual_profit += 1
+
+    def step_2_handle_reversal(self):
+        direction = self.pending_direction
+        if self.last_direction is None or self.last_direction == direction: return
+        if direction != "UP":
+            while self.call_queue and self.call_queue[0].real_profit > 0:
+                self.pop_item(self.call_queue)
+        else:
+            while self.put_queue and self.put_queue[0].real_profit > 0:
+                self.pop_item(self.put_queue)
+
+    def step_3_entry(self):
+        is_up = (self.pending_direction == "UP")
+        target_queue = self.call_queue if is_up else self.put_queue
+        if self.can_enter(target_queue):
+            sid, origin = self.get_soldier_id()
+            initial_p = -2 if origin == "wounded" else 0
+            target_queue.append(ReferenceItem(sid, self.current_price, "Call" if is_up else "Put", "Combat",
+                                              initial_profit=initial_p))
+
+    def step_4_balance(self):
+        is_up = (self.pending_direction == "UP")
+        while len(self.call_queue) >= len(self.put_queue) + 2:
+            self.pop_item(self.call_queue)
+        while len(self.put_queue) >= len(self.call_queue) + 2:
+            self.pop_item(self.put_queue)
+        if not is_up:
+            while len(self.call_queue) > len(self.put_queue):
+                self.pop_item(self.call_queue)
+        if is_up:
+            while len(self.put_queue) > len(self.call_queue):
+                self.pop_item(self.put_queue)
+        self.last_direction = self.pending_direction
+        self.pending_direction = None
+
+    def full_step_auto(self, direction):
+        self.pending_direction = direction
+        self.step_1_update_profits()
+        self.step_2_handle_reversal()
+        self.step_3_entry()
+        self.step_4_balance()
+
+# --- [Reference: logic.py (baseline BalanceBoxLogic)] ---
+
+class ReferenceBalanceBoxLogic:
+    """포지션마다 [Real, Virtual] 을 dict 에 두고 매 틱 전부 갱신하는 원본 logic.py 규칙"""
+    def __init__(self, box_size=2, unit_point=10, strategy_type="diff"):
+        self.box_size = box_size
+        self.unit_point = unit_point
+        self.strategy_type = strategy_type
+        self.call_q = collections.deque()
+        self.put_q = collections.deque()
+        self.manage_dict = {} # {ID: [Real, Virtual]}
+        self.total_profit = 0
+        self.c_counter = 0
+        self.p_counter = 0
+        self.history_balance = [0]
+        self.step_count = 0
+        self._entry_call()
+        self._entry_put()
+
+    def _entry_call(self):
+        c_id = f"C{self.c_counter}"
+        self.call_q.append(c_id)
+        self.manage_dict[c_id] = [0, 0]
+        self.c_counter += 1
+
+    def _entry_put(self):
+        p_id = f"P{self.p_counter}"
+        self.put_q.append(p_id)
+        self.manage_dict[p_id] = [0, 0]
+        self.p_counter += 1
+
+    def _update_gains(self, direction):
+        calls = list(self.call_q)
+        puts = list(self.put_q)
+        if direction == 1:
+            for c in calls: self.manage_dict[c][0] += 1
+            for p in puts: self.manage_dict[p][0] -= 1
+            if calls:
+                self.manage_dict[calls[0]][1] += 1
+            if puts:
+                self.manage_dict[puts[0]][1] = max(0, self.manage_dict[puts[0]][1] - 1)
+        else:
+            for p in puts: self.manage_dict[p][0] += 1
+            for c in calls: self.manage_dict[c][0] -= 1
+            if puts:
+                self.manage_dict[puts[0]][1] += 1
+            if calls:
+                self.manage_dict[calls[0]][1] = max(0, self.manage_dict[calls[0]][1] - 1)
+
+    def _try_pop(self, queue):
+        if not queue: return False
+        if self.manage_dict[queue[0]][0] >= 0:
+            popped = queue.popleft()
+            self.total_profit += self.manage_dict[popped][0]
+            del self.manage_dict[popped]
+            return True
+        return False
+
+    def _check_imbalance(self):
+        if self.strategy_type == "diff":
+            diff = len(self.call_q) - len(self.put_q)
+            if abs(diff) >= self.box_size:
+                return self._try_pop(self.call_q if diff > 0 else self.put_q)
+        elif self.strategy_type == "fixed":
+            popped_any = False
+            if len(self.call_q) > self.box_size:
+                if self._try_pop(self.call_q): popped_any = True
+            if len(self.put_q) > self.box_size:
+                if self._try_pop(self.put_q): popped_any = True
+            return popped_any
+        return False
+
+    def next_step(self, direction):
+        self.step_count += 1
+        self._update_gains(direction)
+        if direction == 1:
+            self._entry_call()
+        else:
+            self._entry_put()
+        self._check_imbalance()
+        self.history_balance.append(self.total_profit * self.unit_point)
+
+    def get_queue_display_data(self):
+        c_list = [{"ID": cid, "Real": self.manage_dict[cid][0], "Virtual": self.manage_dict[cid][1], "IsHead": i == 0}
+                  for i, cid in enumerate(self.call_q)]
+        p_list = [{"ID": pid, "Real": self.manage_dict[pid][0], "Virtual": self.manage_dict[pid][1], "IsHead": i == 0}
+                  for i, pid in enumerate(self.put_q)]
+        return c_list, p_list
+
+    def get_unrealized_pnl(self):
+        return sum(self.manage_dict[pos_id][0] for queue in (self.call_q, self.put_q) for pos_id in queue)
+
+# --- [State Snapshots] ---
+
+def v6_state(sim):
+    """BalancedBoxLogic 의 관측 가능한 상태 전부"""
+    items = lambda q: [(i.id, i.real_profit, i.virtual_profit) for i in q]
+    return {
+        "call_queue": items(sim.call_queue),
+        "put_queue": items(sim.put_queue),
+        "wounded_pool": list(sim.wounded_pool),
+        "defeated_pool": list(sim.defeated_pool),
+        "next_recruit_id": sim.next_recruit_id,
+        "total_realized_profit": sim.total_realized_profit,
+        "unrealized_profit": sim.get_unrealized_profit(),
+        "current_price": sim.current_price,
+        "last_direction": sim.last_direction,
+        "step_count": sim.step_count,
+    }
+
+def logic_state(sim):
+    """BalanceBoxLogic 의 관측 가능한 상태 전부"""
+    calls, puts = sim.get_queue_display_data()
+    return {
+        "call_q": calls,
+        "put_q": puts,
+        "total_profit": sim.total_profit,
+        "unrealized_pnl": sim.get_unrealized_pnl(),
+        "step_count": sim.step_count,
+    }
+
+def _compare(tick, expected, actual, case=None):
+    for field, value in expected.items():
+        if actual.get(field) != value:
+            raise Mismatch(tick, field, value, actual.get(field), case)
+
+# --- [Checkers] ---
+
+def verify_engine(reference, candidate, directions, step, state, candidate_step=None, candidate_state=None):
+    """
+    두 엔진에 같은 방향열을 넣으며 매 틱 state() 를 비교. 처음 어긋난 틱에서 Mismatch 발생.
+    반환: 검증한 틱 수
+    """
+    candidate_step = candidate_step or step
+    candidate_state = candidate_state or state
+    _compare(0, state(reference), candidate_state(candidate))
+    for tick, up in enumerate(np.asarray(directions, dtype=bool).tolist(), start=1):
+        step(reference, up)
+        candidate_step(candidate, up)
+        _compare(tick, state(reference), candidate_state(candidate))
+    return len(directions)
+
+def v6_step(sim, up):
+    sim.full_step_auto("UP" if up else "DOWN")
+
+def logic_step(sim, up):
+    sim.next_step(1 if up else -1)
+
+def verify_run(reference, candidate, directions, step, state, realized, unrealized, chunk=257):
+    """
+    candidate.run() 을 chunk 틱씩 호출하며 기준 구현과 비교.
+    run() 반환 배열(틱별 실현/평가 손익)은 매 틱, state() 는 chunk 경계마다 비교.
+    realized / unrealized: 기준 구현 -> 같은 단위의 값 (logic.py 는 Point 단위)
+    """
+    directions = np.asarray(directions, dtype=bool)
+    _compare(0, state(reference), state(candidate))
+    for start in range(0, len(directions), chunk):
+        block = directions[start:start + chunk]
+        out = candidate.run(block)
+        for i, up in enumerate(block.tolist()):
+            step(reference, up)
+            tick = start + i + 1
+            _compare(tick, {"step": tick, "realized": realized(reference), "unrealized": unrealized(reference)},
+                     {"step": int(out["step"][i]), "realized": out["realized"][i].item(),
+                      "unrealized": out["unrealized"][i].item()})
+        _compare(start + len(block), state(reference), state(candidate))
+    return len(directions)
+
+def verify_v6(candidate, directions, **kwargs):
+    """candidate: BalancedBoxLogic 과 같은 API 를 가진 엔진 인스턴스 (full_step_auto 로 진행)"""
+    return verify_engine(ReferenceBalancedBoxLogic(), candidate, directions, v6_step, v6_state, **kwargs)
+
+def verify_v6_run(candidate, directions, chunk=257):
+    """candidate.run(directions) 를 chunk 단위로 호출해 기준 구현과 비교"""
+    return verify_run(ReferenceBalancedBoxLogic(), candidate, directions, v6_step, v6_state,
+                      lambda r: r.total_realized_profit, lambda r: r.get_unrealized_profit(), chunk)
+
+def verify_logic(candidate, directions, box_size=2, unit_point=10, strategy_type="diff", **kwargs):
+    """candidate: BalanceBoxLogic 과 같은 API 를 가진 엔진 인스턴스 (같은 파라미터로 생성, next_step 으로 진행)"""
+    reference = ReferenceBalanceBoxLogic(box_size, unit_point, strategy_type)
+    return verify_engine(reference, candidate, directions, logic_step, logic_state, **kwargs)
+
+def verify_logic_run(candidate, directions, box_size=2, unit_point=10, strategy_type="diff", chunk=257):
+    """candidate.run(directions) 를 chunk 단위로 호출해 기준 구현과 비교 (run 반환값은 Point 단위)"""
+    reference = ReferenceBalanceBoxLogic(box_size, unit_point, strategy_type)
+    return verify_run(reference, candidate, directions, logic_step, logic_state,
+                      lambda r: r.total_profit * r.unit_point, lambda r: r.get_unrealized_pnl() * r.unit_point, chunk)
+
+def verify_batch_v6(directions, run=None):
+    """
+    배치 엔진 결과((cases x steps) 누적 실현 수익)를 케이스별 기준 구현과 비교.
+    run: 방향 행렬 -> 수익 행렬 함수 (기본: batch_logic.run_batch)
+    """
+    if run is None:
+        from batch_logic import run_batch as run
+    directions = np.atleast_2d(np.asarray(directions, dtype=bool))
+    realized = run(directions)
+    for case, path in enumerate(directions):
+        sim = ReferenceBalancedBoxLogic()
+        for tick, up in enumerate(path.tolist()):
+            v6_step(sim, up)
+            if sim.total_realized_profit != realized[case, tick]:
+                raise Mismatch(tick + 1, "total_realized_profit", sim.total_realized_profit,
+                               int(realized[case, tick]), case)
+    return directions.size
@@ -0,0 +1,138 @@
+from collections import defaultdict
+import numpy as np
+
+# BalanceBoxLogic 의 실현 손익 분포를 몬테카를로 대신 동적계획법(DP)으로 전파합니다.
+#
+# 압축 상태 = (call 실수익 tuple, call 개수, put 실수익 tuple, put 개수)
+# - 실수익은 '진입 이후 이동량' 이므로 절대 가격/ID 와 무관 (평행이동 불변)
+# - 한 스텝에 큐당 최대 1개만 청산되므로, 남은 스텝이 R 이면 각 큐의 앞쪽 R 개만
+#   앞으로의 청산에 관여합니다. 그보다 깊은 포지션은 개수만 남기고 값은 버려도 결과가 정확합니다.
+#   (horizon 이 끝에 가까울수록 상태가 합쳐짐)
+# - 상태 전이는 (state, direction) 으로 memoize
+# 주의: 큐 안의 실수익 배열은 경로마다 거의 다르기 때문에(큐 길이가 스텝 수에 비례해 늘어남)
+# 정확한 상태 수는 스텝 수에 대해 지수적으로 늘어납니다. 정확한 분포는 수십 스텝 이내에서만 현실적이며,
+# 그 이상은 eps / max_states 로 확률이 작은 상태를 잘라내는 truncated 모드로 동작합니다.
+# 잘린 확률 질량(lost_mass)을 함께 보고하므로 cdf_bounds() 로 참값의 상/하한을 알 수 있습니다.
+
+class PnLDistribution:
+    """
+    실현 손익 값(오름차순)과 확률. lost_mass = truncation 으로 버린 확률 질량
+    (mean / std / quantile 은 남은 질량으로 정규화한 값)
+    """
+    def __init__(self, values, probs, lost_mass=0.0):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.probs = np.asarray(probs, dtype=np.float64)
+        self.lost_mass = lost_mass
+
+    def mean(self):
+        total = self.probs.sum()
+        return float(self.values @ self.probs / total) if total else 0.0
+
+    def std(self):
+        total = self.probs.sum()
+        if not total: return 0.0
+        mu = self.mean()
+        return float(np.sqrt(((self.values - mu) ** 2) @ self.probs / total))
+
+    def cdf(self, x):
+        """P(PnL <= x)"""
+        return float(self.probs[self.values <= x].sum())
+
+    def cdf_bounds(self, x):
+        """truncation 을 감안한 P(PnL <= x) 의 (하한, 상한)"""
+        low = self.cdf(x)
+        return low, min(1.0, low + self.lost_mass)
+
+    def quantile(self, q):
+        cum = np.cumsum(self.probs) / self.probs.sum()
+        return float(self.values[min(np.searchsorted(cum, q - 1e-12), len(cum) - 1)])
+
+    def as_dict(self):
+        return dict(zip(self.values.tolist(), self.probs.tolist()))
+
+def _transition(state, up, box_size, strategy_type):
+    """한 스텝 진행: (다음 상태, 이번 스텝 실현 손익). logic.BalanceBoxLogic.next_step 과 같은 규칙"""
+    calls, n_calls, puts, n_puts = state
+    d = 1 if up else -1
+    # 1. Update Gains
+    calls = tuple(g + d for g in calls)
+    puts = tuple(g - d for g in puts)
+    # 2. Push New Position (앞쪽 값이 전부 남아있을 때만 새 값이 의미 있음)
+    if up:
+        if len(calls) == n_calls: calls += (0,)
+        n_calls += 1
+    else:
+        if len(puts) == n_puts: puts += (0,)
+        n_puts += 1
+    # 3. Check Imbalance & Pop
+    gain = 0
+    if strategy_type == "diff":
+        diff = n_calls - n_puts
+        if abs(diff) >= box_size:
+            if diff > 0:
+                if calls[0] >= 0:
+                    gain, calls, n_calls = calls[0], calls[1:], n_calls - 1
+            elif puts[0] >= 0:
+                gain, puts, n_puts = puts[0], puts[1:], n_puts - 1
+    elif strategy_type == "fixed":
+        if n_calls > box_size and calls[0] >= 0:
+            gain, calls, n_calls = calls[0], calls[1:], n_calls - 1
+        if n_puts > box_size and puts[0] >= 0:
+            gain, puts, n_puts = gain + puts[0], puts[1:], n_puts - 1
+    return (calls, n_calls, puts, n_puts), gain
+
+def profit_distribution(steps, p_up=0.5, box_size=2, strategy_type="diff", unit_point=10,
+                        eps=0.0, max_states=200_000):
+    """
+    N 스텝 후 실현 손익(total_profit * unit_point) 분포.
+    - lost_mass == 0 이면 정확한 분포 (부동소수 오차 제외)
+    - eps: 확률이 eps 미만인 (상태, 손익) 칸을 매 스텝 버림
+    - max_states: 매 스텝 확률이 큰 상태만 최대 max_states 개 유지 (None = 제한 없음, 메모리 주의)
+    """
+    cache = {}
+    moves = ((True, p_up), (False, 1.0 - p_up))
+    # 초기: Call 1개, Put 1개 (실수익 0)
+    layer = {((0,), 1, (0,), 1): {0: 1.0}}
+    lost = 0.0
+
+    for t in range(steps):
+        window = steps - t - 1 # 이번 스텝 이후 남은 스텝 수
+        nxt = defaultdict(lambda: defaultdict(float))
+        for state, pnls in layer.items():
+            for up, p in moves:
+                if p == 0: continue
+                key = (state, up)
+                if key not in cache:
+                    cache[key] = _transition(state, up, box_size, strategy_type)
+                (calls, n_calls, puts, n_puts), gain = cache[key]
+                target = nxt[(calls[:window], n_calls, puts[:window], n_puts)]
+                for pnl, prob in pnls.items():
+                    target[pnl + gain] += prob * p
+
+        if eps or max_states:
+            nxt, dropped = _truncate(nxt, eps, max_states)
+            lost += dropped
+        layer = nxt
+        if len(cache) > 1_000_000: cache.clear() # 전이 캐시 메모리 상한
+
+    totals = defaultdict(float)
+    for pnls in layer.values():
+        for pnl, prob in pnls.items():
+            totals[pnl] += prob
+    values = sorted(totals)
+    return PnLDistribution([v * unit_point for v in values], [totals[v] for v in values], lost)
+
+def _truncate(layer, eps, max_states):
+    dropped = 0.0
+    if eps:
+        for state in list(layer):
+            pnls = layer[state]
+            for pnl in [k for k, prob in pnls.items() if prob < eps]:
+                dropped += pnls.pop(pnl)
+            if not pnls: del layer[state]
+    if max_states and len(layer) > max_states:
+        ranked = sorted(layer.items(), key=lambda item: sum(item[1].values()), reverse=True)
+        for _, pnls in ranked[max_states:]:
+            dropped += sum(pnls.values())
+        layer = dict(ranked[:max_states])
+    return layer, dropped
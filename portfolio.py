@@ -0,0 +1,195 @@
+import numpy as np
+
+from batch_logic import BatchBalancedBoxLogic, to_up_matrix
+from tick_replay import UnitQuantizer
+
+# 여러 종목(instrument)의 Balance Box(V6 규칙)를 배치 엔진 하나의 행(row)으로 관리하는 포트폴리오.
+#
+# 사용법:
+#   book = Portfolio(["AAPL", "MSFT"], unit_point=10)
+#   book.on_ticks(["AAPL", "AAPL", "MSFT"], [True, False, True])   # 방향 틱 (True = UP)
+#   book.on_prices(rows, prices)                                    # 가격 틱 (unit_point 격자 통과 시에만 이동)
+#   book.totals()  # {"realized", "unrealized", "pnl", "net_exposure", "gross_exposure", ...}
+#
+# - 종목당 상태 = 배치 엔진 배열의 한 행 + 포트폴리오 배열 몇 칸 (종목별 객체/deque/로그/히스토리 없음)
+# - 한 번에 들어온 틱은 종목별 순서를 유지한 채 라운드로 나눠, 라운드마다 해당 종목 행들만 한 번에 진행
+#   (라운드 k = 각 종목의 k 번째 틱 -> 라운드 수 = 배치 안에서 한 종목이 받은 최대 틱 수)
+# - 종목이 SCALAR_ROWS 개 미만인 뒤쪽 라운드(틱이 몇 종목에 몰린 경우)는 종목별 스칼라 루프로 진행
+#   (BatchBalancedBoxLogic.run_row: 라운드당 NumPy 호출 고정 비용 없이 틱당 수 us)
+# - 합계(실현/평가 손익, 노출)는 이번 배치에서 건드린 종목의 변화분만 더해서 갱신 (전체 재계산 없음)
+
+SCALAR_ROWS = 16 # 라운드의 종목 수가 이보다 적으면 벡터화 step 보다 종목별 스칼라 루프가 빠름
+
+class Portfolio:
+    """
+    종목 수천~수만 개의 Balanced Box 묶음.
+    종목은 이름 또는 add() 가 돌려준 정수 행 인덱스로 지정 (대량 틱은 정수 인덱스 배열이 빠름)
+    - 손익: 칸 단위 손익 x 종목별 unit_point (가격 단위)
+    - 노출: 한 칸 이동당 손익 민감도 (Call +1, Put -1 포지션 x unit_point). net = Call - Put, gross = Call + Put
+    """
+    def __init__(self, symbols=(), unit_point=10, capacity=16):
+        self.engine = BatchBalancedBoxLogic(0, capacity)
+        self.symbols = {} # symbol -> row
+        self.names = []   # row -> symbol
+        self.unit_point = np.empty(0, dtype=np.float64)
+        self.ticks = np.empty(0, dtype=np.int64)      # 종목별 처리한 이동 수
+        self.unrealized = np.empty(0, dtype=np.int64) # 종목별 평가 손익 (칸 단위, 마지막으로 틱을 받은 시점)
+        self.anchor = np.empty(0, dtype=np.float64)   # on_prices 격자 기준 가격 (NaN = 첫 가격으로 설정)
+        self.level = np.empty(0, dtype=np.int64)      # on_prices 직전 box index
+
+        # Book Totals (증분 갱신)
+        self.total_ticks = 0
+        self.realized_total = 0.0
+        self.unrealized_total = 0.0
+        self.net_exposure = 0.0
+        self.gross_exposure = 0.0
+
+        if len(symbols): self.add(symbols, unit_point)
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, symbols, unit_point=10):
+        """종목 추가 (초기 상태: Call 1개, Put 1개). 추가된 행 인덱스 반환 - 여러 종목을 한 번에 추가하는 것이 효율적"""
+        symbols = list(symbols)
+        if len(set(symbols)) != len(symbols) or any(s in self.symbols for s in symbols):
+            raise ValueError("이미 등록되었거나 중복된 종목이 있습니다")
+        rows = self.engine.extend(len(symbols))
+        self.symbols.update(zip(symbols, rows.tolist()))
+        self.names.extend(symbols)
+
+        unit = np.broadcast_to(np.asarray(unit_point, dtype=np.float64), rows.shape)
+        self.unit_point = np.concatenate([self.unit_point, unit])
+        self.ticks = np.concatenate([self.ticks, np.zeros(len(rows), dtype=np.int64)])
+        self.unrealized = np.concatenate([self.unrealized, np.zeros(len(rows), dtype=np.int64)])
+        self.anchor = np.concatenate([self.anchor, np.full(len(rows), np.nan)])
+        self.level = np.concatenate([self.level, np.zeros(len(rows), dtype=np.int64)])
+        self.gross_exposure += 2 * float(unit.sum())
+        return rows
+
+    def rows_of(self, symbols):
+        """종목 이름 목록 -> 행 인덱스 배열 (정수로만 이루어진 배열/리스트는 행 인덱스로 사용)"""
+        if not isinstance(symbols, np.ndarray): symbols = list(symbols)
+        rows = np.asarray(symbols)
+        if rows.dtype.kind in "iu":
+            return rows.astype(np.int64, copy=False)
+        return np.fromiter((self.symbols[s] for s in symbols), dtype=np.int64, count=len(symbols))
+
+    # --- [Tick Dispatch] ---
+
+    def on_ticks(self, symbols, directions):
+        """
+        방향 틱 배치 (symbols[i] 의 i 번째 이동 = directions[i], bool / +1,-1 / "UP","DOWN").
+        같은 종목의 틱은 들어온 순서대로 처리됩니다. 반환: totals()
+        """
+        rows = self.rows_of(symbols)
+        up = to_up_matrix(directions).ravel()
+        if len(rows) != len(up):
+            raise ValueError(f"종목 수({len(rows)})와 방향 수({len(up)})가 다릅니다")
+        if rows.size == 0: return self.totals()
+
+        engine = self.engine
+        touched, counts = np.unique(rows, return_counts=True)
+        realized_before = engine.total_realized_profit[touched]
+        calls_before, puts_before = engine.length[0][touched], engine.length[1][touched]
+
+        rounds, tails = _rounds(rows, up)
+        for round_rows, round_up in rounds:
+            engine.step(round_up, round_rows)
+        for row, row_up in tails:
+            engine.run_row(row, row_up)
+
+        self.ticks[touched] += counts
+        self.total_ticks += len(rows)
+        unit = self.unit_point[touched]
+        unrealized = engine.get_unrealized_profit(touched)
+        calls, puts = engine.length[0][touched], engine.length[1][touched]
+        self.realized_total += float(((engine.total_realized_profit[touched] - realized_before) * unit).sum())
+        self.unrealized_total += float(((unrealized - self.unrealized[touched]) * unit).sum())
+        self.net_exposure += float((((calls - puts) - (calls_before - puts_before)) * unit).sum())
+        self.gross_exposure += float((((calls + puts) - (calls_before + puts_before)) * unit).sum())
+        self.unrealized[touched] = unrealized
+        return self.totals()
+
+    def on_prices(self, symbols, prices):
+        """
+        가격 틱 배치 -> 종목별 unit_point 격자 통과 이동으로 변환 후 on_ticks (tick_replay.UnitQuantizer 와 같은 규칙)
+        종목의 첫 가격이 격자 기준(anchor)이 되고, 한 틱에 여러 칸을 건너뛰면 그 칸 수만큼 같은 방향 이동
+        """
+        rows = self.rows_of(symbols)
+        prices = np.asarray(prices, dtype=np.float64)
+        order = np.argsort(rows, kind="stable")
+        rows, prices = rows[order], prices[order]
+        first = np.r_[True, rows[1:] != rows[:-1]] if rows.size else np.empty(0, dtype=bool)
+        last = np.r_[first[1:], True] if rows.size else first
+
+        new = first & np.isnan(self.anchor[rows])
+        self.anchor[rows[new]] = prices[new]
+        levels = np.floor((prices - self.anchor[rows]) / self.unit_point[rows] + UnitQuantizer.EPS).astype(np.int64)
+        self.level[rows[new]] = levels[new]
+
+        previous = np.r_[0, levels[:-1]] if rows.size else levels
+        previous[first] = self.level[rows[first]]
+        self.level[rows[last]] = levels[last]
+        deltas = levels - previous
+        crossed = deltas != 0
+        steps = np.abs(deltas[crossed])
+        return self.on_ticks(np.repeat(rows[crossed], steps), np.repeat(deltas[crossed] > 0, steps))
+
+    # --- [Reporting] ---
+
+    def totals(self):
+        return {"instruments": len(self.names), "ticks": self.total_ticks,
+                "realized": self.realized_total, "unrealized": self.unrealized_total,
+                "pnl": self.realized_total + self.unrealized_total,
+                "net_exposure": self.net_exposure, "gross_exposure": self.gross_exposure}
+
+    def instrument(self, symbol):
+        """종목 하나의 현재 상태"""
+        row = symbol if isinstance(symbol, (int, np.integer)) else self.symbols[symbol]
+        engine, unit = self.engine, float(self.unit_point[row])
+        calls, puts = int(engine.length[0][row]), int(engine.length[1][row])
+        return {"symbol": self.names[row], "ticks": int(self.ticks[row]),
+                "realized": int(engine.total_realized_profit[row]) * unit,
+                "unrealized": int(self.unrealized[row]) * unit,
+                "calls": calls, "puts": puts, "net_exposure": (calls - puts) * unit,
+                "wounded": int(engine.wounded[row]), "defeated": int(engine.defeated[row])}
+
+    def recompute(self):
+        """합계를 전 종목에서 다시 계산 (증분 합계의 부동소수 오차 정리 / 검증용, O(종목 수))"""
+        engine, unit = self.engine, self.unit_point
+        self.unrealized = engine.get_unrealized_profit()
+        self.realized_total = float((engine.total_realized_profit * unit).sum())
+        self.unrealized_total = float((self.unrealized * unit).sum())
+        self.net_exposure = float(((engine.length[0] - engine.length[1]) * unit).sum())
+        self.gross_exposure = float(((engine.length[0] + engine.length[1]) * unit).sum())
+        return self.totals()
+
+    @property
+    def nbytes(self):
+        """종목 상태 배열의 총 바이트 수 (종목 이름 dict 제외)"""
+        arrays = [self.unit_point, self.ticks, self.unrealized, self.anchor, self.level]
+        return self.engine.nbytes + sum(a.nbytes for a in arrays)
+
+def _rounds(rows, up, min_rows=SCALAR_ROWS):
+    """
+    틱 배치를 종목별 순서를 유지하는 라운드로 분할 (한 라운드 안에서는 종목이 중복되지 않음).
+    종목 수가 min_rows 미만인 뒤쪽 라운드는 나누지 않고 종목별 남은 틱으로 돌려줌 (라운드들 다음에 진행).
+    반환: ([(라운드 행들, 방향)], [(행, 남은 방향 리스트)])
+    """
+    order = np.argsort(rows, kind="stable")
+    grouped = rows[order]
+    starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]])
+    rank = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+    sizes = np.bincount(rank) # 라운드별 종목 수 (감소 순)
+    vector = int(np.count_nonzero(sizes >= min_rows))
+
+    in_rounds = rank < vector
+    by_round = order[in_rounds][np.argsort(rank[in_rounds], kind="stable")]
+    rounds = [(rows[chunk], up[chunk]) for chunk in np.split(by_round, np.cumsum(sizes[:vector])[:-1])] \
+        if vector else []
+    tail = order[~in_rounds]
+    tail_rows = rows[tail]
+    cuts = np.flatnonzero(np.r_[True, tail_rows[1:] != tail_rows[:-1]]) if tail.size else np.empty(0, dtype=np.int64)
+    tails = [(int(rows[chunk[0]]), up[chunk].tolist()) for chunk in np.split(tail, cuts[1:])] if tail.size else []
+    return rounds, tails
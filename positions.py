@@ -0,0 +1,70 @@
+from array import array
+
+class PositionQueue:
+    """
+    포지션 FIFO 큐 (정수 ID + 타입 배열 컬럼, struct-of-arrays 링버퍼).
+    - deque 와 같은 사용법: append / popleft / q[0] / len(q) / bool(q) / iter(q)
+    - ID 는 append 순서대로 증가하는 정수라서 큐 내용은 항상 [first_id, next_id) 구간
+      -> ID 문자열이나 {ID: [..]} dict 없이 슬롯 = ID & (capacity - 1) 로 바로 접근
+    - 컬럼 값은 get / set / add 로 읽고 씀
+    """
+    def __init__(self, columns=("base", "virtual"), typecode="q", capacity=16):
+        capacity = 1 << max(0, capacity - 1).bit_length() # 2의 거듭제곱으로 맞춤
+        self.typecode = typecode
+        self.mask = capacity - 1
+        self.cols = {name: array(typecode, bytes(array(typecode).itemsize * capacity)) for name in columns}
+        self.first_id = 0
+        self.next_id = 0
+
+    def _grow(self):
+        old_mask = self.mask
+        capacity = (old_mask + 1) * 2
+        self.mask = capacity - 1
+        for name, old in self.cols.items():
+            new = array(self.typecode, bytes(old.itemsize * capacity))
+            for pos_id in range(self.first_id, self.next_id):
+                new[pos_id & self.mask] = old[pos_id & old_mask]
+            self.cols[name] = new
+
+    def append(self, **values):
+        """새 포지션 추가 후 ID 반환 (지정하지 않은 컬럼은 0)"""
+        if self.next_id - self.first_id > self.mask:
+            self._grow()
+        pos_id = self.next_id
+        slot = pos_id & self.mask
+        for name, col in self.cols.items():
+            col[slot] = values.get(name, 0)
+        self.next_id += 1
+        return pos_id
+
+    def popleft(self):
+        if self.first_id == self.next_id:
+            raise IndexError("pop from an empty PositionQueue")
+        pos_id = self.first_id
+        self.first_id += 1
+        return pos_id
+
+    def get(self, name, pos_id):
+        return self.cols[name][pos_id & self.mask]
+
+    def set(self, name, pos_id, value):
+        self.cols[name][pos_id & self.mask] = value
+
+    def add(self, name, pos_id, delta):
+        self.cols[name][pos_id & self.mask] += delta
+
+    def __len__(self):
+        return self.next_id - self.first_id
+
+    def __bool__(self):
+        return self.next_id != self.first_id
+
+    def __getitem__(self, index):
+        n = self.next_id - self.first_id
+        if index < 0: index += n
+        if not 0 <= index < n:
+            raise IndexError("PositionQueue index out of range")
+        return self.first_id + index
+
+    def __iter__(self):
+        return iter(range(self.first_id, self.next_id))
@@ -0,0 +1,162 @@
+import json
+import time
+
+# BalancedBoxLogic 4단계(phase) 실행 프로파일러 (opt-in).
+# attach(engine) 은 해당 인스턴스의 phase 메서드만 타이머로 감싸고, detach(engine) 은 원래대로 되돌립니다.
+# 클래스 자체는 건드리지 않으므로 붙이지 않은 엔진(및 run() tight loop)에는 비용이 전혀 없습니다.
+#
+# 사용법:
+#   profiler = PhaseProfiler()
+#   profiler.attach(sim)
+#   for d in directions: sim.full_step_auto(d)
+#   print(profiler.to_prometheus())
+
+PHASES = ("step_1_update_profits", "step_2_handle_reversal", "step_3_entry", "step_4_balance")
+MAX_BUCKET = 40       # 2^40 ns (~18분) 이상은 마지막 bucket
+MAX_POPS_BUCKET = 64  # 틱당 pop 수 분포: 64 이상은 한 칸으로
+PROM_LATENCY_BUCKETS = range(6, 31)         # Prometheus 출력 bucket: 2^6 ns (64ns) ~ 2^30 ns (~1s) 고정
+PROM_POPS_BUCKETS = (0, 1, 2, 3, 4, 8, 16, 32, 64)
+
+class LatencyHistogram:
+    """나노초 지연 히스토그램 (2의 거듭제곱 bucket: bucket i = [2^(i-1), 2^i) ns)"""
+    def __init__(self):
+        self.buckets = [0] * (MAX_BUCKET + 1)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def observe(self, ns):
+        self.buckets[min(ns.bit_length(), MAX_BUCKET)] += 1
+        self.count += 1
+        self.total += ns
+        if self.min is None or ns < self.min: self.min = ns
+        if ns > self.max: self.max = ns
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        """bucket 상한 기준 근사 분위수 (ns)"""
+        if not self.count: return 0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(1 << i, self.max)
+        return self.max
+
+    def as_dict(self):
+        last = max((i for i, n in enumerate(self.buckets) if n), default=0)
+        return {"count": self.count, "sum_ns": self.total, "min_ns": self.min or 0, "max_ns": self.max,
+                "mean_ns": self.mean(), "p50_ns": self.quantile(0.5), "p99_ns": self.quantile(0.99),
+                "buckets_le_ns": {str(1 << i): n for i, n in enumerate(self.buckets[:last + 1])}}
+
+class PhaseProfiler:
+    """
+    phase 별 호출 수 / 지연 히스토그램, phase 별 pop 수, 틱당 pop 수 분포를 기록.
+    (틱 = step_1 시작 ~ step_4 종료. 수동 모드처럼 phase 를 따로 호출해도 같은 방식으로 집계)
+    """
+    def __init__(self):
+        self.latency = {phase: LatencyHistogram() for phase in PHASES}
+        self.pops = dict.fromkeys(PHASES, 0)
+        self.pops_per_tick = [0] * (MAX_POPS_BUCKET + 1)
+        self.ticks = 0
+        self._phase = None
+        self._tick_pops = 0
+        self._engines = []
+
+    def attach(self, engine):
+        if "_profiler_originals" in vars(engine):
+            raise ValueError("이미 프로파일러가 붙어 있는 엔진입니다")
+        originals = {name: vars(engine).get(name) for name in PHASES + ("_close_head",)}
+        for phase in PHASES:
+            setattr(engine, phase, self._timed(phase, getattr(engine, phase)))
+        engine._close_head = self._counted(engine._close_head)
+        engine._profiler_originals = originals
+        self._engines.append(engine)
+        return engine
+
+    def detach(self, engine):
+        originals = vars(engine).pop("_profiler_originals")
+        for name, method in originals.items():
+            if method is None:
+                delattr(engine, name) # 클래스 메서드로 복귀
+            else:
+                setattr(engine, name, method)
+        self._engines.remove(engine)
+
+    def _timed(self, phase, method):
+        histogram = self.latency[phase]
+        is_first, is_last = phase == PHASES[0], phase == PHASES[-1]
+        clock = time.perf_counter_ns
+
+        def timed(*args, **kwargs):
+            if is_first: self._tick_pops = 0
+            self._phase = phase
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                histogram.observe(clock() - start)
+                self._phase = None
+                if is_last:
+                    self.ticks += 1
+                    self.pops_per_tick[min(self._tick_pops, MAX_POPS_BUCKET)] += 1
+        return timed
+
+    def _counted(self, close):
+        def counted(queue):
+            if self._phase is not None: # run() tight loop 의 청산은 phase 밖이므로 집계하지 않음
+                self.pops[self._phase] += 1
+                self._tick_pops += 1
+            return close(queue)
+        return counted
+
+    def reset(self):
+        """집계만 초기화 (붙어 있는 엔진은 유지)"""
+        engines = self._engines
+        PhaseProfiler.__init__(self)
+        self._engines = engines
+
+    # --- [Export] ---
+
+    def as_dict(self):
+        last = max((i for i, n in enumerate(self.pops_per_tick) if n), default=0)
+        return {
+            "ticks": self.ticks,
+            "phases": {phase: {**self.latency[phase].as_dict(), "pops": self.pops[phase]} for phase in PHASES},
+            "pops_per_tick": self.pops_per_tick[:last + 1],
+        }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.as_dict(), indent=indent)
+
+    def to_prometheus(self, prefix="balancebox"):
+        """Prometheus text exposition format (지연은 초 단위 histogram)"""
+        lines = [f"# HELP {prefix}_phase_seconds BalancedBoxLogic phase latency",
+                 f"# TYPE {prefix}_phase_seconds histogram"]
+        for phase in PHASES:
+            h = self.latency[phase]
+            for i in PROM_LATENCY_BUCKETS:
+                cumulative = sum(h.buckets[:i + 1])
+                lines.append(f'{prefix}_phase_seconds_bucket{{phase="{phase}",le="{(1 << i) / 1e9:g}"}} {cumulative}')
+            lines.append(f'{prefix}_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} {h.count}')
+            lines.append(f'{prefix}_phase_seconds_sum{{phase="{phase}"}} {h.total / 1e9:g}')
+            lines.append(f'{prefix}_phase_seconds_count{{phase="{phase}"}} {h.count}')
+
+        lines += [f"# HELP {prefix}_phase_pops_total Positions closed inside each phase",
+                  f"# TYPE {prefix}_phase_pops_total counter"]
+        lines += [f'{prefix}_phase_pops_total{{phase="{phase}"}} {self.pops[phase]}' for phase in PHASES]
+
+        lines += [f"# HELP {prefix}_pops_per_tick Positions closed per tick",
+                  f"# TYPE {prefix}_pops_per_tick histogram"]
+        for pops in PROM_POPS_BUCKETS:
+            cumulative = sum(self.pops_per_tick[:pops + 1])
+            lines.append(f'{prefix}_pops_per_tick_bucket{{le="{pops}"}} {cumulative}')
+        total_pops = sum(self.pops.values())
+        lines.append(f'{prefix}_pops_per_tick_bucket{{le="+Inf"}} {self.ticks}')
+        lines.append(f"{prefix}_pops_per_tick_sum {total_pops}")
+        lines.append(f"{prefix}_pops_per_tick_count {self.ticks}")
+        return "\n".join(lines) + "\n"
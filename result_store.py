@@ -0,0 +1,299 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+import numpy as np
+
+from mc_stats import summarize, summarize_final
+
+# 시뮬레이션 결과 저장소 (SQLite 파일 하나, 표준 라이브러리만 사용).
+#
+# 사용법:
+#   store = ResultStore("results.db")
+#   config = run_config("v6", seed=0, cases=1000, steps=500)
+#   profits = store.get(config)               # 저장된 (cases x steps) 누적 실현 수익, 없으면 None
+#   if profits is None: store.put(config, profits := simulate(...))
+#   store.query(engine="v6", steps=500)       # 요약 지표 목록 (수익 배열은 store.load(run_id))
+#   store.put(config, profits, risk=summarize_risk(...))   # 위험 지표 MC 집계도 함께 보관 (risk.summarize_risk)
+#   with store.writer() as w:                 # 스트리밍 저장: 블록이 나오는 대로 append, 끝나면 finish(config)
+#       for block in blocks: w.append(block)  # (수익 행렬 전체를 메모리에 두지 않음, load_blocks 로 블록 단위 조회)
+#       w.finish(config)
+#
+# - key = 설정(엔진, 엔진 버전, 엔진 파라미터, 방향 모델/파라미터, seed, cases, steps) canonical JSON 의 SHA-1
+# - 엔진 버전 = 엔진 소스 파일 해시 -> 로직을 고치면 이전 결과는 자동으로 다른 key (잘못된 캐시 적중 없음)
+# - 수익 배열은 스텝 간 증분을 가장 작은 정수 타입으로 줄인 뒤 zlib 압축 (누적 수익은 cumsum 으로 복원)
+# - 요약 지표(runs)와 수익 배열(histories / history_chunks)은 테이블을 나눠서 목록 조회 때 BLOB 을 읽지 않음
+
+ENGINE_SOURCES = {
+    "v6": ("logic_v6.py", "batch_logic.py"),
+    "logic": ("logic.py", "positions.py"),
+}
+SUMMARY_COLUMNS = ("mean", "std", "min", "p5", "p50", "p95", "max")
+FILTER_COLUMNS = ("engine", "engine_version", "model", "seed", "cases", "steps")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    engine TEXT NOT NULL,
+    engine_version TEXT NOT NULL,
+    engine_params TEXT NOT NULL,
+    model TEXT NOT NULL,
+    model_params TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    cases INTEGER NOT NULL,
+    steps INTEGER NOT NULL,
+    created REAL NOT NULL,
+    elapsed REAL,
+    mean REAL, std REAL, min REAL, p5 REAL, p50 REAL, p95 REAL, max REAL,
+    risk TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_lookup ON runs (engine, model, steps, seed);
+CREATE TABLE IF NOT EXISTS histories (
+    run_id INTEGER PRIMARY KEY REFERENCES runs (id) ON DELETE CASCADE,
+    encoding TEXT NOT NULL,
+    dtype TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history_chunks (
+    token TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    run_id INTEGER REFERENCES runs (id) ON DELETE CASCADE,
+    rows INTEGER NOT NULL,
+    encoding TEXT NOT NULL,
+    dtype TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (token, seq)
+);
+CREATE INDEX IF NOT EXISTS history_chunks_run ON history_chunks (run_id, seq);
+"""
+
+_versions = {}
+
+def engine_version(engine):
+    """엔진 소스 파일들의 SHA-1 앞 12자리 (프로세스 안에서는 한 번만 계산)"""
+    if engine not in _versions:
+        digest = hashlib.sha1()
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in ENGINE_SOURCES[engine]:
+            with open(os.path.join(here, name), "rb") as f:
+                digest.update(f.read())
+        _versions[engine] = digest.hexdigest()[:12]
+    return _versions[engine]
+
+def run_config(engine, seed, cases, steps, model="biased", model_params=None, engine_params=None):
+    """
+    저장소 key 가 되는 실행 설정.
+    model / model_params: 방향 생성 모델 (directions.MODELS 이름, 기본 biased p_up=0.5 = mc_runner.case_directions)
+    """
+    if model_params is None: model_params = {"p_up": 0.5} if model == "biased" else {}
+    return {"engine": engine, "engine_version": engine_version(engine), "engine_params": engine_params or {},
+            "model": model, "model_params": model_params, "seed": int(seed), "cases": int(cases),
+            "steps": int(steps)}
+
+def config_key(config):
+    return hashlib.sha1(json.dumps(config, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+def encode_profits(profits):
+    """(cases x steps) 수익 -> (encoding, dtype, 압축 bytes). 정수는 스텝 증분으로, 실수는 그대로 압축"""
+    profits = np.asarray(profits)
+    if profits.dtype.kind == "f":
+        return "raw", "<f8", zlib.compress(profits.astype("<f8").tobytes())
+    deltas = np.diff(profits.astype(np.int64), axis=1, prepend=0)
+    low, high = (int(deltas.min()), int(deltas.max())) if deltas.size else (0, 0)
+    dtype = next(np.dtype(t) for t in ("<i1", "<i2", "<i4", "<i8")
+                 if np.iinfo(t).min <= low and high <= np.iinfo(t).max)
+    return "diff", dtype.str, zlib.compress(deltas.astype(dtype).tobytes())
+
+def decode_profits(encoding, dtype, data, cases, steps):
+    values = np.frombuffer(zlib.decompress(data), dtype=dtype).reshape(cases, steps)
+    if encoding == "raw": return values.copy()
+    return np.cumsum(values, axis=1, dtype=np.int64)
+
+class ResultStore:
+    """
+    설정 key 로 색인된 실행 결과 저장소.
+    같은 설정을 다시 실행하면 get() 으로 바로 불러오고(캐시 적중), query() 로 지난 실행들을 비교합니다.
+    연결 하나를 여러 스레드가 공유할 수 있도록(Streamlit 세션들) DB 접근은 lock 으로 직렬화합니다.
+    """
+    def __init__(self, path="results.db"):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.lock = threading.RLock()
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(SCHEMA)
+        # 위험 지표 컬럼 이전에 만든 파일이면 컬럼 추가 (기존 행은 NULL)
+        if "risk" not in {row["name"] for row in self.db.execute("PRAGMA table_info(runs)")}:
+            with self.db:
+                self.db.execute("ALTER TABLE runs ADD COLUMN risk TEXT")
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- [Write] ---
+
+    def put(self, config, profits, elapsed=None, risk=None):
+        """결과 저장 (같은 설정이 있으면 교체). risk: 위험 지표 MC 집계 dict (선택). 반환: run id"""
+        profits = np.asarray(profits)
+        encoding, dtype, data = encode_profits(profits)
+        with self.lock, self.db:
+            run_id = self._insert_run(config, summarize(profits), elapsed, risk)
+            self.db.execute("INSERT INTO histories (run_id, encoding, dtype, data) VALUES (?, ?, ?, ?)",
+                            (run_id, encoding, dtype, data))
+        return run_id
+
+    def writer(self):
+        """블록 단위 스트리밍 저장 (RunWriter)"""
+        return RunWriter(self)
+
+    def _insert_run(self, config, summary, elapsed, risk):
+        # 같은 key 의 이전 실행(수익 배열 포함)을 지우고 요약 행 추가 (호출자가 lock + 트랜잭션 안에서 호출)
+        row = {**config, "engine_params": json.dumps(config["engine_params"], sort_keys=True),
+               "model_params": json.dumps(config["model_params"], sort_keys=True),
+               "cases": summary["paths"], "steps": summary["steps"], "key": config_key(config),
+               "created": time.time(), "elapsed": elapsed, **{c: summary[c] for c in SUMMARY_COLUMNS},
+               "risk": None if risk is None else json.dumps(risk, sort_keys=True)}
+        self.db.execute("DELETE FROM runs WHERE key = ?", (row["key"],))
+        cursor = self.db.execute(f"INSERT INTO runs ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                                 tuple(row.values()))
+        return cursor.lastrowid
+
+    def delete(self, run_id):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+
+    # --- [Read] ---
+
+    def lookup(self, config):
+        """설정의 요약 행 (없으면 None)"""
+        with self.lock:
+            row = self.db.execute("SELECT * FROM runs WHERE key = ?", (config_key(config),)).fetchone()
+        return _summary(row) if row else None
+
+    def load(self, run_id):
+        """run id 의 (cases x steps) 누적 실현 수익"""
+        blocks = list(self.load_blocks(run_id))
+        return blocks[0] if len(blocks) == 1 else np.vstack(blocks)
+
+    def load_blocks(self, run_id):
+        """
+        run id 의 수익을 (케이스 x steps) 블록 단위로 순서대로 (메모리에는 한 블록씩).
+        put() 으로 저장한 실행은 전체 행렬 한 블록, RunWriter 로 저장한 실행은 append 한 블록 그대로
+        """
+        with self.lock:
+            run = self.db.execute("SELECT cases, steps FROM runs WHERE id = ?", (run_id,)).fetchone()
+            whole = self.db.execute("SELECT encoding, dtype, data FROM histories WHERE run_id = ?",
+                                    (run_id,)).fetchone()
+        if run is None: raise KeyError(run_id)
+        if whole is not None:
+            yield decode_profits(*whole, run["cases"], run["steps"])
+            return
+        seq, found = -1, False
+        while True: # 블록마다 따로 조회 (generator 가 lock 을 잡은 채 멈추지 않도록)
+            with self.lock:
+                chunk = self.db.execute("SELECT seq, rows, encoding, dtype, data FROM history_chunks "
+                                        "WHERE run_id = ? AND seq > ? ORDER BY seq LIMIT 1", (run_id, seq)).fetchone()
+            if chunk is None: break
+            seq, found = chunk["seq"], True
+            yield decode_profits(chunk["encoding"], chunk["dtype"], chunk["data"], chunk["rows"], run["steps"])
+        if not found:
+            yield np.empty((0, run["steps"]), dtype=np.int64)
+
+    def get(self, config):
+        """캐시 조회: 저장된 수익 배열 또는 None"""
+        with self.lock:
+            row = self.db.execute("SELECT id FROM runs WHERE key = ?", (config_key(config),)).fetchone()
+        return self.load(row["id"]) if row else None
+
+    def get_or_compute(self, config, compute):
+        """캐시에 있으면 불러오고, 없으면 compute() 결과를 저장. 반환: (profits, 캐시 적중 여부)"""
+        profits = self.get(config)
+        if profits is not None: return profits, True
+        start = time.perf_counter()
+        profits = compute()
+        self.put(config, profits, time.perf_counter() - start)
+        return profits, False
+
+    def query(self, order_by="created", descending=True, limit=100, **filters):
+        """
+        요약 지표 목록 (수익 배열 제외). filters: engine / engine_version / model / seed / cases / steps
+        order_by: created / mean / std / p5 / p50 / p95 / ...
+        """
+        unknown = set(filters) - set(FILTER_COLUMNS)
+        if unknown: raise ValueError(f"알 수 없는 조건: {sorted(unknown)}")
+        if order_by not in ("id", "created", "elapsed") + FILTER_COLUMNS + SUMMARY_COLUMNS:
+            raise ValueError(f"정렬할 수 없는 컬럼: {order_by}")
+        where = " AND ".join(f"{name} = ?" for name in filters) or "1"
+        sql = (f"SELECT * FROM runs WHERE {where} ORDER BY {order_by} {'DESC' if descending else 'ASC'}, id DESC "
+               f"LIMIT ?")
+        with self.lock:
+            rows = self.db.execute(sql, (*filters.values(), limit)).fetchall()
+        return [_summary(row) for row in rows]
+
+class RunWriter:
+    """
+    (케이스 x steps) 수익 블록을 나오는 대로 저장소에 쓰는 스트리밍 put.
+    - 블록은 임시 token 으로 쌓이고 finish(config) 에서 한 트랜잭션으로 실행 행에 연결 (완료 전에는 get() 에 보이지 않음)
+    - 메모리에는 요약용 최종 수익 열(O(cases))만 유지
+    - with 블록이 finish 없이 끝나면(예외 포함) 쌓인 블록을 지움
+    """
+    def __init__(self, store):
+        self.store = store
+        self.token = uuid.uuid4().hex
+        self.blocks = 0
+        self.steps = None
+        self.finals = []
+        self.finished = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if not self.finished: self.abort()
+
+    def append(self, block):
+        block = np.asarray(block)
+        if self.steps is None: self.steps = block.shape[1]
+        elif block.shape[1] != self.steps:
+            raise ValueError(f"스텝 수가 다른 블록입니다 ({block.shape[1]} != {self.steps})")
+        if len(block) == 0: return
+        encoding, dtype, data = encode_profits(block)
+        with self.store.lock, self.store.db:
+            self.store.db.execute("INSERT INTO history_chunks (token, seq, rows, encoding, dtype, data) "
+                                  "VALUES (?, ?, ?, ?, ?, ?)", (self.token, self.blocks, len(block), encoding, dtype,
+                                                                data))
+        self.blocks += 1
+        self.finals.append(block[:, -1].copy() if self.steps else np.zeros(len(block), dtype=block.dtype))
+
+    def finish(self, config, elapsed=None, risk=None):
+        """쌓인 블록을 config 의 실행으로 확정 (같은 설정이 있으면 교체). 반환: run id"""
+        final = np.concatenate(self.finals) if self.finals else np.zeros(0, dtype=np.int64)
+        summary = summarize_final(final if self.steps else np.zeros(0), len(final), self.steps or 0)
+        with self.store.lock, self.store.db:
+            run_id = self.store._insert_run(config, summary, elapsed, risk)
+            self.store.db.execute("UPDATE history_chunks SET run_id = ? WHERE token = ?", (run_id, self.token))
+        self.finished = True
+        return run_id
+
+    def abort(self):
+        with self.store.lock, self.store.db:
+            self.store.db.execute("DELETE FROM history_chunks WHERE token = ? AND run_id IS NULL", (self.token,))
+        self.finished = True
+
+def _summary(row):
+    summary = dict(row)
+    summary["engine_params"] = json.loads(summary["engine_params"])
+    summary["model_params"] = json.loads(summary["model_params"])
+    summary["risk"] = json.loads(summary["risk"]) if summary["risk"] else None
+    return summary
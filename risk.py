@@ -0,0 +1,128 @@
+import numpy as np
+
+# 틱마다 O(1) 로 갱신하는 위험 지표 (수익 히스토리를 저장하지 않음).
+#
+# 사용법:
+#   sim.risk = RiskTracker()              # BalancedBoxLogic / BalanceBoxLogic: 턴 종료마다 update (run() 포함)
+#   ... sim.full_step_auto(d) ...
+#   sim.risk.as_dict()                    # {"max_drawdown", "max_underwater", "max_call_depth", ...}
+#
+#   tracker = simulate_risk(directions)   # (cases x steps) 방향 -> 케이스별 지표 (BatchBalancedBoxLogic)
+#   summarize_risk(tracker.as_dict())     # MC 집계 {지표: {"mean", "p50", "p95", "max"}}
+#
+# - equity = 실현 + 평가 손익 (엔진 손익 단위: V6 = 칸, logic.py = Point)
+# - drawdown = 지금까지의 equity 고점 - 현재 equity, underwater = equity 가 고점 아래인 연속 틱 수
+# - 노출(gross) = 보유 포지션 수 (Call + Put). 시작 상태(step 0, equity 0)를 첫 고점으로 봄
+
+FIELDS = ("ticks", "equity", "peak", "drawdown", "max_drawdown", "underwater", "max_underwater",
+          "max_call_depth", "max_put_depth", "max_wounded", "gross", "max_gross", "gross_sum")
+
+class RiskTracker:
+    """엔진 하나의 위험 지표 누적기"""
+    def __init__(self):
+        for name in FIELDS:
+            setattr(self, name, 0)
+
+    def update(self, equity, call_depth, put_depth, wounded):
+        self.ticks += 1
+        self.equity = equity
+        if equity >= self.peak:
+            self.peak = equity
+            self.drawdown = 0
+            self.underwater = 0
+        else:
+            self.drawdown = self.peak - equity
+            self.underwater += 1
+            if self.drawdown > self.max_drawdown: self.max_drawdown = self.drawdown
+            if self.underwater > self.max_underwater: self.max_underwater = self.underwater
+        if call_depth > self.max_call_depth: self.max_call_depth = call_depth
+        if put_depth > self.max_put_depth: self.max_put_depth = put_depth
+        if wounded > self.max_wounded: self.max_wounded = wounded
+        gross = call_depth + put_depth
+        self.gross = gross
+        self.gross_sum += gross
+        if gross > self.max_gross: self.max_gross = gross
+
+    @property
+    def mean_gross(self):
+        return self.gross_sum / self.ticks if self.ticks else 0.0
+
+    def as_dict(self):
+        return {**{name: getattr(self, name) for name in FIELDS}, "mean_gross": self.mean_gross}
+
+    @classmethod
+    def from_dict(cls, state):
+        tracker = cls()
+        for name in FIELDS:
+            setattr(tracker, name, state[name])
+        return tracker
+
+class BatchRiskTracker:
+    """
+    케이스별 위험 지표 (cases,) 배열 버전. BatchBalancedBoxLogic.risk 에 두면 step 마다 갱신
+    (rows 를 주면 해당 케이스만: portfolio.Portfolio)
+    """
+    def __init__(self, cases):
+        for name in FIELDS:
+            setattr(self, name, np.zeros(cases, dtype=np.int64))
+
+    def extend(self, n):
+        for name in FIELDS:
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros(n, dtype=np.int64)]))
+
+    def update(self, equity, call_depth, put_depth, wounded, rows=None):
+        sel = slice(None) if rows is None else rows
+        self.ticks[sel] += 1
+        self.equity[sel] = equity
+        peak = np.maximum(self.peak[sel], equity)
+        drawdown = peak - equity
+        self.peak[sel] = peak
+        self.drawdown[sel] = drawdown
+        self.max_drawdown[sel] = np.maximum(self.max_drawdown[sel], drawdown)
+        underwater = np.where(drawdown > 0, self.underwater[sel] + 1, 0)
+        self.underwater[sel] = underwater
+        self.max_underwater[sel] = np.maximum(self.max_underwater[sel], underwater)
+        self.max_call_depth[sel] = np.maximum(self.max_call_depth[sel], call_depth)
+        self.max_put_depth[sel] = np.maximum(self.max_put_depth[sel], put_depth)
+        self.max_wounded[sel] = np.maximum(self.max_wounded[sel], wounded)
+        gross = call_depth + put_depth
+        self.gross[sel] = gross
+        self.gross_sum[sel] += gross
+        self.max_gross[sel] = np.maximum(self.max_gross[sel], gross)
+
+    @property
+    def mean_gross(self):
+        return self.gross_sum / np.maximum(self.ticks, 1)
+
+    def as_dict(self):
+        return {**{name: getattr(self, name) for name in FIELDS}, "mean_gross": self.mean_gross}
+
+def simulate_risk(directions):
+    """(cases x steps) 방향 행렬 / PackedDirections -> BatchRiskTracker (V6 규칙, 수익 히스토리 저장 없음)"""
+    from batch_logic import BatchBalancedBoxLogic, to_up_matrix
+    if hasattr(directions, "iter_columns"):
+        columns = (column for block in directions.iter_columns() for column in block.T)
+        cases = directions.shape[0]
+    else:
+        up = to_up_matrix(directions)
+        if up.ndim == 1: up = up[None, :]
+        columns, cases = up.T, up.shape[0]
+    engine = BatchBalancedBoxLogic(cases)
+    engine.risk = BatchRiskTracker(cases)
+    for column in columns:
+        engine.step(column)
+    return engine.risk
+
+SUMMARY_FIELDS = ("max_drawdown", "max_underwater", "max_call_depth", "max_put_depth", "max_wounded", "max_gross",
+                  "mean_gross")
+
+def summarize_risk(metrics):
+    """케이스별 지표 {이름: (cases,) 배열} -> MC 집계 {이름: {"mean", "p50", "p95", "max"}}"""
+    summary = {}
+    for name in SUMMARY_FIELDS:
+        values = np.asarray(metrics[name], dtype=np.float64)
+        if values.size == 0: continue
+        p50, p95 = np.quantile(values, (0.5, 0.95))
+        summary[name] = {"mean": float(values.mean()), "p50": float(p50), "p95": float(p95),
+                         "max": float(values.max())}
+    return summary
@@ -0,0 +1,201 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+from logic import BalanceBoxLogic
+from event_log import OFF
+from mc_runner import case_directions
+from result_store import engine_version
+from tick_replay import UnitQuantizer
+
+# 사용법:
+#   python sweep.py --box-size 1 2 3 4 --strategy diff fixed --paths 200 --steps 1000
+# 같은 경로 집합(common random numbers)으로 모든 파라미터 조합을 평가하고,
+# (params, 경로 집합 hash, 엔진 버전) 별 결과를 cache_dir 에 저장해 두었다가 재사용합니다.
+# 엔진 버전 = logic 엔진 소스 해시 (result_store.engine_version) -> 규칙을 고치면 이전 캐시는 적중하지 않음
+
+DEFAULT_CACHE = ".sweep_cache"
+QUANTILES = (0.05, 0.5, 0.95)
+
+# --- [Parameter Space] ---
+
+def grid(box_size=(2,), unit_point=(10,), strategy_type=("diff",)):
+    """모든 조합 (itertools.product)"""
+    return [dict(box_size=b, unit_point=u, strategy_type=s)
+            for b, u, s in itertools.product(box_size, unit_point, strategy_type)]
+
+def random_search(n, seed=0, box_size=(1, 2, 3, 4, 5), unit_point=(10,), strategy_type=("diff", "fixed")):
+    """각 축에서 무작위로 뽑은 n 개 조합 (중복 제거)"""
+    rng = random.Random(seed)
+    cells = {(rng.choice(box_size), rng.choice(unit_point), rng.choice(strategy_type)) for _ in range(n)}
+    return [dict(box_size=b, unit_point=u, strategy_type=s) for b, u, s in sorted(cells, key=str)]
+
+# --- [Path Sets] ---
+
+class PathSet:
+    """
+    모든 파라미터 조합이 공유하는 입력 경로 집합.
+    - directions: (paths x steps) bool 행렬 -> unit_point 는 손익 배율로만 작용
+    - prices: 가격 배열 리스트 -> unit_point 마다 UnitQuantizer 로 이동열을 다시 만듦
+    """
+    def __init__(self, directions=None, prices=None):
+        if (directions is None) == (prices is None):
+            raise ValueError("directions 또는 prices 중 하나만 지정하세요")
+        self.directions = None if directions is None else np.asarray(directions, dtype=bool)
+        self.prices = None if prices is None else [np.asarray(p, dtype=np.float64) for p in prices]
+        self.digest = self._digest()
+
+    @classmethod
+    def random_walk(cls, paths, steps, seed=0, p_up=0.5):
+        return cls(directions=case_directions(seed, range(paths), steps, p_up))
+
+    def _digest(self):
+        h = hashlib.sha256()
+        if self.directions is not None:
+            h.update(b"dir" + str(self.directions.shape).encode())
+            h.update(np.packbits(self.directions).tobytes())
+        else:
+            for p in self.prices:
+                h.update(b"px" + str(p.shape).encode())
+                h.update(p.tobytes())
+        return h.hexdigest()
+
+    def moves(self, unit_point):
+        """경로별 +1/-1 이동열"""
+        if self.directions is not None:
+            return [np.where(path, 1, -1) for path in self.directions]
+        return [UnitQuantizer(unit_point).quantize(p) for p in self.prices]
+
+    def __len__(self):
+        return len(self.directions) if self.directions is not None else len(self.prices)
+
+# --- [Evaluation] ---
+
+def evaluate(params, path_set):
+    """
+    한 파라미터 조합을 경로 집합 전체에 대해 실행하고 요약 지표 반환.
+    실현 손익은 줄지 않으므로(손실 포지션은 청산 대기) drawdown 은 평가손익을 포함한 equity 기준.
+    """
+    finals, equities, drawdowns = [], [], []
+    unit = params["unit_point"]
+    for moves in path_set.moves(unit):
+        sim = BalanceBoxLogic(**params, log_level=OFF)
+        run = sim.run(moves) # 스텝별 실현/평가 손익 (Point 단위)
+        equity = run["realized"] + run["unrealized"]
+        peak = np.maximum.accumulate(np.maximum(equity, 0)) if len(equity) else equity
+        finals.append(sim.total_profit * unit)
+        equities.append((sim.total_profit + sim.get_unrealized_pnl()) * unit)
+        drawdowns.append(float((peak - equity).max()) if len(equity) else 0.0)
+    finals = np.asarray(finals, dtype=np.float64)
+    drawdowns = np.asarray(drawdowns, dtype=np.float64)
+    if len(finals) == 0:
+        finals = drawdowns = np.zeros(1)
+    q = np.quantile(finals, QUANTILES)
+    return {
+        "mean": float(finals.mean()),
+        "std": float(finals.std()),
+        **{f"p{round(level * 100)}": float(v) for level, v in zip(QUANTILES, q)},
+        "mean_equity": float(np.mean(equities)) if equities else 0.0,
+        "mean_drawdown": float(drawdowns.mean()),
+        "max_drawdown": float(drawdowns.max()),
+        "paths": len(path_set),
+    }
+
+# --- [Cache] ---
+
+def cache_key(params, path_set):
+    blob = json.dumps(params, sort_keys=True) + path_set.digest + engine_version("logic")
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+def cache_load(cache_dir, key):
+    try:
+        with open(os.path.join(cache_dir, key + ".json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def cache_store(cache_dir, key, metrics):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, key + ".json")
+    tmp = path + f".{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(metrics, f)
+    os.replace(tmp, path) # 동시 실행 중에도 반쯤 쓰인 파일을 읽지 않도록
+
+# --- [Sweep] ---
+
+def run_sweep(param_list, path_set, workers=None, cache_dir=DEFAULT_CACHE, rank_by="mean", on_progress=None):
+    """
+    캐시에 없는 조합만 프로세스 풀에서 계산하고, rank_by 기준 내림차순 정렬된 결과 행 리스트 반환.
+    (drawdown 계열은 작을수록 좋으므로 오름차순)
+    """
+    rows, pending = [], []
+    for params in param_list:
+        key = cache_key(params, path_set)
+        metrics = cache_load(cache_dir, key) if cache_dir else None
+        if metrics is None:
+            pending.append((params, key))
+        else:
+            rows.append({**params, **metrics, "cached": True})
+
+    done = len(rows)
+    if pending:
+        if workers == 1:
+            results = ((params, key, evaluate(params, path_set)) for params, key in pending)
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            futures = {executor.submit(evaluate, params, path_set): (params, key) for params, key in pending}
+            results = ((*futures[f], f.result()) for f in as_completed(futures))
+        try:
+            for params, key, metrics in results:
+                if cache_dir: cache_store(cache_dir, key, metrics)
+                rows.append({**params, **metrics, "cached": False})
+                done += 1
+                if on_progress: on_progress(done, len(param_list))
+        finally:
+            if workers != 1: executor.shutdown()
+
+    ascending = "drawdown" in rank_by
+    rows.sort(key=lambda r: r[rank_by], reverse=not ascending)
+    return rows
+
+def format_table(rows, columns=("box_size", "unit_point", "strategy_type", "mean", "std", "p5", "p50", "p95",
+                                "mean_drawdown", "max_drawdown", "cached")):
+    header = ["rank", *columns]
+    lines = [[str(i + 1)] + [f"{r[c]:.1f}" if isinstance(r[c], float) else str(r[c]) for c in columns]
+             for i, r in enumerate(rows)]
+    widths = [max(len(h), *(len(line[i]) for line in lines)) if lines else len(h) for i, h in enumerate(header)]
+    fmt = lambda cells: "  ".join(c.rjust(w) for c, w in zip(cells, widths))
+    return "\n".join([fmt(header)] + [fmt(line) for line in lines])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BalanceBoxLogic 파라미터 스윕")
+    parser.add_argument("--box-size", type=int, nargs="+", default=[1, 2, 3, 4, 5])
+    parser.add_argument("--unit-point", type=float, nargs="+", default=[10])
+    parser.add_argument("--strategy", nargs="+", default=["diff", "fixed"])
+    parser.add_argument("--random", type=int, help="grid 대신 무작위 n 개 조합")
+    parser.add_argument("--paths", type=int, default=100)
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--p-up", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE)
+    parser.add_argument("--rank-by", default="mean")
+    args = parser.parse_args(argv)
+
+    units = [int(u) if float(u).is_integer() else u for u in args.unit_point]
+    if args.random:
+        params = random_search(args.random, args.seed, args.box_size, units, args.strategy)
+    else:
+        params = grid(args.box_size, units, args.strategy)
+    path_set = PathSet.random_walk(args.paths, args.steps, args.seed, args.p_up)
+    rows = run_sweep(params, path_set, args.workers, args.cache_dir, args.rank_by)
+    print(format_table(rows))
+
+if __name__ == "__main__":
+    main()
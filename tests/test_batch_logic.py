@@ -0,0 +1,92 @@
+import numpy as np
+
+from batch_logic import BatchBalancedBoxLogic, run_batch
+from logic_v6 import BalancedBoxLogic
+from portfolio import Portfolio
+
+# baseline V6 규칙(app.BalancedBoxLogic.full_step_auto)으로 구한 스텝별 누적 실현 수익
+# 경로: np.random.default_rng(0) 에서 순서대로 random(60) < p_up (p_up = 0.5, 0.3, 0.7)
+GOLDEN = [
+    [0, 0, 0, 2, 3, 3, 3, 6, 9, 12, 15, 16, 16, 16, 16, 16, 16, 16, 17, 17, 17, 19, 24, 24, 24, 25, 25, 25, 26, 27,
+     29, 29, 29, 29, 29, 29, 29, 29, 29, 29, 29, 29, 29, 29, 29, 29, 29, 29, 29, 29, 29, 29, 29, 29, 29, 29, 29, 29,
+     29, 29],
+    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 2, 4, 8, 13, 19, 25, 32, 39, 46, 53, 60, 67, 74, 81, 88, 95, 102, 117, 117,
+     117, 120, 121, 121, 121, 123, 123, 123, 125, 127, 132, 140, 140, 140, 141, 141, 141, 144, 144, 144, 146, 146,
+     146, 146, 146, 148, 153, 163, 163, 163],
+    [0, 2, 2, 2, 4, 6, 7, 7, 7, 10, 13, 17, 20, 20, 20, 23, 24, 24, 24, 24, 24, 26, 31, 31, 31, 32, 32, 32, 32, 32,
+     32, 32, 35, 37, 39, 51, 51, 51, 51, 51, 51, 53, 55, 55, 55, 55, 55, 55, 55, 55, 55, 55, 55, 57, 58, 58, 58, 58,
+     58, 58],
+]
+
+def _golden_paths():
+    rng = np.random.default_rng(0)
+    return np.array([rng.random(60) < p for p in (0.5, 0.3, 0.7)])
+
+def test_run_batch_matches_baseline_rules():
+    assert run_batch(_golden_paths()).tolist() == GOLDEN
+
+def test_run_batch_direction_formats():
+    paths = _golden_paths()
+    assert run_batch(np.where(paths, 1, -1)).tolist() == GOLDEN
+    assert run_batch(np.where(paths, "UP", "DOWN")).tolist() == GOLDEN
+    assert run_batch(paths[0]).tolist() == GOLDEN[:1]
+
+def test_cases_are_independent():
+    # lockstep 으로 함께 돌려도 케이스별로 따로 돌린 결과와 같음
+    rng = np.random.default_rng(1)
+    paths = rng.random((16, 300)) < rng.uniform(0.2, 0.8, (16, 1))
+    together = run_batch(paths)
+    for case, path in enumerate(paths):
+        assert np.array_equal(together[case], run_batch(path)[0])
+
+def test_run_batch_matches_reference():
+    from mc_runner import case_directions
+    from oracle import verify_batch_v6
+    verify_batch_v6(case_directions(0, range(24), 300, p_up=0.5))
+    verify_batch_v6(np.tile([True, False], (3, 150)))
+
+def test_run_batch_packed_directions():
+    from directions import PackedDirections
+    from mc_runner import case_directions
+    directions = case_directions(1, range(10), 203)
+    assert np.array_equal(run_batch(PackedDirections.pack(directions)), run_batch(directions))
+
+def _hot_growth(instruments):
+    """한 종목에만 한쪽 방향 틱을 몰아줬을 때 늘어난 바이트 수"""
+    book = Portfolio(range(instruments))
+    before = book.nbytes
+    ups = np.tile([True, False], 600) # 좁은 박스 왕복 -> 양쪽 큐가 계속 깊어짐
+    book.on_ticks(np.zeros(len(ups), dtype=np.int64), ups)
+    assert book.instrument(0)["calls"] > 256
+    return book.nbytes - before
+
+def test_hot_row_growth_leaves_idle_rows_unchanged():
+    # 깊어진 행만 overflow 세그먼트를 가짐 -> 증가분이 종목 수와 무관
+    assert _hot_growth(100) == _hot_growth(2000)
+    book = Portfolio(range(1000))
+    idle = book.nbytes
+    book.on_ticks(np.zeros(1200, dtype=np.int64), np.tile([True, False], 600))
+    assert book.nbytes - idle < 64 * 1024
+
+def test_deep_rows_match_scalar_engine():
+    # 작은 공용 링으로 재배치 / overflow 정리 / extend 경로를 자주 지나가게 함
+    rng = np.random.default_rng(0)
+    engine = BatchBalancedBoxLogic(6, capacity=2)
+    refs = [BalancedBoxLogic(verbose=False) for _ in range(6)]
+    bias = rng.uniform(0.1, 0.9, 8)
+    for t in range(400):
+        if t == 200:
+            engine.extend(2)
+            refs += [BalancedBoxLogic(verbose=False) for _ in range(2)]
+        rows = np.sort(rng.choice(len(refs), int(rng.integers(1, len(refs) + 1)), replace=False))
+        up = rng.random(len(rows)) < bias[rows]
+        if len(rows) == 1 and t % 2:
+            engine.run_row(rows[0], up.tolist())
+        else:
+            engine.step(up, rows)
+        for i, u in zip(rows.tolist(), up.tolist()):
+            refs[i].full_step_auto(u)
+    for i, ref in enumerate(refs):
+        assert engine.total_realized_profit[i] == ref.total_realized_profit
+        assert engine.get_unrealized_profit(np.array([i]))[0] == ref.get_unrealized_profit()
+        assert (engine.length[0][i], engine.length[1][i]) == (len(ref.call_queue), len(ref.put_queue))
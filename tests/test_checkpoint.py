@@ -0,0 +1,88 @@
+import json
+import random
+
+import numpy as np
+import pytest
+
+import checkpoint
+from event_log import OFF
+from logic import BalanceBoxLogic
+from logic_v6 import BalancedBoxLogic
+from oracle import logic_state, v6_state
+from risk import RiskTracker
+
+def _v6_full(sim):
+    return (v6_state(sim), sim.profit_history.steps.tolist(), sim.profit_history.values.tolist(),
+            [record[1:] for record in sim.events.records], sim.risk.as_dict())
+
+def _logic_full(sim):
+    return (logic_state(sim), sim.history.steps.tolist(), sim.history.values.tolist(),
+            [record[1:] for record in sim.events.records], sim.risk.as_dict())
+
+@pytest.mark.parametrize("seed", range(5))
+def test_v6_round_trip_and_fork(seed):
+    rng = random.Random(seed)
+    directions = [rng.random() < 0.5 for _ in range(600)]
+    split = rng.randrange(len(directions))
+    original = BalancedBoxLogic(verbose=seed % 2 == 0, history_max_points=rng.choice([None, 16]))
+    original.risk = RiskTracker()
+    original.run(directions[:split])
+
+    cp = checkpoint.Checkpoint.from_bytes(checkpoint.snapshot(original).to_bytes())
+    branches = [cp.fork() for _ in range(3)]
+    assert not branches[0].materialized # 건드리기 전에는 체크포인트 배열만 참조
+    assert _v6_full(branches[0]) == _v6_full(original)
+
+    for up in directions[split:]:
+        original.full_step_auto(up)
+        branches[1].full_step_auto(up)
+    branches[2].run(directions[split:])
+    assert _v6_full(branches[1]) == _v6_full(original)
+    assert v6_state(branches[2]) == v6_state(original)
+    # 분기끼리 상태를 공유하지 않음
+    assert cp.fork().step_count == split
+
+@pytest.mark.parametrize("strategy_type", ["diff", "fixed"])
+def test_logic_round_trip_and_fork(strategy_type):
+    rng = random.Random(strategy_type)
+    directions = [1 if rng.random() < 0.5 else -1 for _ in range(500)]
+    original = BalanceBoxLogic(box_size=3, strategy_type=strategy_type, log_level=OFF)
+    original.risk = RiskTracker()
+    for d in directions[:200]:
+        original.next_step(d)
+
+    cp = checkpoint.Checkpoint.from_bytes(checkpoint.snapshot(original).to_bytes())
+    branch = cp.fork()
+    assert _logic_full(branch) == _logic_full(original)
+    for d in directions[200:]:
+        original.next_step(d)
+        branch.next_step(d)
+    assert _logic_full(branch) == _logic_full(original)
+    assert cp.fork().step_count == 200
+
+def test_corrupt_checkpoint_raises_value_error():
+    sim = BalancedBoxLogic(verbose=False)
+    sim.run([True, False] * 50)
+    data = checkpoint.snapshot(sim).to_bytes()
+    for broken in (data[:5], data[:40], data[:-9], b"XXXX" + data[4:]):
+        with pytest.raises(ValueError):
+            checkpoint.Checkpoint.from_bytes(broken)
+
+def _with_meta(data, edit):
+    """meta JSON 을 고쳐서 다시 묶은 체크포인트 bytes (본문 배열 정렬은 유지되지 않아도 됨)"""
+    magic, version, code, meta_len = checkpoint.HEADER.unpack_from(data)
+    meta = json.loads(data[checkpoint.HEADER.size:checkpoint.HEADER.size + meta_len])
+    edit(meta)
+    blob = json.dumps(meta).encode()
+    return checkpoint.HEADER.pack(magic, version, code, len(blob)) + blob + data[checkpoint.HEADER.size + meta_len:]
+
+@pytest.mark.parametrize("field, value", [(2, -1), (2, "3"), (1, "O"), (1, "<U4"), (1, "not-a-dtype")])
+def test_bad_array_meta_raises_value_error(field, value):
+    sim = BalancedBoxLogic(verbose=False)
+    sim.run([True, False] * 50)
+    data = checkpoint.snapshot(sim).to_bytes()
+
+    def edit(meta):
+        meta["arrays"][0][field] = value
+    with pytest.raises(ValueError, match="체크포인트"):
+        checkpoint.Checkpoint.from_bytes(_with_meta(data, edit))
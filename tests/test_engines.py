@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from event_log import OFF
+from logic import BalanceBoxLogic
+from logic_v6 import BalancedBoxLogic
+from oracle import verify_logic, verify_logic_run, verify_v6, verify_v6_run
+
+# 새 엔진(ledger / offset 방식, run tight loop)을 동결된 기준 규칙(oracle.Reference*)과 매 틱 비교
+
+def _paths(seed, count=6, steps=400):
+    """무작위 경로 + 박스 왕복/추세 경로 (큐가 깊어지거나 연쇄 청산이 나오도록 편향을 섞음)"""
+    rng = np.random.default_rng(seed)
+    paths = [rng.random(steps) < p for p in rng.uniform(0.2, 0.8, count)]
+    paths.append(np.tile([True, False], steps // 2))
+    paths.append(np.tile([True, True, False, False], steps // 4))
+    return paths
+
+@pytest.mark.parametrize("seed", range(3))
+def test_v6_steps_match_reference(seed):
+    for path in _paths(seed):
+        verify_v6(BalancedBoxLogic(verbose=False), path)
+
+@pytest.mark.parametrize("seed", range(3))
+def test_v6_run_matches_reference(seed):
+    for path in _paths(seed):
+        verify_v6_run(BalancedBoxLogic(verbose=False), path, chunk=97)
+
+@pytest.mark.parametrize("strategy_type", ["diff", "fixed"])
+@pytest.mark.parametrize("box_size", [1, 2, 3])
+def test_logic_steps_match_reference(strategy_type, box_size):
+    for path in _paths(box_size):
+        sim = BalanceBoxLogic(box_size=box_size, strategy_type=strategy_type, log_level=OFF)
+        verify_logic(sim, path, box_size=box_size, strategy_type=strategy_type)
+
+@pytest.mark.parametrize("strategy_type", ["diff", "fixed"])
+@pytest.mark.parametrize("box_size", [1, 2, 3])
+def test_logic_run_matches_reference(strategy_type, box_size):
+    for path in _paths(10 + box_size):
+        sim = BalanceBoxLogic(box_size=box_size, strategy_type=strategy_type, log_level=OFF)
+        verify_logic_run(sim, path, box_size=box_size, strategy_type=strategy_type, chunk=97)
+
+@pytest.mark.parametrize("seed", range(3))
+def test_v6_run_matches_stepping(seed):
+    # run() 과 full_step_auto 반복은 히스토리까지 같은 상태
+    for path in _paths(seed, count=3):
+        stepped, ran = BalancedBoxLogic(verbose=False), BalancedBoxLogic(verbose=False)
+        for up in path.tolist():
+            stepped.full_step_auto(up)
+        out = ran.run(path)
+        assert out["realized"][-1] == stepped.total_realized_profit
+        assert out["unrealized"][-1] == stepped.get_unrealized_profit()
+        assert ran.profit_history.steps.tolist() == stepped.profit_history.steps.tolist()
+        assert ran.profit_history.values.tolist() == stepped.profit_history.values.tolist()
+        assert ran.current_price == stepped.current_price
+
+@pytest.mark.parametrize("strategy_type", ["diff", "fixed"])
+def test_logic_run_matches_stepping(strategy_type):
+    for path in _paths(20, count=3):
+        stepped = BalanceBoxLogic(strategy_type=strategy_type, log_level=OFF)
+        ran = BalanceBoxLogic(strategy_type=strategy_type, log_level=OFF)
+        for up in path.tolist():
+            stepped.next_step(1 if up else -1)
+        ran.run(path)
+        assert ran.get_queue_display_data() == stepped.get_queue_display_data()
+        assert ran.total_profit == stepped.total_profit
+        assert ran.history.values.tolist() == stepped.history.values.tolist()
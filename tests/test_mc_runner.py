@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+import mc_runner
+from directions import PackedDirections
+from mc_runner import case_directions, simulate_paths
+from oracle import ReferenceBalanceBoxLogic
+
+@pytest.mark.parametrize("params", [{}, {"box_size": 3, "strategy_type": "fixed"}, {"unit_point": 2.5}])
+def test_logic_paths_match_reference(params):
+    directions = case_directions(0, range(6), 300)
+    profits = simulate_paths("logic", directions, params)
+    for row, path in enumerate(directions):
+        sim = ReferenceBalanceBoxLogic(params.get("box_size", 2), params.get("unit_point", 10),
+                                       params.get("strategy_type", "diff"))
+        expected = []
+        for up in path.tolist():
+            sim.next_step(1 if up else -1)
+            expected.append(sim.total_profit)
+        assert profits[row].tolist() == expected
+    assert np.array_equal(simulate_paths("logic", PackedDirections.pack(directions), params), profits)
+
+def test_logic_workers_log_nothing_by_default(monkeypatch):
+    engines = []
+
+    class Spy(mc_runner.BalanceBoxLogic):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            engines.append(self)
+    monkeypatch.setattr(mc_runner, "BalanceBoxLogic", Spy)
+    simulate_paths("logic", case_directions(0, range(2), 50))
+    assert engines and all(len(sim.events.records) == 0 for sim in engines)
@@ -0,0 +1,39 @@
+import itertools
+from collections import defaultdict
+
+import pytest
+
+from oracle import ReferenceBalanceBoxLogic
+from pnl_dp import profit_distribution
+
+def _brute_force(steps, p_up, box_size, strategy_type, unit_point=10):
+    """모든 2^steps 경로를 기준 구현으로 진행한 실현 손익 분포"""
+    totals = defaultdict(float)
+    for path in itertools.product((True, False), repeat=steps):
+        sim = ReferenceBalanceBoxLogic(box_size, unit_point, strategy_type)
+        for up in path:
+            sim.next_step(1 if up else -1)
+        ups = sum(path)
+        totals[sim.total_profit * unit_point] += p_up ** ups * (1 - p_up) ** (steps - ups)
+    return totals
+
+@pytest.mark.parametrize("strategy_type", ["diff", "fixed"])
+@pytest.mark.parametrize("box_size", [1, 2, 3])
+@pytest.mark.parametrize("p_up", [0.5, 0.3])
+def test_exact_distribution_matches_brute_force(strategy_type, box_size, p_up):
+    steps = 10
+    expected = _brute_force(steps, p_up, box_size, strategy_type)
+    dist = profit_distribution(steps, p_up, box_size, strategy_type, eps=0.0, max_states=None)
+    assert dist.lost_mass == 0
+    assert dist.values.tolist() == sorted(v for v, p in expected.items() if p > 0)
+    assert dist.probs.tolist() == pytest.approx([expected[v] for v in dist.values.tolist()], abs=1e-12)
+
+def test_truncated_distribution_bounds():
+    steps = 10
+    expected = _brute_force(steps, 0.5, 2, "diff")
+    dist = profit_distribution(steps, 0.5, 2, "diff", max_states=20)
+    assert dist.lost_mass > 0
+    for x in (-50, 0, 50):
+        low, high = dist.cdf_bounds(x)
+        exact = sum(p for v, p in expected.items() if v <= x)
+        assert low - 1e-12 <= exact <= high + 1e-12
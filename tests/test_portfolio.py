@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from logic_v6 import BalancedBoxLogic
+from portfolio import Portfolio
+
+def _check(book, refs, units):
+    for i, ref in enumerate(refs):
+        info = book.instrument(i)
+        assert info["realized"] == ref.total_realized_profit * units[i]
+        assert info["unrealized"] == ref.get_unrealized_profit() * units[i]
+        assert (info["calls"], info["puts"]) == (len(ref.call_queue), len(ref.put_queue))
+        assert (info["wounded"], info["defeated"]) == (len(ref.wounded_pool), len(ref.defeated_pool))
+    totals = book.totals()
+    for key, value in book.recompute().items():
+        assert totals[key] == pytest.approx(value)
+
+@pytest.mark.parametrize("concentration", [0.0, 0.9])
+def test_portfolio_matches_per_instrument_engines(concentration):
+    # concentration: 틱이 한 종목에 몰리는 비율 (라운드가 얇아지면 스칼라 경로로 진행)
+    rng = np.random.default_rng(int(concentration * 10))
+    symbols = 120
+    units = rng.choice([1.0, 5.0, 10.0], symbols)
+    book = Portfolio(range(symbols), unit_point=units)
+    refs = [BalancedBoxLogic(verbose=False) for _ in range(symbols)]
+    for _ in range(8):
+        size = int(rng.integers(0, 3000))
+        rows = np.where(rng.random(size) < concentration, 0, rng.integers(0, symbols, size))
+        ups = rng.random(size) < 0.5
+        book.on_ticks(rows, ups)
+        for row, up in zip(rows.tolist(), ups.tolist()):
+            refs[row].full_step_auto(up)
+    _check(book, refs, units)
+
+def test_portfolio_names_and_prices():
+    from tick_replay import UnitQuantizer
+    rng = np.random.default_rng(0)
+    units = np.array([1.0, 2.5, 10.0])
+    book = Portfolio(["A", "B", "C"], unit_point=units)
+    refs = [BalancedBoxLogic(verbose=False) for _ in units]
+    quantizers = [UnitQuantizer(u) for u in units]
+    prices = np.full(3, 1000.0)
+    for _ in range(10):
+        rows = rng.integers(0, 3, 80)
+        ticks = np.empty(len(rows))
+        for j, row in enumerate(rows.tolist()):
+            prices[row] += rng.normal(0, 4)
+            ticks[j] = prices[row]
+        book.on_prices([["A", "B", "C"][r] for r in rows.tolist()], ticks)
+        for row in range(3):
+            for move in quantizers[row].quantize(ticks[rows == row]).tolist():
+                refs[row].full_step_auto(move > 0)
+    _check(book, refs, units)
+
+def test_plain_int_lists_are_row_indices():
+    by_row, by_name = Portfolio(["A", "B"]), Portfolio(["A", "B"])
+    ups = [True, False, True, True, False, True]
+    by_row.on_ticks([0, 1, 0, 0, 1, np.int64(0)], ups)
+    by_name.on_ticks(["A", "B", "A", "A", "B", "A"], ups)
+    assert by_row.totals() == by_name.totals()
+    assert by_row.instrument("A") == by_name.instrument("A")
+    assert by_row.rows_of((1, 0)).tolist() == [1, 0]
+    assert by_row.rows_of([]).tolist() == []
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from mc_runner import simulate_chunk
+from mc_stats import summarize
+from result_store import SUMMARY_COLUMNS, ResultStore, run_config
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultStore(str(tmp_path / "runs.sqlite"))
+
+def _profits(cases=40, steps=60):
+    return simulate_chunk("v6", list(range(cases)), steps, seed=3)
+
+def test_writer_round_trip_matches_put(store):
+    profits = _profits()
+    config = run_config("v6", 3, len(profits), profits.shape[1])
+    with store.writer() as writer:
+        for start in range(0, len(profits), 16):
+            writer.append(profits[start:start + 16])
+        run_id = writer.finish(config, elapsed=1.0)
+    assert np.array_equal(store.get(config), profits)
+    assert [len(block) for block in store.load_blocks(run_id)] == [16, 16, 8]
+    summary = store.lookup(config)
+    expected = summarize(profits)
+    assert {c: summary[c] for c in SUMMARY_COLUMNS} == pytest.approx({c: expected[c] for c in SUMMARY_COLUMNS})
+    assert summary["cases"] == len(profits)
+
+    store.put(config, profits[:5])  # 같은 설정 교체 -> 스트리밍 블록도 함께 삭제
+    assert np.array_equal(store.get(config), profits[:5])
+    assert store.db.execute("SELECT COUNT(*) FROM history_chunks").fetchone()[0] == 0
+
+def test_unfinished_writer_is_invisible_and_cleaned_up(store):
+    profits = _profits(10, 20)
+    config = run_config("v6", 3, 10, 20)
+    with pytest.raises(RuntimeError):
+        with store.writer() as writer:
+            writer.append(profits)
+            assert store.get(config) is None
+            raise RuntimeError
+    assert store.get(config) is None
+    assert store.db.execute("SELECT COUNT(*) FROM history_chunks").fetchone()[0] == 0
+
+def test_writer_rejects_mismatched_steps(store):
+    with store.writer() as writer:
+        writer.append(np.zeros((2, 5), dtype=np.int64))
+        with pytest.raises(ValueError):
+            writer.append(np.zeros((2, 6), dtype=np.int64))
@@ -0,0 +1,126 @@
+import os
+import struct
+import numpy as np
+
+# --- [Binary Tick Format] ---
+# Header (16 bytes, little-endian): magic(4s) | version(H) | dtype code(H) | count(Q)
+# Body: count 개의 가격 배열 (dtype code 에 해당하는 타입, 연속 저장)
+MAGIC = b"BBTK"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQ")
+DTYPES = {0: np.dtype("<f8"), 1: np.dtype("<f4"), 2: np.dtype("<i8"), 3: np.dtype("<i4")}
+
+DEFAULT_CHUNK = 1 << 20 # 한 번에 처리하는 틱 수
+
+def write_binary_prices(path, prices, dtype="<f8"):
+    """가격 배열을 압축 바이너리 틱 파일로 저장"""
+    prices = np.asarray(prices, dtype=dtype)
+    code = next(k for k, v in DTYPES.items() if v == prices.dtype)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, code, len(prices)))
+        prices.tofile(f)
+
+def open_binary_prices(path):
+    """헤더를 검증하고 가격 배열을 memory-map 으로 반환 (파일 전체를 메모리에 올리지 않음)"""
+    with open(path, "rb") as f:
+        magic, version, code, count = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"{path}: 틱 파일 형식이 아닙니다 (magic={magic!r})")
+    if version != VERSION or code not in DTYPES:
+        raise ValueError(f"{path}: 지원하지 않는 버전/타입 (version={version}, dtype={code})")
+    if count == 0:
+        return np.empty(0, dtype=DTYPES[code])
+    return np.memmap(path, dtype=DTYPES[code], mode="r", offset=HEADER.size, shape=(count,))
+
+def iter_binary_prices(path, chunk_size=DEFAULT_CHUNK):
+    prices = open_binary_prices(path)
+    for start in range(0, len(prices), chunk_size):
+        yield np.asarray(prices[start:start + chunk_size], dtype=np.float64)
+
+def iter_csv_prices(path, column="price", chunk_size=DEFAULT_CHUNK):
+    """CSV 를 chunk 단위로 읽어 가격 컬럼만 yield (pandas 는 필요할 때만 import)"""
+    import pandas as pd
+    for frame in pd.read_csv(path, usecols=[column], chunksize=chunk_size):
+        yield frame[column].to_numpy(dtype=np.float64)
+
+def iter_prices(path, column="price", chunk_size=DEFAULT_CHUNK):
+    """확장자로 형식 판별: .csv -> CSV, 그 외 -> 바이너리 틱 파일"""
+    if os.path.splitext(path)[1].lower() == ".csv":
+        return iter_csv_prices(path, column, chunk_size)
+    return iter_binary_prices(path, chunk_size)
+
+# --- [Quantization] ---
+
+class UnitQuantizer:
+    """
+    실제 가격을 unit_point 격자(box boundary) 통과 이벤트로 변환.
+    box index = floor((price - anchor) / unit_point) 가 바뀔 때만 이동이 발생하며,
+    한 틱에 여러 칸을 건너뛰면 그 칸 수만큼 같은 방향 이동을 만들어냅니다.
+    chunk 경계를 넘어 상태(직전 box index)를 유지하므로 스트리밍 입력에 그대로 사용 가능합니다.
+    """
+    EPS = 1e-9 # 부동소수 오차로 경계값이 아래 칸으로 떨어지는 것 방지
+
+    def __init__(self, unit_point, anchor=None):
+        self.unit_point = unit_point
+        self.anchor = anchor
+        self.level = None # 직전 box index
+        self.ticks = 0    # 입력된 전체 틱 수
+        self.skipped = 0  # 경계를 넘지 않아 엔진 호출 없이 건너뛴 틱 수
+
+    def box_price(self):
+        """현재 box 의 기준 가격 (엔진의 current_price 에 해당)"""
+        return self.anchor + self.level * self.unit_point
+
+    def deltas(self, prices):
+        """가격 chunk -> 틱별 box index 변화량 (int64, 0 = 경계를 넘지 않은 틱)"""
+        prices = np.asarray(prices, dtype=np.float64)
+        if prices.size == 0:
+            return np.empty(0, dtype=np.int64)
+        if self.anchor is None:
+            self.anchor = float(prices[0])
+        levels = np.floor((prices - self.anchor) / self.unit_point + self.EPS).astype(np.int64)
+        if self.level is None:
+            self.level = int(levels[0])
+
+        deltas = np.diff(levels, prepend=self.level)
+        self.level = int(levels[-1])
+        self.ticks += prices.size
+        self.skipped += prices.size - int(np.count_nonzero(deltas))
+        return deltas
+
+    def quantize(self, prices):
+        """가격 chunk -> +1(UP) / -1(DOWN) 이동 배열 (int8)"""
+        deltas = self.deltas(prices)
+        deltas = deltas[deltas != 0]
+        return np.repeat(np.sign(deltas), np.abs(deltas)).astype(np.int8)
+
+def iter_moves(price_chunks, unit_point, anchor=None, quantizer=None):
+    """가격 chunk 스트림 -> 이동 chunk 스트림 (빈 chunk 는 건너뜀)"""
+    quantizer = quantizer or UnitQuantizer(unit_point, anchor)
+    for prices in price_chunks:
+        moves = quantizer.quantize(prices)
+        if moves.size:
+            yield moves
+
+# --- [Replay] ---
+
+def engine_stepper(engine):
+    """엔진 종류에 맞는 1스텝 함수 반환 (+1 / -1 입력)"""
+    if hasattr(engine, "full_step_auto"): # logic_v6.BalancedBoxLogic
+        return lambda move: engine.full_step_auto("UP" if move > 0 else "DOWN")
+    return engine.next_step               # logic.BalanceBoxLogic
+
+def replay(engine, source, unit_point=None, column="price", chunk_size=DEFAULT_CHUNK, anchor=None):
+    """
+    틱 파일(경로) 또는 가격 chunk iterable 을 엔진에 재생.
+    경계를 넘은 틱만 엔진을 호출하므로 메모리는 chunk 크기로 제한됩니다.
+    반환: 사용한 UnitQuantizer (ticks / skipped / level 통계 확인용)
+    """
+    unit_point = unit_point if unit_point is not None else engine.unit_point
+    chunks = iter_prices(source, column, chunk_size) if isinstance(source, (str, os.PathLike)) else source
+    quantizer = UnitQuantizer(unit_point, anchor)
+    step = engine_stepper(engine)
+    for moves in iter_moves(chunks, unit_point, quantizer=quantizer):
+        for move in moves.tolist():
+            step(move)
+    return quantizer